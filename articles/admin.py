@@ -1,10 +1,62 @@
-from django.contrib import admin
-from .models import Article, Category, Tag, Author
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+from core.paginator import EstimatedCountPaginator
+from .models import Article, ArticleStatus, Category, Tag, Author
+from .search import search_articles
+from .transitions import change_status
+
+
+class TagAutocompleteFilter(admin.SimpleListFilter):
+    """
+    Filter articles by one tag, typed into a search box with suggestions
+    from the admin autocomplete view, instead of listing every tag.
+    """
+    title = 'tag'
+    parameter_name = 'tag'
+    template = 'admin/articles/tag_autocomplete_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        # The search box submits a new query string; keep the other filters
+        self.hidden_params = [
+            (name, value)
+            for name, values in request.GET.lists()
+            if name not in (self.parameter_name, 'p')
+            for value in values
+        ]
+        self.autocomplete_url = reverse('admin:autocomplete') + '?app_label=articles&model_name=article&field_name=tags'
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        # Only the selected tag is listed (tag names are unique)
+        value = self.value()
+        return [(value, value)] if value else []
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        # Semi-join: every article appears once without DISTINCT
+        through = Article.tags.through.objects.filter(article=OuterRef('pk'), tag__name=self.value())
+        return queryset.filter(Exists(through))
+
+
+class ArticleChangeList(ChangeList):
+
+    def get_queryset(self, request, exclude_parameters=None):
+        # The list never shows the body or the search vector
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.defer(*Article.DETAIL_DEFERRED_FIELDS, 'content_html')
 
 
 @admin.register(Author)
 class AuthorAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'articles_count', 'created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = ['name', 'bio']
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = ['created_at', 'updated_at', 'articles_count']
@@ -30,14 +82,15 @@ class AuthorAdmin(admin.ModelAdmin):
     )
     
     def articles_count(self, obj):
-        """Display the count of published articles by this author."""
-        return obj.get_articles_count()
+        """Display the stored count of published articles (no query per row)."""
+        return obj.published_articles_count
     articles_count.short_description = 'Published Articles'
+    articles_count.admin_order_field = 'published_articles_count'
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'created_at']
+    list_display = ['name', 'slug', 'published_articles_count', 'created_at']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = ['created_at', 'updated_at']
@@ -45,7 +98,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'created_at']
+    list_display = ['name', 'slug', 'published_articles_count', 'created_at']
     search_fields = ['name']
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = ['created_at', 'updated_at']
@@ -54,11 +107,19 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
     list_display = ['title', 'author', 'category', 'status', 'published_at', 'created_at']
-    list_filter = ['status', 'category', 'tags', 'created_at', 'published_at']
-    search_fields = ['title', 'content', 'excerpt']
+    list_select_related = ['author', 'category']
+    list_filter = ['status', 'category', TagAutocompleteFilter, 'created_at', 'published_at']
+    # Searched with the full-text index, see get_search_results()
+    search_fields = ['title', 'excerpt', 'content']
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = ['created_at', 'updated_at', 'published_at']
-    filter_horizontal = ['tags']  # Better UI for many-to-many tags
+    # Select boxes with every author/tag do not scale; search as you type
+    autocomplete_fields = ['author', 'category', 'tags']
+    # Planner estimates instead of COUNT(*) over the whole table (core.paginator)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # One set-based UPDATE for the whole selection (articles.transitions)
+    actions = ['publish_selected', 'archive_selected', 'unpublish_selected']
     
     fieldsets = (
         ('Content', {
@@ -76,3 +137,33 @@ class ArticleAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+    def get_changelist(self, request, **kwargs):
+        return ArticleChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """Use the site search backend (tsvector on PostgreSQL); the changelist applies its own ordering."""
+        if not search_term.strip():
+            return queryset, False
+        return search_articles(queryset, search_term), False
+
+    def change_selected_status(self, request, queryset, status):
+        stats = change_status(queryset, status)
+        self.message_user(
+            request,
+            f'{stats["articles"]} articles changed to {ArticleStatus(status).label.lower()} '
+            f'in {stats["total_seconds"] * 1000:.0f} ms.',
+            messages.SUCCESS,
+        )
+
+    @admin.action(description='Publish selected articles', permissions=['change'])
+    def publish_selected(self, request, queryset):
+        self.change_selected_status(request, queryset, ArticleStatus.PUBLISHED)
+
+    @admin.action(description='Archive selected articles', permissions=['change'])
+    def archive_selected(self, request, queryset):
+        self.change_selected_status(request, queryset, ArticleStatus.ARCHIVED)
+
+    @admin.action(description='Unpublish selected articles (back to draft)', permissions=['change'])
+    def unpublish_selected(self, request, queryset):
+        self.change_selected_status(request, queryset, ArticleStatus.DRAFT)
@@ -0,0 +1,250 @@
+"""
+Read-only JSON API over the published articles.
+
+    GET /api/articles/                      newest first, pages of ?limit= (default 50)
+    GET /api/articles/?format=ndjson        every match, one JSON object per line
+
+Filters match the public pages: ?category=<slug>, ?author=<slug>,
+?tag=<slug> (repeatable, any of them), ?q=<search> (articles.search).
+?fields=id,title,url picks the keys of each article (FIELDS); only the
+columns behind them are selected.
+
+Incremental sync: ?since=<ISO 8601 datetime> returns the articles changed
+after that moment, oldest change first. Keep the largest updated_at
+received and pass it as ``since`` next time (overlapping by a few seconds
+is safe, articles are identified by id). Unpublished and deleted articles
+simply stop appearing; an export of ``fields=id`` tells which ones exist.
+
+Pages use keyset cursors (articles.pagination): ``next`` links to the
+following page; a cursor that does not decode is a 400 like any other bad
+parameter. NDJSON exports are streamed from a server-side cursor
+(``.iterator(chunk_size=...)``), the tags of each chunk are loaded with one
+query, so memory per worker stays flat for the whole archive. Under ASGI
+(SERVER_MODE=asgi) the stream is an async generator over
+``.aiterator(chunk_size=...)``: Django would otherwise read a synchronous
+iterator into a list before sending the first byte. Responses carry
+ETag/Last-Modified (core.conditional); JSON pages are kept in the response
+cache (core.cache).
+"""
+import json
+from datetime import timezone as dt_timezone
+from itertools import batched
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views import View
+
+from core.cache import CachedResponseMixin
+from core.conditional import conditional_response, content_validators, is_conditional_request
+from core.replicas import ReplicaReadMixin
+from .counters import published_articles
+from .models import Article
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import search_articles
+
+# API field -> column it is read from (None: derived, see serialize_rows)
+FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'url': 'slug',
+    'summary': 'summary',
+    'excerpt': 'excerpt',
+    'content_html': 'content_html',
+    'word_count': 'word_count',
+    'reading_time': 'reading_time',
+    'author': 'author__name',
+    'author_slug': 'author__slug',
+    'category': 'category__name',
+    'category_slug': 'category__slug',
+    'tags': None,
+    'published_at': 'published_at',
+    'updated_at': 'updated_at',
+}
+DEFAULT_FIELDS = (
+    'id', 'title', 'slug', 'url', 'summary', 'author', 'category', 'tags', 'published_at', 'updated_at',
+)
+
+ORDERING = ('-published_at', '-created_at', '-id')
+SYNC_ORDERING = ('updated_at', 'id')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+CHUNK_SIZE = 2000
+
+JSON = 'json'
+NDJSON = 'ndjson'
+
+
+class BadRequest(Exception):
+    pass
+
+
+def parse_fields(value):
+    if not value:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise BadRequest(f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(FIELDS)}.')
+    return fields
+
+
+def parse_since(value):
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        since = None
+    if since is None:
+        raise BadRequest('since must be an ISO 8601 datetime, e.g. 2025-01-31T12:00:00Z.')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, dt_timezone.utc)
+    return since
+
+
+def parse_limit(value):
+    if not value:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f'limit must be between 1 and {MAX_LIMIT}.')
+    return limit
+
+
+def filter_articles(params):
+    """The published articles matching the filters of the query string, unordered."""
+    queryset = published_articles()
+    if params.get('category'):
+        queryset = queryset.filter(category__slug=params['category'], category__is_active=True)
+    if params.get('author'):
+        queryset = queryset.filter(author__slug=params['author'], author__is_active=True)
+    tags = params.getlist('tag')
+    if tags:
+        through = Article.tags.through.objects.filter(
+            article=OuterRef('pk'), tag__slug__in=tags, tag__is_active=True
+        )
+        queryset = queryset.filter(Exists(through))
+    if params.get('since'):
+        queryset = queryset.filter(updated_at__gt=parse_since(params['since']))
+    if params.get('q', '').strip():
+        queryset = search_articles(queryset, params['q'])
+    return queryset
+
+
+def tags_by_article(article_ids, using=None):
+    tags = {pk: [] for pk in article_ids}
+    links = Article.tags.through.objects.using(using).filter(
+        article_id__in=article_ids, tag__is_active=True
+    ).order_by('tag__name').values_list('article_id', 'tag__slug')
+    for article_id, slug in links:
+        tags[article_id].append(slug)
+    return tags
+
+
+class ArticleApiView(CachedResponseMixin, ReplicaReadMixin, View):
+    """Published articles as JSON pages or a streamed NDJSON export."""
+
+    # Database the rows are read from (None: the router decides)
+    using = None
+
+    def get(self, request):
+        try:
+            self.fields = parse_fields(request.GET.get('fields'))
+            output = request.GET.get('format', JSON)
+            if output not in (JSON, NDJSON):
+                raise BadRequest(f'format must be {JSON} or {NDJSON}.')
+            limit = parse_limit(request.GET.get('limit'))
+            queryset = filter_articles(request.GET)
+        except BadRequest as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+
+        if output == NDJSON:
+            get_response = lambda: self.export(queryset)
+        else:
+            get_response = lambda: self.page(queryset, limit)
+        if not is_conditional_request(request):
+            return get_response()
+        last_modified, state = content_validators()
+        return conditional_response(request, last_modified, (state, output), get_response)
+
+    def get_ordering(self):
+        return SYNC_ORDERING if self.request.GET.get('since') else ORDERING
+
+    def get_columns(self):
+        columns = {'id'} | {FIELDS[name] for name in self.fields if FIELDS[name]}
+        # Keyset cursors need the sort key of the last row
+        columns |= {name.lstrip('-') for name in self.get_ordering()}
+        return sorted(columns)
+
+    def serialize_rows(self, rows):
+        """Turn a batch of values() rows into API dicts with the requested fields."""
+        tags = tags_by_article([row['id'] for row in rows], self.using) if 'tags' in self.fields else {}
+        if 'url' in self.fields:
+            prefix, suffix = self.request.build_absolute_uri(
+                reverse('articles:detail', args=['__slug__'])
+            ).split('__slug__')
+        results = []
+        for row in rows:
+            item = {}
+            for name in self.fields:
+                if name == 'tags':
+                    item[name] = tags[row['id']]
+                elif name == 'url':
+                    item[name] = f'{prefix}{row["slug"]}{suffix}'
+                else:
+                    item[name] = row[FIELDS[name]]
+            results.append(item)
+        return results
+
+    def page(self, queryset, limit):
+        paginator = KeysetPaginator(queryset.order_by(*self.get_ordering()).values(*self.get_columns()), limit)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        next_url = None
+        if page.next_cursor:
+            params = self.request.GET.copy()
+            params['cursor'] = page.next_cursor
+            next_url = self.request.build_absolute_uri(f'{self.request.path}?{params.urlencode()}')
+        return JsonResponse({'results': self.serialize_rows(list(page)), 'next': next_url})
+
+    def serialize_lines(self, rows):
+        """One NDJSON line per row of the batch, as one string."""
+        return ''.join(
+            json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n' for item in self.serialize_rows(rows)
+        )
+
+    def lines(self, rows):
+        for batch in batched(rows.iterator(chunk_size=CHUNK_SIZE), CHUNK_SIZE):
+            yield self.serialize_lines(batch)
+
+    async def alines(self, rows):
+        # Each chunk of rows and the tag query of each batch run in the
+        # request's sync thread; only one batch is held at a time
+        batch = []
+        async for row in rows.aiterator(chunk_size=CHUNK_SIZE):
+            batch.append(row)
+            if len(batch) == CHUNK_SIZE:
+                yield await sync_to_async(self.serialize_lines)(batch)
+                batch = []
+        if batch:
+            yield await sync_to_async(self.serialize_lines)(batch)
+
+    def export(self, queryset):
+        # The stream is consumed after the view returned, outside the
+        # request's routing (core.replicas): keep reading from this database
+        self.using = queryset.db
+        queryset = queryset.using(self.using)
+        rows = queryset.order_by(*self.get_ordering()).values(*self.get_columns())
+        lines = self.alines(rows) if isinstance(self.request, ASGIRequest) else self.lines(rows)
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson; charset=utf-8')
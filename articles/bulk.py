@@ -0,0 +1,196 @@
+"""
+Batched article loading for seeding and imports.
+
+ArticleBulkLoader collects Article instances (with their tag ids) and
+writes them with one bulk_create per batch for the articles and one for
+the Article.tags through-table, instead of a save() and a tags.set() per
+article. Unique slugs are allocated per batch by SlugAllocator, with one
+query for the slugs the batch could collide with.
+
+bulk_create bypasses Article.save() and the signal handlers, so the loader
+does their work set-based: it computes the card summary and the rendered
+content before insert, refreshes the search vectors of each batch,
+recounts the published-article counters of the touched authors, categories
+and tags at the end and bumps the response cache generation. The batches
+are committed one by one, so this also happens when the load fails part
+way: the batches already written are live.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from core.cache import bump_content_generation
+from .counters import recount_published_articles
+from .models import Article, ArticleStatus
+from .search import update_search_vectors
+
+BATCH_SIZE = 1000
+
+
+class SlugAllocator:
+    """
+    Allocate unique slugs for a batch of rows without a query per row.
+
+    allocate_many() reads the existing slugs the batch could collide with
+    (each base slug and its ``base-N`` variants) in one query per
+    SLUG_QUERY_CHUNK bases and gives collisions a numeric suffix
+    (``title``, ``title-1``, ``title-2``...). Nothing is kept between
+    calls, so memory use follows the batch, not the table; the slugs of a
+    batch must be saved before the next batch is allocated.
+    """
+
+    # Room kept for the "-N" suffix of slugs cut to max_length
+    SUFFIX_ROOM = 8
+    SLUG_QUERY_CHUNK = 200
+
+    def __init__(self, model, field_name='slug'):
+        self.model = model
+        self.field_name = field_name
+        self.max_length = model._meta.get_field(field_name).max_length
+
+    def base(self, text, fallback='item'):
+        return slugify(text)[:self.max_length].strip('-') or fallback
+
+    def allocate(self, text, fallback='item'):
+        return self.allocate_many([text], fallback)[0]
+
+    def allocate_many(self, texts, fallback='item'):
+        bases = [self.base(text, fallback) for text in texts]
+        taken = self.taken_slugs(set(bases))
+        next_suffix = {}
+        slugs = []
+        for base in bases:
+            slug = base
+            suffix = next_suffix.get(base, 1)
+            while slug in taken:
+                ending = f'-{suffix}'
+                slug = base[:self.max_length - len(ending)] + ending
+                suffix += 1
+            next_suffix[base] = suffix
+            taken.add(slug)
+            slugs.append(slug)
+        return slugs
+
+    def taken_slugs(self, bases):
+        """Existing slugs equal to one of the bases or carrying a suffix after it."""
+        taken = set()
+        bases = sorted(bases)
+        for start in range(0, len(bases), self.SLUG_QUERY_CHUNK):
+            condition = Q()
+            for base in bases[start:start + self.SLUG_QUERY_CHUNK]:
+                if len(base) > self.max_length - self.SUFFIX_ROOM:
+                    # Suffixed variants of a long base are cut before the suffix
+                    prefix = base[:self.max_length - self.SUFFIX_ROOM]
+                else:
+                    prefix = f'{base}-'
+                condition |= Q(**{self.field_name: base}) | Q(**{f'{self.field_name}__startswith': prefix})
+            taken.update(self.model.objects.filter(condition).values_list(self.field_name, flat=True))
+        return taken
+
+
+class ArticleBulkLoader:
+    """
+    Insert articles in batches. Use as a context manager, or call finish()
+    after the last add():
+
+        with ArticleBulkLoader() as loader:
+            for row in rows:
+                loader.add(Article(...), tag_ids=[...])
+        print(loader.created, loader.rate)
+
+    Articles without a slug get one from the title. Each batch is written
+    in its own transaction, so memory use does not grow with the input.
+    When the block raises, the queued rows are dropped and the counters and
+    cache generation are still refreshed for the batches already written.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, on_batch=None):
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.pending = []
+        self.slugs = SlugAllocator(Article)
+        self.created = 0
+        self.tag_links = 0
+        self.author_ids = set()
+        self.category_ids = set()
+        self.tag_ids = set()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.pending = []
+            self.refresh()
+
+    @property
+    def rate(self):
+        """Articles inserted per second so far."""
+        elapsed = self.elapsed or time.perf_counter() - self.started
+        return self.created / elapsed if elapsed else 0.0
+
+    def add(self, article, tag_ids=(), slug_base=None):
+        """
+        Queue an article for insertion. Without a slug, a unique one is
+        built from slug_base (default: the title).
+        """
+        article.summary = Article.build_summary(article.excerpt, article.content)
+        article.render_content()
+        if article.status == ArticleStatus.PUBLISHED and not article.published_at:
+            article.published_at = timezone.now()
+        # The slug is allocated with the rest of the batch in flush()
+        self.pending.append((article, tag_ids, None if article.slug else slug_base or article.title))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        through = Article.tags.through
+        with transaction.atomic():
+            unnamed = [(article, slug_base) for article, _, slug_base in self.pending if slug_base is not None]
+            slugs = self.slugs.allocate_many([slug_base for _, slug_base in unnamed], fallback='article')
+            for (article, _), slug in zip(unnamed, slugs):
+                article.slug = slug
+            created = Article.objects.bulk_create([article for article, _, _ in self.pending])
+            links = [
+                through(article_id=article.pk, tag_id=tag_id)
+                for article, (_, tag_ids, _) in zip(created, self.pending)
+                for tag_id in set(tag_ids)
+            ]
+            through.objects.bulk_create(links)
+            update_search_vectors(Article.objects.filter(pk__in=[article.pk for article in created]))
+
+        self.created += len(created)
+        self.tag_links += len(links)
+        self.author_ids.update(article.author_id for article in created)
+        self.category_ids.update(article.category_id for article in created)
+        self.tag_ids.update(link.tag_id for link in links)
+        self.pending = []
+        if self.on_batch is not None:
+            self.on_batch(self)
+
+    def finish(self):
+        """Write the last batch and refresh the data that signals would maintain."""
+        try:
+            self.flush()
+        finally:
+            self.refresh()
+
+    def refresh(self):
+        """Recount the counters and bump the cache generation for the batches written so far."""
+        if self.created:
+            recount_published_articles(
+                author_ids=list(self.author_ids),
+                category_ids=list(self.category_ids),
+                tag_ids=list(self.tag_ids),
+            )
+            transaction.on_commit(bump_content_generation)
+        self.elapsed = time.perf_counter() - self.started
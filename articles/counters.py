@@ -0,0 +1,80 @@
+"""
+Denormalized published-article counters.
+
+Author, Category and Tag store the number of their published, active
+articles in ``published_articles_count``. The counters are adjusted
+incrementally by the signal handlers in articles.signals whenever an
+article moves in or out of the published set (status, is_active, author,
+category or tag changes). Bulk operations that bypass signals
+(``QuerySet.update()``, ``bulk_create()``) must call
+``recount_published_articles()`` afterwards, which is also what the
+``recount`` management command runs to repair drift.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Article, ArticleStatus, Author, Category, Tag
+
+COUNTER_FIELD = 'published_articles_count'
+
+
+def is_counted(status, is_active):
+    """Return True if an article in this state counts as published."""
+    return status == ArticleStatus.PUBLISHED and is_active
+
+
+def adjust(model, pks, delta):
+    """Add delta to the counter of the given rows, never going below zero."""
+    pks = [pk for pk in pks if pk is not None]
+    if not pks or not delta:
+        return
+    model.objects.filter(pk__in=pks).update(
+        **{COUNTER_FIELD: Greatest(F(COUNTER_FIELD) + delta, Value(0))}
+    )
+
+
+def published_articles():
+    return Article.objects.filter(status=ArticleStatus.PUBLISHED, is_active=True)
+
+
+def _count_subquery(queryset, group_field):
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(group_field).annotate(total=Count('pk')).values('total')[:1]
+        ),
+        Value(0),
+    )
+
+
+def recount_published_articles(author_ids=None, category_ids=None, tag_ids=None):
+    """
+    Recompute counters with one set-based UPDATE per model.
+
+    Pass lists of primary keys to limit the recount to the affected rows;
+    None recounts every row of that model, an empty list skips the model.
+    Returns a dict with the number of rows updated per model.
+    """
+    published = published_articles()
+    through = Article.tags.through
+    targets = [
+        (Author, author_ids, _count_subquery(published.filter(author=OuterRef('pk')), 'author')),
+        (Category, category_ids, _count_subquery(published.filter(category=OuterRef('pk')), 'category')),
+        (Tag, tag_ids, _count_subquery(
+            through.objects.filter(
+                tag=OuterRef('pk'),
+                article__status=ArticleStatus.PUBLISHED,
+                article__is_active=True,
+            ),
+            'tag',
+        )),
+    ]
+
+    updated = {}
+    for model, pks, count in targets:
+        queryset = model.objects.all()
+        if pks is not None:
+            if not pks:
+                continue
+            queryset = queryset.filter(pk__in=pks)
+        updated[model._meta.model_name] = queryset.update(**{COUNTER_FIELD: count})
+    return updated
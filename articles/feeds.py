@@ -0,0 +1,168 @@
+"""
+RSS and Atom feeds of the published articles: all articles, and per
+category, author and tag.
+
+Aggregators poll feeds often and mostly find nothing new. Every feed
+answers conditional requests (core.conditional) with the validators of
+the article list pages, so a poll without changes costs no query and
+ends in 304 Not Modified; responses are kept in the response
+cache (core.cache) until the next content change.
+
+Items carry the card summary, not the article body. Set FEED_FULL_CONTENT
+to include the rendered HTML (Article.content_html) instead; FEED_ITEMS is
+the number of newest articles per feed.
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.db.models import Exists, OuterRef
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from core.cache import cache_public_response
+from core.conditional import conditional_response, content_validators, is_conditional_request
+from core.replicas import replica_reads
+from .counters import published_articles
+from .models import Article, Author, Category, Tag
+
+SITE_TITLE = 'Asanbay Society for Social Justice'
+
+# Columns an item needs besides the description
+ITEM_FIELDS = ('title', 'slug', 'summary', 'published_at', 'created_at', 'updated_at', 'author__name', 'category__name')
+
+
+def full_content():
+    return getattr(settings, 'FEED_FULL_CONTENT', False)
+
+
+class ArticleFeed(Feed):
+    """RSS feed of the newest published articles; subclasses narrow get_articles()."""
+
+    @classmethod
+    def as_view(cls):
+        return cache_public_response(replica_reads(cls()))
+
+    def __call__(self, request, *args, **kwargs):
+        if not is_conditional_request(request):
+            return super().__call__(request, *args, **kwargs)
+        last_modified, state = content_validators()
+        return conditional_response(
+            request,
+            last_modified,
+            (state, full_content()),
+            lambda: super(ArticleFeed, self).__call__(request, *args, **kwargs),
+        )
+
+    def get_articles(self, slug):
+        """The published articles of the feed, without looking up the feed object."""
+        return published_articles()
+
+    def title(self, obj):
+        return SITE_TITLE
+
+    def description(self, obj):
+        return f'Latest articles from {SITE_TITLE}'
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+    def link(self, obj):
+        return reverse('articles:list')
+
+    def items(self, obj):
+        fields = ITEM_FIELDS + ('content_html',) if full_content() else ITEM_FIELDS
+        return self.get_articles(obj.slug if obj else None).select_related(
+            'author', 'category'
+        ).only(*fields).order_by('-published_at', '-created_at', '-id')[:getattr(settings, 'FEED_ITEMS', 20)]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.content_html if full_content() else item.summary
+
+    def item_pubdate(self, item):
+        return item.published_at or item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return item.author.name
+
+    def item_categories(self, item):
+        return (item.category.name,)
+
+
+class CategoryFeed(ArticleFeed):
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Category, slug=slug, is_active=True)
+
+    def get_articles(self, slug):
+        return published_articles().filter(category__slug=slug, category__is_active=True)
+
+    def title(self, obj):
+        return f'{obj.name} - {SITE_TITLE}'
+
+    def description(self, obj):
+        return obj.description or f'Latest articles in {obj.name}'
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+
+class AuthorFeed(ArticleFeed):
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Author, slug=slug, is_active=True)
+
+    def get_articles(self, slug):
+        return published_articles().filter(author__slug=slug, author__is_active=True)
+
+    def title(self, obj):
+        return f'{obj.name} - {SITE_TITLE}'
+
+    def description(self, obj):
+        return f'Latest articles by {obj.name}'
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+
+class TagFeed(ArticleFeed):
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Tag, slug=slug, is_active=True)
+
+    def get_articles(self, slug):
+        # Semi-join, like the tag pages (articles.views.TagFilterView)
+        through = Article.tags.through.objects.filter(
+            article=OuterRef('pk'), tag__slug=slug, tag__is_active=True
+        )
+        return published_articles().filter(Exists(through))
+
+    def title(self, obj):
+        return f'{obj.name} - {SITE_TITLE}'
+
+    def description(self, obj):
+        return f'Latest articles tagged {obj.name}'
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+
+class AtomArticleFeed(ArticleFeed):
+    feed_type = Atom1Feed
+
+
+class AtomCategoryFeed(CategoryFeed):
+    feed_type = Atom1Feed
+
+
+class AtomAuthorFeed(AuthorFeed):
+    feed_type = Atom1Feed
+
+
+class AtomTagFeed(TagFeed):
+    feed_type = Atom1Feed
@@ -0,0 +1,54 @@
+"""
+Django management command to regenerate the stored article card summaries.
+Usage: python manage.py backfill_summaries [--batch-size 1000] [--only-missing]
+
+Run this after changing Article.SUMMARY_WORDS or after importing articles
+without going through Article.save().
+"""
+from django.core.management.base import BaseCommand
+from articles.models import Article
+from core.cache import bump_content_generation
+
+
+class Command(BaseCommand):
+    help = 'Regenerates the card summary of articles in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of articles loaded and updated per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fill in articles that have no summary yet',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Article.objects.only('pk', 'excerpt', 'content', 'summary').order_by('pk')
+        if options['only_missing']:
+            queryset = queryset.filter(summary='')
+
+        last_pk = 0
+        updated = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            changed = []
+            for article in batch:
+                summary = Article.build_summary(article.excerpt, article.content)
+                if summary != article.summary:
+                    article.summary = summary
+                    changed.append(article)
+            Article.objects.bulk_update(changed, ['summary'])
+            updated += len(changed)
+            last_pk = batch[-1].pk
+
+        if updated:
+            # bulk_update() bypasses the signals that invalidate cached pages
+            bump_content_generation()
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} article summaries.'))
@@ -0,0 +1,90 @@
+"""
+Django management command to measure the cost of article list pages.
+Usage: python manage.py benchmark_list_pages [--repeat 20]
+
+Compares the legacy list query (all article columns, card text produced
+with `truncatewords` on every render) with the current one (large columns
+deferred, precomputed `summary`). For each list page shape it reports the
+bytes fetched from the database and the time spent querying and rendering
+the article cards. Runs against the articles already in the database.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template import engines
+from articles.models import Article, ArticleStatus, Author
+
+LEGACY_CARD = (
+    '{% for article in articles %}{{ article.title }}'
+    '{% if article.excerpt %}{{ article.excerpt }}'
+    '{% else %}{{ article.content|truncatewords:30 }}{% endif %}{% endfor %}'
+)
+CURRENT_CARD = '{% for article in articles %}{{ article.title }}{{ article.summary }}{% endfor %}'
+
+
+def fetched_bytes(queryset):
+    """Total size of the values returned by the queryset's SQL."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return sum(
+            len(str(value).encode())
+            for row in cursor.fetchall()
+            for value in row
+            if value is not None
+        )
+
+
+class Command(BaseCommand):
+    help = 'Measures bytes fetched and render time of article list pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of timed runs per page (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        published = Article.objects.filter(
+            status=ArticleStatus.PUBLISHED,
+            is_active=True
+        ).select_related('author', 'category').order_by('-published_at', '-created_at')
+
+        author = Author.objects.filter(is_active=True).order_by('pk').first()
+        pages = [
+            ('home (15 rows)', lambda qs: qs[:15]),
+            ('list page (10 rows)', lambda qs: qs[:10]),
+        ]
+        if author is not None:
+            pages.append((f'author {author.slug}', lambda qs: qs.filter(author=author)))
+
+        engine = engines['django']
+        variants = [
+            ('legacy', lambda qs: qs, engine.from_string(LEGACY_CARD)),
+            ('current', lambda qs: qs.defer(*Article.LIST_DEFERRED_FIELDS), engine.from_string(CURRENT_CARD)),
+        ]
+
+        self.stdout.write(f'{"page":<28}{"variant":<10}{"rows":>6}{"bytes":>12}{"query ms":>10}{"render ms":>11}')
+        for page_name, shape in pages:
+            for variant_name, prepare, template in variants:
+                queryset = shape(prepare(published))
+                size = fetched_bytes(queryset)
+                query_times = []
+                render_times = []
+                rows = 0
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    articles = list(queryset.all())
+                    query_times.append((time.perf_counter() - start) * 1000)
+                    start = time.perf_counter()
+                    template.render({'articles': articles})
+                    render_times.append((time.perf_counter() - start) * 1000)
+                    rows = len(articles)
+                self.stdout.write(
+                    f'{page_name:<28}{variant_name:<10}{rows:>6}{size:>12}'
+                    f'{statistics.median(query_times):>10.2f}{statistics.median(render_times):>11.2f}'
+                )
@@ -0,0 +1,94 @@
+"""
+Django management command to benchmark the related-articles computation.
+Usage: python manage.py benchmark_related [--articles 50000] [--updates 50]
+
+Seeds a synthetic dataset (see articles.seeding) inside a transaction that
+is rolled back at the end, then times a full recomputation (load, scoring
+and write phases, peak memory of the Python objects) and the incremental
+update of a sample of articles, as the process_related_updates worker runs it.
+"""
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from articles.related import recompute_related_articles, update_related_articles
+from articles.seeding import seed_dataset
+from core.instrumentation import QueryTimer, RequestMetrics
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data."""
+
+
+class Command(BaseCommand):
+    help = 'Seeds a synthetic dataset and times full and incremental related-article computation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=50000, help='Articles to seed (default: 50000)')
+        parser.add_argument('--authors', type=int, default=200, help='Authors to seed (default: 200)')
+        parser.add_argument('--categories', type=int, default=20, help='Categories to seed (default: 20)')
+        parser.add_argument('--tags', type=int, default=1000, help='Tags to seed (default: 1000)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--updates', type=int, default=50, help='Incremental updates to time (default: 50)')
+        parser.add_argument(
+            '--no-tracemalloc',
+            action='store_true',
+            help='Skip measuring peak memory (tracemalloc slows the recomputation down)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Benchmark data rolled back.')
+
+    def run(self, options):
+        started = time.perf_counter()
+        dataset = seed_dataset(
+            articles=options['articles'],
+            authors=options['authors'],
+            categories=options['categories'],
+            tags=options['tags'],
+            seed=options['seed'],
+        )
+        self.stdout.write(f'Seeded {len(dataset.article_ids)} articles in {time.perf_counter() - started:.1f}s')
+
+        if not options['no_tracemalloc']:
+            tracemalloc.start()
+        stats = recompute_related_articles()
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        tracemalloc.stop()
+
+        self.stdout.write(f'\nFull recomputation ({connection.vendor}, {stats["articles"]} published articles)')
+        for phase in ('load', 'score', 'write', 'total'):
+            self.stdout.write(f'  {phase:<6} {stats[f"{phase}_seconds"]:8.2f}s')
+        self.stdout.write(f'  {stats["links"]} links, {stats["terms"]} distinct terms')
+        self.stdout.write(f'  {stats["articles"] / stats["score_seconds"]:,.0f} articles/s scored'
+                          if stats['score_seconds'] else '')
+        if peak is not None:
+            self.stdout.write(f'  peak Python memory {peak / 2 ** 20:,.0f} MiB')
+
+        rng = random.Random(options['seed'])
+        sample = rng.sample(dataset.article_ids, min(options['updates'], len(dataset.article_ids)))
+        timings = []
+        queries = []
+        affected = []
+        for article_id in sample:
+            metrics = RequestMetrics()
+            with connection.execute_wrapper(QueryTimer(metrics)):
+                update_started = time.perf_counter()
+                affected.append(len(update_related_articles(article_id)))
+                timings.append((time.perf_counter() - update_started) * 1000)
+            queries.append(metrics.queries)
+
+        if timings:
+            timings.sort()
+            self.stdout.write(f'\nIncremental update ({len(timings)} articles)')
+            self.stdout.write(f'  p50 {statistics.median(timings):.1f}ms  max {timings[-1]:.1f}ms')
+            self.stdout.write(f'  {statistics.mean(queries):.1f} queries, '
+                              f'{statistics.mean(affected):.1f} other lists refreshed on average')
@@ -0,0 +1,136 @@
+"""
+Django management command to benchmark article search.
+Usage: python manage.py benchmark_search [--sizes 10000 100000] [--repeat 5]
+
+Seeds synthetic articles inside a transaction that is rolled back at the end,
+then times the legacy icontains search against the PostgreSQL full-text
+search backend for a page of results (COUNT + first 10 rows), the same work
+ArticleSearchView does per request.
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from articles.models import Article, ArticleStatus, Author, Category
+from articles.search import (
+    icontains_search,
+    search_articles,
+    supports_full_text_search,
+    update_search_vectors,
+)
+
+VOCABULARY = (
+    'justice equality community education healthcare housing policy reform '
+    'environment climate poverty rights access opportunity advocacy women '
+    'immigration labor wages schools funding organizing grassroots voting '
+    'democracy inclusion discrimination dignity public service transport '
+    'water energy rural urban youth elderly disability culture language'
+).split()
+
+DEFAULT_QUERIES = ['education', 'housing reform', 'climate', 'community organizing', 'zzzz']
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks icontains search against PostgreSQL full-text search'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10000, 100000],
+            help='Article table sizes to benchmark (default: 10000 100000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed runs per query (default: 5)',
+        )
+        parser.add_argument(
+            '--queries',
+            nargs='+',
+            default=DEFAULT_QUERIES,
+            help='Search queries to run',
+        )
+
+    def handle(self, *args, **options):
+        if not supports_full_text_search():
+            self.stdout.write(self.style.WARNING(
+                'Full-text search requires PostgreSQL; only the icontains path will be timed.'
+            ))
+
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self.seed(size)
+                    self.run_size(size, options['queries'], options['repeat'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def seed(self, size):
+        self.stdout.write(f'\nSeeding {size} articles...')
+        rng = random.Random(size)
+        author = Author.objects.create(name='Benchmark Author', slug='benchmark-author-search')
+        category = Category.objects.create(name='Benchmark Search', slug='benchmark-search')
+        now = timezone.now()
+
+        batch = []
+        for i in range(size):
+            words = rng.choices(VOCABULARY, k=rng.randint(300, 1200))
+            batch.append(Article(
+                title=' '.join(rng.choices(VOCABULARY, k=6)).title(),
+                slug=f'benchmark-search-{i}',
+                excerpt=' '.join(rng.choices(VOCABULARY, k=25)),
+                content=' '.join(words),
+                author=author,
+                category=category,
+                status=ArticleStatus.PUBLISHED,
+                published_at=now - timedelta(minutes=i),
+            ))
+            if len(batch) == 2000:
+                Article.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Article.objects.bulk_create(batch)
+
+        update_search_vectors(Article.objects.filter(category=category))
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE articles_article')
+
+    def run_size(self, size, queries, repeat):
+        base = Article.objects.filter(
+            status=ArticleStatus.PUBLISHED,
+            is_active=True
+        ).select_related('author', 'category')
+
+        backends = [('icontains', icontains_search)]
+        if supports_full_text_search():
+            backends.append(('fulltext', search_articles))
+
+        self.stdout.write(f'{"query":<22}{"backend":<12}{"matches":>9}{"median ms":>12}{"max ms":>10}')
+        for query in queries:
+            for name, search in backends:
+                timings = []
+                matches = 0
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    queryset = search(base, query)
+                    matches = queryset.count()
+                    list(queryset[:10])
+                    timings.append((time.perf_counter() - start) * 1000)
+                self.stdout.write(
+                    f'{query:<22}{name:<12}{matches:>9}'
+                    f'{statistics.median(timings):>12.1f}{max(timings):>10.1f}'
+                )
+        self.stdout.write(self.style.SUCCESS(f'Finished benchmark for {size} articles.'))
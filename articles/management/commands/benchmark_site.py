@@ -0,0 +1,236 @@
+"""
+Django management command to benchmark every public route.
+Usage: python manage.py benchmark_site [--articles 2000] [--requests 30]
+                                       [--output benchmark.json] [--compare old.json]
+
+Seeds a synthetic dataset (see articles.seeding) inside a transaction that
+is rolled back at the end (use --keep to commit it), then requests every
+public route of articles/urls.py and config/urls.py through the Django
+test client: home, article list (offset pages), search (full page and HTMX
+partial), category, tag (one and two tags), article detail, author list
+(both sort orders), author detail and a static page. The admin and logout
+are not public pages and are skipped.
+
+For each route it reports p50/p95/p99 latency, queries per request and
+response bytes, and writes the results to a JSON file that can be passed
+to --compare on a later run.
+"""
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from articles.models import Article, Author, Category, Tag
+from articles.seeding import seed_dataset
+from core.cache import get_cache
+from core.instrumentation import QueryTimer, RequestMetrics
+from core.models import StaticPage
+from core.navigation import navigation_cache
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data."""
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Seeds a synthetic dataset and measures latency, queries and size of every public route'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=2000, help='Articles to seed (default: 2000)')
+        parser.add_argument('--authors', type=int, default=50, help='Authors to seed (default: 50)')
+        parser.add_argument('--categories', type=int, default=12, help='Categories to seed (default: 12)')
+        parser.add_argument('--tags', type=int, default=200, help='Tags to seed (default: 200)')
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Zipf exponent of author/category/tag popularity (default: 1.1)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=30,
+            help='Timed requests per route (default: 30)',
+        )
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per route (default: 3)')
+        parser.add_argument(
+            '--response-cache',
+            action='store_true',
+            help='Keep the anonymous response cache enabled (default: measure the views)',
+        )
+        parser.add_argument('--output', default='benchmark.json', help='JSON result file (default: benchmark.json)')
+        parser.add_argument('--compare', help='Previous JSON result file to compare with')
+        parser.add_argument('--keep', action='store_true', help='Commit the seeded data instead of rolling it back')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.stdout.write(f"Seeding {options['articles']} articles...")
+                start = time.perf_counter()
+                dataset = seed_dataset(
+                    articles=options['articles'],
+                    authors=options['authors'],
+                    categories=options['categories'],
+                    tags=options['tags'],
+                    zipf_exponent=options['zipf'],
+                    seed=options['seed'],
+                )
+                self.stdout.write(f'Seeded in {time.perf_counter() - start:.1f}s (prefix {dataset.prefix})')
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE')
+
+                # Queries are counted here; the per-request middleware would
+                # only add its own overhead and slow-request log lines
+                with override_settings(
+                    RESPONSE_CACHE_ENABLED=options['response_cache'],
+                    PERFORMANCE_INSTRUMENTATION_ENABLED=False,
+                ):
+                    results = self.run_routes(self.build_routes(dataset, options['seed']), options)
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+        report = {
+            'created': datetime.now(dt_timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'dataset': {
+                key: options[key] for key in ('articles', 'authors', 'categories', 'tags', 'zipf', 'seed')
+            },
+            'requests': options['requests'],
+            'response_cache': options['response_cache'],
+            'routes': results,
+        }
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                self.compare(json.load(fh), report)
+
+    def build_routes(self, dataset, seed):
+        """(name, url, headers) of the requests to time."""
+        rng = random.Random(seed)
+        top_category = Category.objects.get(pk=dataset.category_ids[0])
+        tags = Tag.objects.in_bulk(dataset.tag_ids[:2])
+        top_tag, second_tag = tags[dataset.tag_ids[0]], tags[dataset.tag_ids[1]]
+        top_author = Author.objects.get(pk=dataset.author_ids[0])
+        article = Article.objects.get(pk=rng.choice(dataset.article_ids))
+        page = StaticPage.objects.filter(is_active=True).first()
+        if page is None:
+            page = StaticPage.objects.create(title='Benchmark Page', slug=f'{dataset.prefix}-page', content='Benchmark')
+
+        htmx = {'HX-Request': 'true'}
+        return [
+            ('home', reverse('articles:home'), {}),
+            ('article list', reverse('articles:list'), {}),
+            ('article list page 5', reverse('articles:list') + '?page=5', {}),
+            ('search', reverse('articles:search') + '?q=community', {}),
+            ('search htmx', reverse('articles:search') + '?q=community', htmx),
+            ('category', reverse('articles:category', args=[top_category.slug]), {}),
+            ('tag', reverse('articles:tag', args=[top_tag.slug]), {}),
+            ('two tags', reverse('articles:tag', args=[f'{top_tag.slug}/{second_tag.slug}']), {}),
+            ('article detail', reverse('articles:detail', args=[article.slug]), {}),
+            ('author list', reverse('articles:author_list'), {}),
+            ('author list by articles', reverse('articles:author_list') + '?sort=articles', {}),
+            ('author detail', reverse('articles:author_detail', args=[top_author.slug]), {}),
+            ('static page', reverse('static_page', args=[page.slug]), {}),
+        ]
+
+    def run_routes(self, routes, options):
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+        client = Client(HTTP_HOST=host)
+        get_cache().clear()
+        navigation_cache.invalidate()
+
+        self.stdout.write(
+            f'{"route":<26}{"status":>7}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}{"bytes":>10}'
+        )
+        results = []
+        for name, url, headers in routes:
+            for _ in range(options['warmup']):
+                client.get(url, headers=headers)
+
+            timings = []
+            queries = []
+            size = 0
+            status = None
+            for _ in range(options['requests']):
+                metrics = RequestMetrics()
+                with connection.execute_wrapper(QueryTimer(metrics)):
+                    start = time.perf_counter()
+                    response = client.get(url, headers=headers)
+                    body = b''.join(response.streaming_content) if response.streaming else response.content
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(metrics.queries)
+                size = len(body)
+                status = response.status_code
+
+            timings.sort()
+            result = {
+                'route': name,
+                'url': url,
+                'htmx': bool(headers),
+                'status': status,
+                'p50_ms': round(percentile(timings, 0.50), 2),
+                'p95_ms': round(percentile(timings, 0.95), 2),
+                'p99_ms': round(percentile(timings, 0.99), 2),
+                'mean_ms': round(statistics.fmean(timings), 2),
+                'queries': round(statistics.fmean(queries), 2),
+                'bytes': size,
+            }
+            results.append(result)
+            self.stdout.write(
+                f"{name:<26}{status:>7}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+                f"{result['p99_ms']:>9.1f}{result['queries']:>9.1f}{size:>10}"
+            )
+        return results
+
+    def compare(self, previous, current):
+        self.stdout.write(
+            f"\nCompared with {previous.get('revision') or 'previous run'} ({previous.get('created', '?')}):"
+        )
+        self.stdout.write(f'{"route":<26}{"p50 ms":>16}{"p95 ms":>16}{"queries":>14}')
+        before = {result['route']: result for result in previous.get('routes', [])}
+        for result in current['routes']:
+            old = before.get(result['route'])
+            if old is None:
+                self.stdout.write(f"{result['route']:<26}{'(new route)':>16}")
+                continue
+            self.stdout.write(
+                f"{result['route']:<26}"
+                f"{old['p50_ms']:>7.1f} → {result['p50_ms']:<6.1f}"
+                f"{old['p95_ms']:>7.1f} → {result['p95_ms']:<6.1f}"
+                f"{old['queries']:>5.1f} → {result['queries']:<6.1f}"
+            )
@@ -0,0 +1,61 @@
+"""
+Django management command to change the status of many articles at once.
+Usage: python manage.py change_article_status published|draft|archived
+           [--from-status draft] [--category slug] [--author slug] [--tag slug]
+           [--ids 1,2,3] [--limit 10000]
+
+The selected articles are changed with one UPDATE (articles.transitions);
+counters and the response cache are refreshed in one batch afterwards, and
+the related-article updates are queued for the process_related_updates
+worker. Prints the number of changed articles and the timings.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from articles.models import Article, ArticleStatus
+from articles.transitions import change_status
+
+
+class Command(BaseCommand):
+    help = 'Changes the status of the selected articles with one set-based UPDATE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('status', choices=ArticleStatus.values, help='New status')
+        parser.add_argument('--from-status', choices=ArticleStatus.values, help='Only articles with this status')
+        parser.add_argument('--category', help='Only articles of this category (slug)')
+        parser.add_argument('--author', help='Only articles of this author (slug)')
+        parser.add_argument('--tag', help='Only articles with this tag (slug)')
+        parser.add_argument('--ids', help='Only these article ids, comma separated')
+        parser.add_argument('--limit', type=int, help='At most this many articles, oldest first')
+
+    def handle(self, *args, **options):
+        articles = Article.objects.all()
+        if options['from_status']:
+            articles = articles.filter(status=options['from_status'])
+        if options['category']:
+            articles = articles.filter(category__slug=options['category'])
+        if options['author']:
+            articles = articles.filter(author__slug=options['author'])
+        if options['tag']:
+            articles = articles.filter(pk__in=Article.tags.through.objects.filter(
+                tag__slug=options['tag']
+            ).values('article_id'))
+        if options['ids']:
+            try:
+                articles = articles.filter(pk__in=[int(pk) for pk in options['ids'].split(',')])
+            except ValueError:
+                raise CommandError('--ids must be a comma separated list of numbers.')
+        if options['limit']:
+            articles = Article.objects.filter(
+                pk__in=articles.exclude(status=options['status']).order_by('pk').values('pk')[:options['limit']]
+            )
+
+        stats = change_status(articles, options['status'])
+        self.stdout.write(
+            f'Selected in {stats["select_seconds"] * 1000:.0f} ms, updated in {stats["update_seconds"] * 1000:.0f} ms, '
+            f'refreshed counters and caches in {stats["refresh_seconds"] * 1000:.0f} ms'
+        )
+        self.stdout.write(
+            f'Queued the related articles of {stats["related_queued"]} articles for process_related_updates'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Changed {stats["articles"]} articles to {options["status"]} in {stats["total_seconds"]:.2f}s.'
+        ))
@@ -1,12 +1,21 @@
 """
 Django management command to create dummy data for testing.
 Usage: python manage.py create_dummy_data
+       python manage.py create_dummy_data --bulk --articles 100000 [--batch-size 1000]
+
+--bulk writes authors and articles with batched bulk_create through
+articles.bulk.ArticleBulkLoader (slugs allocated per batch, tags written
+straight to the through-table) and reports rows/sec; use it for seeding
+load tests.
 """
+import random
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.text import slugify
 from datetime import timedelta
+from articles.bulk import ArticleBulkLoader, SlugAllocator
 from articles.models import Article, ArticleStatus, Author, Category, Tag
 
 
@@ -26,6 +35,17 @@ class Command(BaseCommand):
             default=5,
             help='Number of authors to create (default: 5)',
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Insert with batched bulk_create (fast, for large datasets)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk_create batch with --bulk (default: 1000)',
+        )
 
     def handle(self, *args, **options):
         num_articles = options['articles']
@@ -75,35 +95,38 @@ class Command(BaseCommand):
             'Robert Brown'
         ]
         
-        for i in range(num_authors):
-            if i < len(author_names):
-                author_name = author_names[i]
-            else:
-                author_name = f'Author {i+1}'
+        if options['bulk']:
+            authors = self.create_authors_bulk(num_authors, author_names, options['batch_size'])
+        else:
+            for i in range(num_authors):
+                if i < len(author_names):
+                    author_name = author_names[i]
+                else:
+                    author_name = f'Author {i+1}'
             
-            # Create unique slug
-            base_slug = slugify(author_name)
-            slug = base_slug
-            counter = 1
-            while Author.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
+                # Create unique slug
+                base_slug = slugify(author_name)
+                slug = base_slug
+                counter = 1
+                while Author.objects.filter(slug=slug).exists():
+                    slug = f"{base_slug}-{counter}"
+                    counter += 1
             
-            author, created = Author.objects.get_or_create(
-                slug=slug,
-                defaults={
-                    'name': author_name,
-                    'bio': f'{author_name} is a dedicated writer and advocate for social justice, with expertise in community organizing and policy analysis.',
-                    'is_active': True,
-                }
-            )
+                author, created = Author.objects.get_or_create(
+                    slug=slug,
+                    defaults={
+                        'name': author_name,
+                        'bio': self.author_bio(author_name),
+                        'is_active': True,
+                    }
+                )
             
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created author: {author.name}'))
-            else:
-                self.stdout.write(self.style.WARNING(f'Author already exists: {author.name}'))
+                if created:
+                    self.stdout.write(self.style.SUCCESS(f'Created author: {author.name}'))
+                else:
+                    self.stdout.write(self.style.WARNING(f'Author already exists: {author.name}'))
             
-            authors.append(author)
+                authors.append(author)
 
         # Sample article titles and content
         article_data = [
@@ -307,6 +330,12 @@ By approaching immigration through a social justice framework, we can work towar
         statuses = [ArticleStatus.PUBLISHED, ArticleStatus.PUBLISHED, ArticleStatus.PUBLISHED, 
                    ArticleStatus.DRAFT, ArticleStatus.ARCHIVED]
         
+        if options['bulk']:
+            self.create_articles_bulk(
+                num_articles, article_data, statuses, authors, default_category, tags, options['batch_size']
+            )
+            return
+
         created_count = 0
         for i in range(num_articles):
             # Cycle through article data
@@ -334,7 +363,6 @@ By approaching immigration through a social justice framework, we can work towar
             )
             
             # Add random tags to article
-            import random
             random_tags = random.sample(tags, k=random.randint(0, min(len(tags), 3)))
             article.tags.set(random_tags)
             
@@ -358,3 +386,49 @@ By approaching immigration through a social justice framework, we can work towar
             '- Test search functionality with various keywords'
         ))
 
+
+    def author_bio(self, author_name):
+        return (
+            f'{author_name} is a dedicated writer and advocate for social justice, '
+            'with expertise in community organizing and policy analysis.'
+        )
+
+    def create_authors_bulk(self, num_authors, author_names, batch_size):
+        names = [author_names[i] if i < len(author_names) else f'Author {i+1}' for i in range(num_authors)]
+        slugs = SlugAllocator(Author).allocate_many(names, fallback='author')
+        authors = [
+            Author(name=author_name, slug=slug, bio=self.author_bio(author_name))
+            for author_name, slug in zip(names, slugs)
+        ]
+        authors = Author.objects.bulk_create(authors, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Created {len(authors)} authors'))
+        return authors
+
+    def create_articles_bulk(self, num_articles, article_data, statuses, authors, category, tags, batch_size):
+        tag_ids = [tag.pk for tag in tags]
+        now = timezone.now()
+
+        def report(loader):
+            self.stdout.write(f'  {loader.created} articles ({loader.rate:,.0f} rows/s)')
+
+        with ArticleBulkLoader(batch_size=batch_size, on_batch=report) as loader:
+            for i in range(num_articles):
+                article_info = article_data[i % len(article_data)]
+                status = statuses[i % len(statuses)]
+                loader.add(
+                    Article(
+                        title=f"{article_info['title']} {i+1 if i >= len(article_data) else ''}".strip(),
+                        content=article_info['content'],
+                        excerpt=article_info['excerpt'],
+                        author=authors[i % len(authors)],
+                        category=category,
+                        status=status,
+                        published_at=now - timedelta(days=i * 3) if status == ArticleStatus.PUBLISHED else None,
+                    ),
+                    tag_ids=random.sample(tag_ids, k=random.randint(0, min(len(tag_ids), 3))),
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nSuccessfully created {loader.created} articles and {loader.tag_links} tag links '
+            f'in {loader.elapsed:.1f}s ({loader.rate:,.0f} rows/s)'
+        ))
@@ -0,0 +1,77 @@
+"""
+Django management command to generate the author photo thumbnails.
+Usage: python manage.py generate_author_thumbnails [--processes 4] [--force]
+
+Authors whose thumbnails are missing or belong to an older photo are
+processed in parallel worker processes (image decoding and encoding is
+CPU-bound); the database is only written by this process. New uploads get
+their thumbnails on save, so this is needed once for existing photos and
+after changing THUMBNAIL_SIZES/THUMBNAIL_FORMATS (--force).
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from articles.models import Author
+from articles.thumbnails import render_thumbnails
+from core.cache import bump_content_generation
+
+
+def render_or_error(photo_name):
+    """Worker: returns (photo_name, error message or None)."""
+    try:
+        render_thumbnails(photo_name)
+    except (OSError, ValueError) as exc:
+        return photo_name, str(exc)
+    return photo_name, None
+
+
+class Command(BaseCommand):
+    help = 'Generates missing author photo thumbnails using several processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate the thumbnails of every author with a photo',
+        )
+
+    def handle(self, *args, **options):
+        authors = Author.objects.exclude(photo='').exclude(photo__isnull=True)
+        if not options['force']:
+            authors = authors.exclude(photo_thumbnails_for=F('photo'))
+        photos = list(authors.order_by().values_list('photo', flat=True).distinct())
+        if not photos:
+            self.stdout.write(self.style.SUCCESS('All author thumbnails are up to date.'))
+            return
+
+        started = time.perf_counter()
+        done = failed = 0
+        # Workers run django.setup() themselves when they are spawned rather than forked
+        with ProcessPoolExecutor(max_workers=options['processes'], initializer=django.setup) as executor:
+            futures = [executor.submit(render_or_error, photo_name) for photo_name in photos]
+            for future in as_completed(futures):
+                photo_name, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f'  {photo_name}: {error}')
+                    continue
+                Author.objects.filter(photo=photo_name).update(photo_thumbnails_for=photo_name)
+                done += 1
+
+        # Author pages now link the thumbnails; update() bypasses the signals
+        bump_content_generation()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated thumbnails for {done} photos in {elapsed:.1f}s '
+            f'({options["processes"]} processes, {failed} failed)'
+        ))
@@ -0,0 +1,24 @@
+"""
+Django management command to rebuild the sitemap files.
+Usage: python manage.py generate_sitemaps
+
+Writes sitemap.xml and its sitemap-<section>-<n>.xml files into
+SITEMAP_ROOT (see articles.sitemaps). Run it after deploys and bulk
+imports, and from cron more often than SITEMAP_MAX_AGE, so that crawlers
+see new URLs right away and no request finds the files stale (the views
+would then rebuild them in a background thread).
+"""
+from django.core.management.base import BaseCommand
+from articles.sitemaps import get_sitemap_root, write_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the precomputed XML sitemaps'
+
+    def handle(self, *args, **options):
+        stats = write_sitemaps()
+        seconds = stats.pop('seconds')
+        files = ', '.join(f'{section}: {count}' for section, count in stats.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {sum(stats.values())} sitemap files to {get_sitemap_root()} in {seconds:.1f}s ({files}).'
+        ))
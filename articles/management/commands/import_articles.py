@@ -0,0 +1,177 @@
+"""
+Django management command to import articles from JSON Lines or CSV files.
+Usage: python manage.py import_articles articles.jsonl [more files...] [--batch-size 1000]
+       python manage.py import_articles export.csv --format csv
+       python manage.py import_articles - --format jsonl < articles.jsonl
+
+Files are streamed row by row into articles.bulk.ArticleBulkLoader, so
+memory use does not depend on the file size. Each row is an object with:
+
+    title       required
+    content     required
+    excerpt     optional
+    slug        optional, made unique (defaults to the title)
+    author      required, author name (created if missing)
+    category    required, category name (created if missing)
+    tags        optional, list of tag names (CSV: separated by "|")
+    status      optional, draft/published/archived (default: published)
+    published_at optional, ISO 8601 date/time
+
+Authors, categories and tags are resolved through in-memory lookups built
+once, so the import runs one bulk insert per batch rather than queries per
+row. Values longer than their model field (title, excerpt, author, category
+and tag names) are reported as errors of their row, before anything of the
+row is written.
+"""
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+from articles.bulk import ArticleBulkLoader, SlugAllocator
+from articles.models import Article, ArticleStatus, Author, Category, Tag
+
+
+class Lookup:
+    """Name -> pk map of a model, creating missing rows on first use."""
+
+    def __init__(self, model):
+        self.model = model
+        self.by_name = {}
+        self.by_slug = {}
+        for pk, name, slug in model.objects.values_list('pk', 'name', 'slug'):
+            self.by_name[name] = self.by_slug[slug] = pk
+        self.slugs = SlugAllocator(model)
+        self.max_length = model._meta.get_field('name').max_length
+        self.created = 0
+
+    def validate(self, name):
+        """Raise ValueError if the name does not fit the name column."""
+        name = name.strip()
+        if len(name) > self.max_length:
+            raise ValueError(
+                f'{self.model._meta.verbose_name} name "{name[:self.max_length]}..." '
+                f'is longer than {self.max_length} characters'
+            )
+
+    def get(self, name):
+        name = name.strip()
+        pk = self.by_name.get(name) or self.by_slug.get(slugify(name))
+        if pk is None:
+            obj = self.model.objects.create(name=name, slug=self.slugs.allocate(name))
+            pk = self.by_name[name] = self.by_slug[obj.slug] = obj.pk
+            self.created += 1
+        return pk
+
+
+def read_rows(path, file_format):
+    """Yield (line number, row) for every row of the file."""
+    stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if file_format == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                row['tags'] = [tag for tag in (row.get('tags') or '').split('|') if tag.strip()]
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as exc:
+                    raise CommandError(f'{path}:{line_number}: invalid JSON: {exc}')
+                if not isinstance(row, dict):
+                    raise CommandError(f'{path}:{line_number}: expected a JSON object')
+                yield line_number, row
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+class Command(BaseCommand):
+    help = 'Imports articles from JSON Lines or CSV files in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files to import ("-" reads standard input)')
+        parser.add_argument(
+            '--format',
+            choices=['jsonl', 'csv'],
+            help='Input format (default: from the file extension, jsonl for stdin)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Articles per bulk_create batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        authors = Lookup(Author)
+        categories = Lookup(Category)
+        tags = Lookup(Tag)
+        statuses = set(ArticleStatus.values)
+
+        def report(loader):
+            self.stdout.write(f'  {loader.created} articles ({loader.rate:,.0f} rows/s)')
+
+        with ArticleBulkLoader(batch_size=options['batch_size'], on_batch=report) as loader:
+            for path in options['paths']:
+                file_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+                for line_number, row in read_rows(path, file_format):
+                    try:
+                        article, tag_ids, slug = self.build_article(row, authors, categories, tags, statuses)
+                    except (KeyError, ValueError) as exc:
+                        raise CommandError(f'{path}:{line_number}: {exc}')
+                    # An explicit slug is kept as the base of the unique slug
+                    loader.add(article, tag_ids=tag_ids, slug_base=slug)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {loader.created} articles and {loader.tag_links} tag links '
+            f'in {loader.elapsed:.1f}s ({loader.rate:,.0f} rows/s); created '
+            f'{authors.created} authors, {categories.created} categories, {tags.created} tags'
+        ))
+
+    def build_article(self, row, authors, categories, tags, statuses):
+        for field in ('title', 'content', 'author', 'category'):
+            if not row.get(field):
+                raise ValueError(f'missing "{field}"')
+        for field in ('title', 'content', 'excerpt', 'slug', 'author', 'category', 'status', 'published_at'):
+            if row.get(field) is not None and not isinstance(row[field], str):
+                raise ValueError(f'"{field}" must be a string')
+        tag_names = row.get('tags') or []
+        if not isinstance(tag_names, list) or not all(isinstance(name, str) for name in tag_names):
+            raise ValueError('"tags" must be a list of names')
+        for field in ('title', 'excerpt'):
+            max_length = Article._meta.get_field(field).max_length
+            if len(row.get(field) or '') > max_length:
+                raise ValueError(f'"{field}" is longer than {max_length} characters')
+        authors.validate(row['author'])
+        categories.validate(row['category'])
+        for name in tag_names:
+            tags.validate(name)
+        status = row.get('status') or ArticleStatus.PUBLISHED
+        if status not in statuses:
+            raise ValueError(f'unknown status "{status}"')
+
+        published_at = None
+        if row.get('published_at'):
+            published_at = parse_datetime(row['published_at'])
+            if published_at is None:
+                raise ValueError(f'invalid published_at "{row["published_at"]}"')
+            if timezone.is_naive(published_at):
+                published_at = timezone.make_aware(published_at)
+
+        article = Article(
+            title=row['title'],
+            content=row['content'],
+            excerpt=row.get('excerpt') or '',
+            author_id=authors.get(row['author']),
+            category_id=categories.get(row['category']),
+            status=status,
+            published_at=published_at,
+        )
+        return article, [tags.get(name) for name in tag_names if name.strip()], row.get('slug')
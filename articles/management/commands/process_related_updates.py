@@ -0,0 +1,53 @@
+"""
+Django management command to apply the queued related-article updates.
+Usage: python manage.py process_related_updates [--interval 10] [--batch-size 100]
+
+Saving an article only queues its related-article update (articles.related);
+this command works the queue off, outside the web processes. Without
+--interval it empties the queue once and exits (cron); with --interval it
+keeps running and looks for new entries every that many seconds (the worker
+service in docker-compose.yml).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from articles.models import PendingRelatedUpdate
+from articles.related import UPDATE_BATCH_SIZE, process_pending_updates
+
+
+class Command(BaseCommand):
+    help = 'Applies the queued related-article updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Keep running and poll the queue every this many seconds',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=UPDATE_BATCH_SIZE,
+            help=f'Queue entries applied per batch (default: {UPDATE_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['interval'] is None:
+            self.process(options['batch_size'])
+            return
+        while True:
+            close_old_connections()
+            if PendingRelatedUpdate.objects.exists():
+                self.process(options['batch_size'])
+            time.sleep(options['interval'])
+
+    def process(self, batch_size):
+        started = time.perf_counter()
+        updated = process_pending_updates(batch_size)
+        left = PendingRelatedUpdate.objects.count()
+        if left:
+            self.stdout.write(f'{left} queued updates are being applied by another process.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the related articles of {updated} articles in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,45 @@
+"""
+Django management command to recompute the stored article search vectors.
+Usage: python manage.py rebuild_search_index [--batch-size 5000]
+
+Run this after changing SEARCH_CONFIG or the search vector weights.
+"""
+from django.core.management.base import BaseCommand
+from articles.models import Article
+from articles.search import supports_full_text_search, update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the full-text search vector for all articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of articles updated per UPDATE statement (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        if not supports_full_text_search():
+            self.stdout.write(self.style.WARNING(
+                'Full-text search requires PostgreSQL; nothing to rebuild.'
+            ))
+            return
+
+        batch_size = options['batch_size']
+        last_pk = 0
+        total = 0
+        while True:
+            pks = list(
+                Article.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            total += update_search_vectors(Article.objects.filter(pk__in=pks))
+            last_pk = pks[-1]
+            self.stdout.write(f'Updated {total} articles...')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search vectors for {total} articles.'))
@@ -0,0 +1,31 @@
+"""
+Django management command to rebuild the related articles of every article.
+Usage: python manage.py recompute_related_articles [--batch-size 2000]
+
+Articles are related incrementally when they are published or edited (see
+articles.related); run this after bulk imports (bulk_create bypasses the
+signals) and periodically, e.g. nightly, so that the TF-IDF weights follow
+the whole corpus.
+"""
+from django.core.management.base import BaseCommand
+from articles.related import BATCH_SIZE, recompute_related_articles
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the related articles, term vectors and term statistics of all published articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Rows fetched and inserted per batch (default: {BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        stats = recompute_related_articles(batch_size=options['batch_size'])
+        self.stdout.write(
+            f'Loaded {stats["articles"]} articles ({stats["terms"]} distinct terms) in {stats["load_seconds"]:.1f}s, '
+            f'scored in {stats["score_seconds"]:.1f}s, wrote {stats["links"]} links in {stats["write_seconds"]:.1f}s'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Related articles recomputed in {stats["total_seconds"]:.1f}s.'))
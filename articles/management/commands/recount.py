@@ -0,0 +1,22 @@
+"""
+Django management command to recompute the published-article counters.
+Usage: python manage.py recount
+
+Counters on Author, Category and Tag are maintained incrementally by
+signals; run this after bulk imports or raw SQL changes to fix any drift.
+"""
+from django.core.management.base import BaseCommand
+from articles.counters import recount_published_articles
+from core.cache import bump_content_generation
+
+
+class Command(BaseCommand):
+    help = 'Recomputes published article counters for authors, categories and tags'
+
+    def handle(self, *args, **options):
+        updated = recount_published_articles()
+        # Counters are shown on public pages and UPDATE bypasses signals
+        bump_content_generation()
+        for model_name, rows in updated.items():
+            self.stdout.write(f'Recounted {rows} {model_name} rows')
+        self.stdout.write(self.style.SUCCESS('Counters are up to date.'))
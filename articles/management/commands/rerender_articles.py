@@ -0,0 +1,86 @@
+"""
+Django management command to re-render the stored article bodies.
+Usage: python manage.py rerender_articles [--processes 4] [--batch-size 500] [--force]
+
+Articles whose content_html was produced by an older renderer (see
+articles.rendering.RENDERER_VERSION) are rendered again. This process reads
+the bodies in primary-key batches and writes the results with bulk_update;
+the rendering itself runs in parallel worker processes. With nothing to do
+it costs a single query, so it can run on every deploy after migrate.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from articles.models import Article
+from articles.rendering import RENDERER_VERSION, render_content
+from core.cache import bump_content_generation
+
+
+class Command(BaseCommand):
+    help = 'Re-renders article content HTML, word counts and reading times in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Articles loaded and updated per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render every article, not only outdated ones',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Article.objects.order_by('pk')
+        if not options['force']:
+            queryset = queryset.exclude(content_renderer_version=RENDERER_VERSION)
+        if not queryset.exists():
+            self.stdout.write(self.style.SUCCESS(f'All articles are rendered with version {RENDERER_VERSION}.'))
+            return
+
+        batch_size = options['batch_size']
+        processes = options['processes']
+        started = time.perf_counter()
+        updated = 0
+        last_pk = 0
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            while True:
+                batch = list(queryset.filter(pk__gt=last_pk).values_list('pk', 'content')[:batch_size])
+                if not batch:
+                    break
+                # The HTML changes, so updated_at moves too (HTTP validators, core.conditional)
+                now = timezone.now()
+                articles = []
+                chunksize = max(1, len(batch) // (processes * 4))
+                rendered = executor.map(render_content, [content for _, content in batch], chunksize=chunksize)
+                for (pk, _), (html, word_count, reading_time) in zip(batch, rendered):
+                    articles.append(Article(
+                        pk=pk,
+                        content_html=html,
+                        word_count=word_count,
+                        reading_time=reading_time,
+                        content_renderer_version=RENDERER_VERSION,
+                        updated_at=now,
+                    ))
+                Article.objects.bulk_update(articles, [*Article.RENDERED_FIELDS, 'updated_at'])
+                updated += len(articles)
+                last_pk = batch[-1][0]
+                self.stdout.write(f'  {updated} articles ({updated / (time.perf_counter() - started):,.0f}/s)')
+
+        # bulk_update() bypasses the signals that invalidate cached pages
+        bump_content_generation()
+        self.stdout.write(self.style.SUCCESS(
+            f'Re-rendered {updated} articles with version {RENDERER_VERSION} '
+            f'in {time.perf_counter() - started:.1f}s ({processes} processes).'
+        ))
@@ -0,0 +1,53 @@
+# Add a stored, weighted search vector to Article with a GIN index (PostgreSQL only).
+# The backfill commits one batch at a time and the index is built without
+# locking the table (CREATE INDEX CONCURRENTLY cannot run in a transaction)
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Max
+
+from core.operations import PostgresOnlyAddIndexConcurrently
+
+BATCH_SIZE = 1000
+
+
+def populate_search_vectors(apps, schema_editor):
+    """Compute the search vector for existing articles in batches of primary keys."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Article = apps.get_model('articles', 'Article')
+    articles = Article.objects.using(schema_editor.connection.alias)
+    config = getattr(settings, 'SEARCH_CONFIG', 'english')
+    search_vector = (
+        SearchVector('title', weight='A', config=config) +
+        SearchVector('excerpt', weight='B', config=config) +
+        SearchVector('content', weight='C', config=config)
+    )
+    max_pk = articles.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+    for start in range(0, max_pk, BATCH_SIZE):
+        articles.filter(pk__gt=start, pk__lte=start + BATCH_SIZE).update(search_vector=search_vector)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('articles', '0007_finalize_author_migration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+        PostgresOnlyAddIndexConcurrently(
+            model_name='article',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='articles_search_vector_gin'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Add a stored card summary to Article so list pages can defer the content column
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+SUMMARY_WORDS = 30
+BATCH_SIZE = 1000
+
+
+def populate_summaries(apps, schema_editor):
+    """Generate summaries for existing articles in batches."""
+    Article = apps.get_model('articles', 'Article')
+    queryset = Article.objects.using(schema_editor.connection.alias).only('pk', 'excerpt', 'content')
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        for article in batch:
+            article.summary = article.excerpt or Truncator(article.content).words(SUMMARY_WORDS, truncate=' …')
+        Article.objects.using(schema_editor.connection.alias).bulk_update(batch, ['summary'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0008_article_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='summary',
+            field=models.TextField(blank=True, editable=False, help_text='Card text for article lists, generated from the excerpt or content on save'),
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
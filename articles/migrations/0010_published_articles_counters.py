@@ -0,0 +1,72 @@
+# Add stored published-article counters to Author, Category and Tag
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    """Compute the initial counters with one UPDATE per model."""
+    alias = schema_editor.connection.alias
+    Article = apps.get_model('articles', 'Article')
+    published = Article.objects.using(alias).filter(status='published', is_active=True)
+    through = Article.tags.through
+
+    def count(queryset, group_field):
+        return Coalesce(
+            Subquery(queryset.order_by().values(group_field).annotate(total=Count('pk')).values('total')[:1]),
+            Value(0),
+        )
+
+    apps.get_model('articles', 'Author').objects.using(alias).update(
+        published_articles_count=count(published.filter(author=OuterRef('pk')), 'author')
+    )
+    apps.get_model('articles', 'Category').objects.using(alias).update(
+        published_articles_count=count(published.filter(category=OuterRef('pk')), 'category')
+    )
+    apps.get_model('articles', 'Tag').objects.using(alias).update(
+        published_articles_count=count(
+            through.objects.using(alias).filter(
+                tag=OuterRef('pk'), article__status='published', article__is_active=True
+            ),
+            'tag',
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0009_article_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='published_articles_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of published articles (maintained automatically)'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='published_articles_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of published articles (maintained automatically)'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='published_articles_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of published articles (maintained automatically)'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['-published_articles_count', 'name'], name='articles_au_publish_8fe641_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['-published_articles_count', 'name'], name='articles_ca_publish_3ab5e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-published_articles_count', 'name'], name='articles_ta_publish_3e9846_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Partial indexes for the public article listings, built without locking the
+# tables on PostgreSQL (CREATE INDEX CONCURRENTLY cannot run in a transaction)
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrentlyIfSupported
+
+TAG_INDEX_NAME = 'articles_article_tags_tag_article_idx'
+
+
+def create_tag_index(apps, schema_editor):
+    """
+    Index the tag -> article direction of the auto-created through-table,
+    which has no model Meta to declare it on. Tag filters look up articles
+    by tag_id and can answer from this index alone.
+    """
+    through = apps.get_model('articles', 'Article').tags.through
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently}IF NOT EXISTS {schema_editor.quote_name(TAG_INDEX_NAME)} '
+        f'ON {schema_editor.quote_name(through._meta.db_table)} (tag_id, article_id)'
+    )
+
+
+def drop_tag_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {schema_editor.quote_name(TAG_INDEX_NAME)}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('articles', '0010_published_articles_counters'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='article',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'published')), fields=['-published_at', '-created_at', '-id'], name='article_published_feed_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='article',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'published')), fields=['category', '-published_at', '-created_at', '-id'], name='article_published_category_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='article',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'published')), fields=['author', '-published_at', '-created_at', '-id'], name='article_published_author_idx'),
+        ),
+        migrations.RunPython(create_tag_index, drop_tag_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0011_published_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='photo_thumbnails_for',
+            field=models.CharField(blank=True, editable=False, help_text='Photo the thumbnails were generated for (see articles.thumbnails)', max_length=100),
+        ),
+    ]
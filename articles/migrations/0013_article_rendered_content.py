@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0012_author_photo_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, help_text='Sanitized HTML of the content, rendered on save (see articles.rendering)'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='content_renderer_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='articles.rendering.RENDERER_VERSION that produced content_html (0: not rendered)'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Minutes'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Partial index for the incremental sync of the JSON API, built without
+# locking the table on PostgreSQL
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('articles', '0014_related_articles'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='article',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'published')), fields=['updated_at', 'id'], name='article_published_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0015_article_published_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRelatedUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article_id', models.BigIntegerField()),
+                ('refresh_only', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:06
+
+from django.db import migrations
+
+
+def forget_rendered_thumbnails(apps, schema_editor):
+    """
+    Thumbnail names now keep the photo's extension (articles.thumbnails),
+    so the files rendered under the old names are not found. Until
+    generate_author_thumbnails has rendered them again, author pages fall
+    back to the original photo.
+    """
+    Author = apps.get_model('articles', 'Author')
+    Author.objects.exclude(photo_thumbnails_for='').update(photo_thumbnails_for='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0016_pending_related_updates'),
+    ]
+
+    operations = [
+        migrations.RunPython(forget_rendered_thumbnails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0017_rename_author_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='related_updated_at',
+            field=models.DateTimeField(editable=False, help_text='Last change of the related articles list, emptying it included (see articles.related)', null=True),
+        ),
+    ]
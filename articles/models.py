@@ -1,7 +1,18 @@
+import logging
+
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
-from django.utils.text import slugify
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.urls import reverse
+from django.utils.text import Truncator, slugify
 from core.models import BaseModel
+from .rendering import RENDERER_VERSION, render_content
+from .search import update_search_vectors
+from .thumbnails import delete_thumbnails, render_thumbnails
+
+logger = logging.getLogger(__name__)
 
 
 class ArticleStatus(models.TextChoices):
@@ -20,21 +31,63 @@ class Author(BaseModel):
     bio = models.TextField(blank=True, help_text="Author biography or description")
     photo = models.ImageField(upload_to='authors/', blank=True, null=True, help_text="Author photo/avatar")
     contact_info = models.TextField(blank=True, help_text="Contact information (optional)")
+    photo_thumbnails_for = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        help_text="Photo the thumbnails were generated for (see articles.thumbnails)"
+    )
+    published_articles_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of published articles (maintained automatically)"
+    )
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-published_articles_count', 'name']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def get_absolute_url(self):
+        return reverse('articles:author_detail', args=[self.slug])
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+        self.update_thumbnails()
+
+    def update_thumbnails(self):
+        """Render the photo thumbnails if the photo changed since the last time."""
+        photo_name = self.photo.name if self.photo else ''
+        if photo_name == self.photo_thumbnails_for:
+            return
+        # Another author may have been given the same photo file
+        old_photo = self.photo_thumbnails_for
+        if old_photo and not Author.objects.filter(photo_thumbnails_for=old_photo).exclude(pk=self.pk).exists():
+            delete_thumbnails(old_photo)
+        if photo_name:
+            try:
+                render_thumbnails(photo_name)
+            except (OSError, ValueError):
+                # The template falls back to the original photo
+                logger.exception('Could not render the thumbnails of %s', photo_name)
+                photo_name = ''
+        self.photo_thumbnails_for = photo_name
+        # update() keeps this bookkeeping out of the save signals
+        Author.objects.filter(pk=self.pk).update(photo_thumbnails_for=photo_name)
+
+    @property
+    def has_photo_thumbnails(self):
+        return bool(self.photo) and self.photo.name == self.photo_thumbnails_for
 
     def get_articles_count(self):
         """Return the count of published articles by this author."""
-        return self.articles.filter(status=ArticleStatus.PUBLISHED, is_active=True).count()
+        return self.published_articles_count
 
 
 class Category(BaseModel):
@@ -44,14 +97,25 @@ class Category(BaseModel):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     description = models.TextField(blank=True, help_text="Optional description of the category")
+    published_articles_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of published articles (maintained automatically)"
+    )
 
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-published_articles_count', 'name']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def get_absolute_url(self):
+        return reverse('articles:category', args=[self.slug])
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
@@ -64,13 +128,24 @@ class Tag(BaseModel):
     """
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(max_length=50, unique=True, blank=True)
+    published_articles_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of published articles (maintained automatically)"
+    )
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-published_articles_count', 'name']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def get_absolute_url(self):
+        return reverse('articles:tag', args=[self.slug])
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
@@ -86,6 +161,23 @@ class Article(BaseModel):
     slug = models.SlugField(max_length=200, unique=True, blank=True)
     content = models.TextField()
     excerpt = models.TextField(max_length=500, blank=True, help_text="Short summary for article list")
+    summary = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="Card text for article lists, generated from the excerpt or content on save"
+    )
+    content_html = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="Sanitized HTML of the content, rendered on save (see articles.rendering)"
+    )
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False, help_text="Minutes")
+    content_renderer_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="articles.rendering.RENDERER_VERSION that produced content_html (0: not rendered)"
+    )
     author = models.ForeignKey(Author, on_delete=models.PROTECT, related_name='articles')
     category = models.ForeignKey(
         Category,
@@ -107,18 +199,81 @@ class Article(BaseModel):
         default=ArticleStatus.DRAFT
     )
     published_at = models.DateTimeField(null=True, blank=True, help_text="Publication date")
+    related_updated_at = models.DateTimeField(
+        null=True,
+        editable=False,
+        help_text="Last change of the related articles list, emptying it included (see articles.related)"
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Fields that make up the stored search vector
+    SEARCH_FIELDS = ('title', 'excerpt', 'content')
+    # Number of content words used for the card summary when there is no excerpt
+    SUMMARY_WORDS = 30
+    # Columns written by render_content()
+    RENDERED_FIELDS = ('content_html', 'word_count', 'reading_time', 'content_renderer_version')
+    # Columns that list pages never display (they show the summary instead)
+    LIST_DEFERRED_FIELDS = ('content', 'excerpt', 'content_html', 'search_vector')
+    # Columns the article page never displays (it shows content_html)
+    DETAIL_DEFERRED_FIELDS = ('content', 'search_vector')
 
     class Meta:
         ordering = ['-published_at', '-created_at']
         indexes = [
             models.Index(fields=['status', '-published_at']),
             models.Index(fields=['-published_at']),
+            GinIndex(fields=['search_vector'], name='articles_search_vector_gin'),
+            # Partial indexes covering only the published, active rows that
+            # public pages list, in the order they list them
+            models.Index(
+                fields=['-published_at', '-created_at', '-id'],
+                condition=Q(status=ArticleStatus.PUBLISHED, is_active=True),
+                name='article_published_feed_idx',
+            ),
+            models.Index(
+                fields=['category', '-published_at', '-created_at', '-id'],
+                condition=Q(status=ArticleStatus.PUBLISHED, is_active=True),
+                name='article_published_category_idx',
+            ),
+            models.Index(
+                fields=['author', '-published_at', '-created_at', '-id'],
+                condition=Q(status=ArticleStatus.PUBLISHED, is_active=True),
+                name='article_published_author_idx',
+            ),
+            # Incremental sync of the JSON API (articles.api, ?since=)
+            models.Index(
+                fields=['updated_at', 'id'],
+                condition=Q(status=ArticleStatus.PUBLISHED, is_active=True),
+                name='article_published_updated_idx',
+            ),
         ]
 
     def __str__(self):
         return self.title
 
+    def get_absolute_url(self):
+        return reverse('articles:detail', args=[self.slug])
+
+    @classmethod
+    def build_summary(cls, excerpt, content):
+        """Return the card text: the excerpt, or the first words of the content."""
+        if excerpt:
+            return excerpt
+        return Truncator(content).words(cls.SUMMARY_WORDS, truncate=' …')
+
+    def render_content(self):
+        """Store the rendered HTML, word count and reading time of the content."""
+        self.content_html, self.word_count, self.reading_time = render_content(self.content)
+        self.content_renderer_version = RENDERER_VERSION
+
     def save(self, *args, **kwargs):
+        # Precompute the card summary so list pages never load the content,
+        # and the body HTML so the article page does no text processing
+        self.summary = self.build_summary(self.excerpt, self.content)
+        self.render_content()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'excerpt', 'content'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'summary', *self.RENDERED_FIELDS}
         # Auto-set published_at when status changes to published
         if self.status == ArticleStatus.PUBLISHED and not self.published_at:
             from django.utils import timezone
@@ -127,3 +282,75 @@ class Article(BaseModel):
         if not self.slug:
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
+        # Keep the stored search vector in sync with the searchable fields
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(self.SEARCH_FIELDS):
+            update_search_vectors(Article.objects.using(self._state.db).filter(pk=self.pk))
+
+
+class RelatedArticle(BaseModel):
+    """
+    Precomputed "related articles" of an article, best first.
+    Maintained by articles.related; the article page reads them with one
+    query on the (article, rank) index.
+    """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='related_from')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['article', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'rank'], name='related_article_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.article_id} -> {self.related_id} ({self.score:.3f})'
+
+
+class ArticleTerm(models.Model):
+    """
+    One term of an article's pruned TF-IDF vector (articles.related).
+
+    Together the rows form an inverted index (term -> articles by weight)
+    that incremental related-article updates search instead of comparing
+    every pair of articles. Derived data rebuilt by
+    recompute_related_articles, hence no BaseModel bookkeeping columns.
+    """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=50)
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'term'], name='article_term_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['term', '-weight'], name='article_term_weight_idx'),
+        ]
+
+
+class TermStatistic(models.Model):
+    """
+    Number of published articles containing a term, as of the last full
+    related-articles recomputation (the IDF part of TF-IDF).
+    """
+    term = models.CharField(max_length=50, unique=True)
+    document_count = models.PositiveIntegerField()
+
+
+class PendingRelatedUpdate(models.Model):
+    """
+    An article whose related lists still have to be updated
+    (articles.related.process_pending_updates()). Queued in the transaction
+    that saves the article and worked off after the response is sent. The
+    article is a plain id, not a foreign key: deleted articles leave
+    updates behind too.
+    """
+    article_id = models.BigIntegerField()
+    # Only recompute the article's own list, from the stored index
+    refresh_only = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f'{self.article_id}{" (refresh)" if self.refresh_only else ""}'
@@ -0,0 +1,22 @@
+"""
+Cached category and tag lists for the article sidebars and filters.
+See core.navigation for how the snapshots are kept fresh.
+"""
+from core.navigation import navigation_cache
+from .models import Category, Tag
+
+
+def get_active_categories():
+    """Active categories (pk, name, slug), ordered by name."""
+    return navigation_cache.get(
+        'categories',
+        lambda: Category.objects.filter(is_active=True).order_by('name').values_list('pk', 'name', 'slug', named=True),
+    )
+
+
+def get_active_tags():
+    """Active tags (pk, name, slug), ordered by name."""
+    return navigation_cache.get(
+        'tags',
+        lambda: Tag.objects.filter(is_active=True).order_by('name').values_list('pk', 'name', 'slug', named=True),
+    )
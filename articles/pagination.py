@@ -0,0 +1,275 @@
+"""
+Keyset (cursor) pagination for article lists.
+
+Offset pagination runs a COUNT(*) over the filtered set and an OFFSET scan
+whose cost grows with the page number. Keyset pagination instead remembers
+the sort key of the last row shown and asks for the rows after it, so every
+page costs the same regardless of depth, and the total count is only
+computed when explicitly requested.
+
+Cursors are opaque, URL-safe strings that encode the sort key values of the
+boundary row and the direction to move in.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """
+    A page of results produced by KeysetPaginator.
+    Mirrors the parts of django.core.paginator.Page that templates use.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<CursorPage of %d objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], NEXT)
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], PREVIOUS)
+
+
+class KeysetPaginator:
+    """
+    Paginate an ordered queryset by its sort key instead of by offset.
+
+    The queryset must be ordered by plain field names (optionally prefixed
+    with '-'); the primary key is appended as a tie-breaker so that the
+    ordering is total. Fields used for ordering must not be NULL for the
+    rows being paginated (published articles always have published_at set).
+    """
+
+    def __init__(self, queryset, per_page, with_count=False):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.with_count = with_count
+        self.ordering = self._get_ordering(queryset)
+
+    def _get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by)
+        if not ordering:
+            raise ImproperlyConfigured('KeysetPaginator requires an ordered queryset.')
+        fields = []
+        for item in ordering:
+            if not isinstance(item, str) or '__' in item or item == '?':
+                raise ImproperlyConfigured(
+                    'KeysetPaginator only supports ordering by local field names, got %r.' % item
+                )
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = queryset.model._meta.pk.name
+            fields.append((name, descending))
+        pk_name = queryset.model._meta.pk.name
+        if pk_name not in [name for name, _ in fields]:
+            fields.append((pk_name, fields[-1][1]))
+        return fields
+
+    @cached_property
+    def count(self):
+        """Total number of objects. Only computed when requested."""
+        if not self.with_count:
+            return None
+        return self.queryset.count()
+
+    def encode_cursor(self, obj, direction):
+        # Rows are model instances, or dicts for values() querysets
+        values = [
+            self._serialize(obj[name] if isinstance(obj, dict) else getattr(obj, name))
+            for name, _ in self.ordering
+        ]
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError, binascii.Error):
+            raise InvalidCursor(cursor)
+        if direction not in (NEXT, PREVIOUS) or len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        try:
+            values = [self._deserialize(name, value) for (name, _), value in zip(self.ordering, values)]
+        except Exception:
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _serialize(self, value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    def _deserialize(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotation such as a search rank
+            return value
+        return field.to_python(value)
+
+    def _keyset_filter(self, values, forward):
+        """
+        Build the row-value comparison (a, b, c) < (x, y, z) as an OR of
+        ANDs, honouring the direction of each ordering field.
+        """
+        condition = Q()
+        for i, (name, descending) in enumerate(self.ordering):
+            # Moving forward on a descending field means smaller values
+            lookup = 'lt' if descending == forward else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[i]})
+            for j in range(i):
+                clause &= Q(**{self.ordering[j][0]: values[j]})
+            condition |= clause
+        return condition
+
+    def _page_queryset(self, cursor):
+        """The query for the page after or before the cursor (one row extra) and its direction."""
+        order_by = [('-' if desc else '') + name for name, desc in self.ordering]
+        if not cursor:
+            return self.queryset.order_by(*order_by)[:self.per_page + 1], None
+
+        direction, values = self.decode_cursor(cursor)
+        if direction == NEXT:
+            queryset = self.queryset.filter(self._keyset_filter(values, forward=True)).order_by(*order_by)
+        else:
+            reversed_order = [('' if desc else '-') + name for name, desc in self.ordering]
+            queryset = self.queryset.filter(self._keyset_filter(values, forward=False)).order_by(*reversed_order)
+        return queryset[:self.per_page + 1], direction
+
+    def _make_page(self, rows, direction):
+        if direction != PREVIOUS:
+            has_next = len(rows) > self.per_page
+            return CursorPage(rows[:self.per_page], self, has_next, direction == NEXT)
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, self, True, has_previous)
+
+    def page(self, cursor=None):
+        """Return the CursorPage that follows (or precedes) the given cursor."""
+        queryset, direction = self._page_queryset(cursor)
+        return self._make_page(list(queryset), direction)
+
+    async def apage(self, cursor=None):
+        """page() for async views, through the async ORM; also computes the count when requested."""
+        queryset, direction = self._page_queryset(cursor)
+        if self.with_count:
+            self.count = await self.queryset.acount()
+        return self._make_page([row async for row in queryset], direction)
+
+
+class KeysetPaginationMixin:
+    """
+    Opt-in cursor pagination for ListViews.
+
+    Cursor mode is used when ARTICLE_PAGINATION is set to 'cursor', or when
+    the request already carries a cursor. Otherwise the view falls back to
+    Django's regular page-number pagination. Add ``count=1`` to the query
+    string to have the total number of results computed.
+    """
+    cursor_kwarg = 'cursor'
+    count_kwarg = 'count'
+
+    def use_cursor_pagination(self):
+        return (
+            getattr(settings, 'ARTICLE_PAGINATION', 'offset') == 'cursor' or
+            self.cursor_kwarg in self.request.GET
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(
+            queryset,
+            page_size,
+            with_count=self.request.GET.get(self.count_kwarg) == '1',
+        )
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """paginate_queryset() for async views: the page is read through the async ORM."""
+        if self.use_cursor_pagination():
+            paginator = KeysetPaginator(
+                queryset,
+                page_size,
+                with_count=self.request.GET.get(self.count_kwarg) == '1',
+            )
+            try:
+                page = await paginator.apage(self.request.GET.get(self.cursor_kwarg))
+            except InvalidCursor:
+                raise Http404('Invalid cursor.')
+            return (paginator, page, page.object_list, page.has_other_pages())
+
+        paginator = self.get_paginator(
+            queryset,
+            page_size,
+            orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty(),
+        )
+        # Counted here, so that checking the page number runs no query
+        paginator.count = await queryset.acount()
+        number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+        try:
+            page = paginator.page(paginator.num_pages if number == 'last' else int(number))
+        except (ValueError, InvalidPage):
+            raise Http404('Invalid page.')
+        page.object_list = [obj async for obj in page.object_list]
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_pagination'] = isinstance(context.get('paginator'), KeysetPaginator)
+        return context
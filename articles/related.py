@@ -0,0 +1,534 @@
+"""
+Related articles.
+
+Every published article gets up to TOP_K related articles, stored best
+first in RelatedArticle. Two articles are scored by
+
+    TEXT_WEIGHT * cosine similarity of their TF-IDF vectors
+    + TAG_WEIGHT * Jaccard overlap of their tags
+    + CATEGORY_WEIGHT * (same category)
+
+The TF-IDF vectors use title, excerpt and content (title and excerpt words
+count more), sublinear term frequency and the document frequencies of the
+published articles. Vectors are sparse dicts pruned to their MAX_TERMS
+strongest terms and L2-normalised, so the cosine is a sum over the shared
+terms.
+
+Candidates are never compared pairwise. They come from an inverted index:
+for each term (and each tag) only the CHAMPIONS strongest postings (newest
+articles for tags) are visited. Articles sharing no champion term or tag
+with an article are not candidates.
+
+- recompute_related_articles() rebuilds everything in memory: two
+  streaming passes over the published articles (document frequencies, then
+  vectors), then the candidate search of SCORE_BLOCK_SIZE articles at a
+  time as sparse matrix products (SimilarityIndex, NumPy/SciPy). It stores
+  the vectors (ArticleTerm) and document frequencies (TermStatistic) for
+  the incremental updates. Run it after bulk imports and periodically, so
+  that the IDF weights follow the corpus.
+- update_related_articles() re-indexes one article that was published,
+  edited or unpublished against the stored index and merges it into the
+  lists of the articles it enters or leaves; only a full list that loses
+  the article is searched again.
+- The signal handlers (articles.signals) do not run it while saving: they
+  queue the article (queue_related_update(), a PendingRelatedUpdate row in
+  the saving transaction). The queue is worked off outside the web
+  processes by ``python manage.py process_related_updates --interval 10``
+  (the worker service in docker-compose.yml) or from cron, so an update
+  never holds a request thread, whoever made the change.
+
+Every write of a list, emptying it included, moves the owner's
+Article.related_updated_at, which the article page's HTTP validators are
+built from (articles.views).
+"""
+import heapq
+import math
+import time
+from collections import Counter, defaultdict, namedtuple
+from itertools import batched
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from scipy import sparse
+
+from core.cache import bump_content_generation
+from .counters import published_articles
+from .models import Article, ArticleTerm, PendingRelatedUpdate, RelatedArticle, TermStatistic
+from .search import WORD_RE
+
+TOP_K = 6
+MAX_TERMS = 20
+CHAMPIONS = 50
+TEXT_WEIGHT = 0.6
+TAG_WEIGHT = 0.3
+CATEGORY_WEIGHT = 0.1
+
+# Article fields and how often their words are counted
+FIELD_WEIGHTS = (('title', 3), ('excerpt', 2), ('content', 1))
+TEXT_FIELDS = tuple(name for name, _ in FIELD_WEIGHTS)
+
+MIN_WORD_LENGTH = 3
+MAX_WORD_LENGTH = ArticleTerm._meta.get_field('term').max_length
+STOP_WORDS = frozenset('''
+    about above after again against all also and any are because been before being below
+    between both but can could did does doing down during each few for from further had has
+    have having her here hers herself him himself his how into its itself just more most
+    not now off once only other our ours ourselves out over own same she should some such
+    than that the their theirs them themselves then there these they this those through
+    too under until very was were what when where which while who whom why will with would
+    you your yours yourself yourselves
+'''.split())
+
+BATCH_SIZE = 2000
+
+# Articles whose candidates are scored together in the full rebuild; bounds
+# the memory of the intermediate candidate matrices
+SCORE_BLOCK_SIZE = 1000
+
+# Held by the process working off the update queue, renewed after every
+# article; expires should the process die
+UPDATE_LOCK_KEY = 'related:updating'
+UPDATE_LOCK_TIMEOUT = 300
+UPDATE_BATCH_SIZE = 100
+
+Document = namedtuple('Document', ['vector', 'tags', 'category_id'])
+
+
+def is_term(word):
+    return (MIN_WORD_LENGTH <= len(word) <= MAX_WORD_LENGTH
+            and word not in STOP_WORDS and not word.isdigit())
+
+
+def term_counts(title, excerpt, content):
+    """Weighted term frequencies of an article."""
+    counts = Counter()
+    for text, (_, weight) in zip((title, excerpt, content), FIELD_WEIGHTS):
+        for word, count in Counter(WORD_RE.findall((text or '').lower())).items():
+            counts[word] += count * weight
+    return {word: count for word, count in counts.items() if is_term(word)}
+
+
+def document_terms(title, excerpt, content):
+    """The distinct terms of an article (the keys of term_counts(), without counting)."""
+    words = set()
+    for text in (title, excerpt, content):
+        words.update(WORD_RE.findall((text or '').lower()))
+    return {word for word in words if is_term(word)}
+
+
+def idf(document_count, total):
+    """Smoothed inverse document frequency."""
+    return math.log((1 + total) / (1 + document_count)) + 1
+
+
+def build_vector(counts, document_counts, total):
+    """Return the pruned, L2-normalised TF-IDF vector {term: weight} of term counts."""
+    weights = {
+        term: (1 + math.log(count)) * idf(document_counts.get(term, 0), total)
+        for term, count in counts.items()
+    }
+    strongest = heapq.nlargest(MAX_TERMS, weights.items(), key=lambda item: item[1])
+    norm = math.sqrt(sum(weight * weight for _, weight in strongest))
+    return {term: weight / norm for term, weight in strongest} if norm else {}
+
+
+def combine(text_similarity, tags, other_tags, same_category):
+    tag_similarity = len(tags & other_tags) / len(tags | other_tags) if tags and other_tags else 0.0
+    return TEXT_WEIGHT * text_similarity + TAG_WEIGHT * tag_similarity + CATEGORY_WEIGHT * same_category
+
+
+def best(scores, k=TOP_K):
+    """The k best (pk, score) pairs, newer articles first on equal scores."""
+    return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
+
+
+def active_tag_links(article_ids=None):
+    links = Article.tags.through.objects.filter(tag__is_active=True)
+    if article_ids is not None:
+        links = links.filter(article_id__in=article_ids)
+    return links.values_list('article_id', 'tag_id')
+
+
+# Full recomputation
+
+def group_ranks(groups):
+    """Position of every element of a sorted array within its run of equal values."""
+    return np.arange(len(groups)) - np.searchsorted(groups, groups)
+
+
+class SimilarityIndex:
+    """
+    Documents, keyed by article pk, as sparse matrices with one row per
+    article: the term vectors and the tags (1.0 per tag). The champion
+    matrices keep only the CHAMPIONS strongest entries of each term and the
+    newest articles of each tag, so that vectors[rows] @ champion_vectors.T
+    yields the same partial dot products as walking the postings lists of
+    every article of the block.
+    """
+
+    def __init__(self, documents):
+        self.pks = np.fromiter(documents, dtype=np.int64, count=len(documents))
+        # Articles without a category are in the same (empty) category, as in combine()
+        self.categories = np.fromiter(
+            (-1 if document.category_id is None else document.category_id for document in documents.values()),
+            dtype=np.int64,
+            count=len(documents),
+        )
+        self.vectors = self.matrix(document.vector for document in documents.values())
+        self.tags = self.matrix(dict.fromkeys(document.tags, 1.0) for document in documents.values())
+        self.tag_counts = np.diff(self.tags.indptr)
+        self.champion_vectors = self.champions(self.vectors)
+        self.champion_tags = self.champions(self.tags)
+
+    def matrix(self, rows):
+        """CSR matrix of {column key: value} rows; the columns are numbered as they are met."""
+        columns = {}
+        indices = []
+        values = []
+        indptr = [0]
+        for row in rows:
+            for key, value in row.items():
+                indices.append(columns.setdefault(key, len(columns)))
+                values.append(value)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.array(values, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(self.pks), len(columns)),
+        )
+
+    def champions(self, matrix):
+        """The CHAMPIONS entries of each column with the largest (value, pk), as heapq.nlargest() picks postings."""
+        entries = matrix.tocoo()
+        order = np.lexsort((-self.pks[entries.row], -entries.data, entries.col))
+        keep = order[group_ranks(entries.col[order]) < CHAMPIONS]
+        return sparse.csr_matrix((entries.data[keep], (entries.row[keep], entries.col[keep])), shape=matrix.shape)
+
+    def neighbours(self, start, stop, k=TOP_K):
+        """
+        The k best related articles of the rows start:stop, as arrays of
+        (row, other row, rank, score) ordered by row and rank; equal scores
+        rank newer articles first, as best() does.
+        """
+        dots = (self.vectors[start:stop] @ self.champion_vectors.T).tocoo()
+        shared_tags = (self.tags[start:stop] @ self.champion_tags.T).tocoo()
+        # Candidates found only through a tag start from a dot product of 0;
+        # the conversion adds up the duplicates and keeps the explicit zeros
+        candidates = sparse.coo_matrix(
+            (
+                np.concatenate([dots.data, np.zeros(shared_tags.nnz)]),
+                (np.concatenate([dots.row, shared_tags.row]), np.concatenate([dots.col, shared_tags.col])),
+            ),
+            shape=dots.shape,
+        ).tocsr().tocoo()
+        rows = candidates.row.astype(np.int64) + start
+        others = candidates.col.astype(np.int64)
+        not_self = rows != others
+        rows, others, dot = rows[not_self], others[not_self], candidates.data[not_self]
+
+        common = np.asarray(self.tags[rows].multiply(self.tags[others]).sum(axis=1)).ravel()
+        union = self.tag_counts[rows] + self.tag_counts[others] - common
+        tag_similarity = np.divide(common, union, out=np.zeros_like(common), where=union > 0)
+        same_category = self.categories[rows] == self.categories[others]
+        scores = TEXT_WEIGHT * dot + TAG_WEIGHT * tag_similarity + CATEGORY_WEIGHT * same_category
+
+        order = np.lexsort((-self.pks[others], -scores, rows))
+        ranks = group_ranks(rows[order])
+        keep = order[ranks < k]
+        return rows[keep], others[keep], ranks[ranks < k] + 1, scores[keep]
+
+
+def load_documents(batch_size=BATCH_SIZE):
+    """
+    Build the Documents of all published articles with two streaming
+    passes. Returns (documents, document_counts).
+    """
+    articles = published_articles().order_by()
+    document_counts = Counter()
+    total = 0
+    for text in articles.values_list(*TEXT_FIELDS).iterator(chunk_size=batch_size):
+        document_counts.update(document_terms(*text))
+        total += 1
+
+    tags = defaultdict(set)
+    for article_id, tag_id in active_tag_links(articles.values('pk')).iterator(chunk_size=batch_size * 5):
+        tags[article_id].add(tag_id)
+
+    documents = {}
+    rows = articles.values_list('pk', 'category_id', *TEXT_FIELDS).iterator(chunk_size=batch_size)
+    for pk, category_id, *text in rows:
+        vector = build_vector(term_counts(*text), document_counts, total)
+        documents[pk] = Document(vector, frozenset(tags.get(pk, ())), category_id)
+    return documents, document_counts
+
+
+def insert_rows(model, fields, rows, batch_size=BATCH_SIZE):
+    """
+    INSERT tuples of field values with executemany. The derived tables hold
+    hundreds of thousands of rows; skipping model instances and per-row SQL
+    compilation makes bulk writes several times faster than bulk_create().
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    sql = f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+    with connection.cursor() as cursor:
+        for batch in batched(rows, batch_size):
+            cursor.executemany(sql, batch)
+
+
+def recompute_related_articles(batch_size=BATCH_SIZE):
+    """
+    Rebuild the related articles, term vectors and term statistics of all
+    published articles. Returns a dict of counts and phase timings (s).
+    """
+    started = time.perf_counter()
+    # Queued updates are covered by the rebuild
+    covered = list(PendingRelatedUpdate.objects.values_list('pk', flat=True))
+    documents, document_counts = load_documents(batch_size)
+    loaded = time.perf_counter()
+
+    index = SimilarityIndex(documents)
+    links = []
+    for start in range(0, len(documents), SCORE_BLOCK_SIZE):
+        rows, others, ranks, scores = index.neighbours(start, start + SCORE_BLOCK_SIZE)
+        links.extend(zip(index.pks[rows].tolist(), index.pks[others].tolist(), ranks.tolist(), scores.tolist()))
+    scored = time.perf_counter()
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic():
+        RelatedArticle.objects.all().delete()
+        Article.objects.update(related_updated_at=timezone.now())
+        ArticleTerm.objects.all().delete()
+        TermStatistic.objects.all().delete()
+        insert_rows(
+            RelatedArticle,
+            ('article', 'related', 'rank', 'score', 'created_at', 'updated_at', 'is_active'),
+            ((*link, now, now, True) for link in links),
+            batch_size,
+        )
+        insert_rows(
+            ArticleTerm,
+            ('article', 'term', 'weight'),
+            (
+                (pk, term, weight)
+                for pk, document in documents.items()
+                for term, weight in document.vector.items()
+            ),
+            batch_size,
+        )
+        insert_rows(TermStatistic, ('term', 'document_count'), document_counts.items(), batch_size)
+        for pks in batched(covered, batch_size):
+            PendingRelatedUpdate.objects.filter(pk__in=pks).delete()
+        transaction.on_commit(bump_content_generation)
+    finished = time.perf_counter()
+
+    return {
+        'articles': len(documents),
+        'links': len(links),
+        'terms': len(document_counts),
+        'load_seconds': loaded - started,
+        'score_seconds': scored - loaded,
+        'write_seconds': finished - scored,
+        'total_seconds': finished - started,
+    }
+
+
+# Incremental updates
+
+def champion_candidates(vector, tags):
+    """
+    Partial dot products {pk: dot} with the champion postings of the terms
+    and tags, with one indexed query per term (ArticleTerm (term, -weight))
+    and per tag (through-table (tag_id, article_id)).
+    """
+    dots = defaultdict(float)
+    for term, weight in vector.items():
+        postings = ArticleTerm.objects.filter(term=term).order_by('-weight')
+        for other, other_weight in postings.values_list('article_id', 'weight')[:CHAMPIONS]:
+            dots[other] += weight * other_weight
+    published = published_articles()
+    for tag_id in tags:
+        links = Article.tags.through.objects.filter(tag_id=tag_id, article__in=published).order_by('-article_id')
+        for other in links.values_list('article_id', flat=True)[:CHAMPIONS]:
+            dots[other] += 0.0
+    return dots
+
+
+def score_candidates(article_id, vector, tags, category_id):
+    """Score the candidates of an article against the stored index: {pk: score}."""
+    dots = champion_candidates(vector, tags)
+    dots.pop(article_id, None)
+    if not dots:
+        return {}
+
+    categories = dict(published_articles().filter(pk__in=list(dots)).values_list('pk', 'category_id'))
+    other_tags = defaultdict(set)
+    for other, tag_id in active_tag_links(list(categories)):
+        other_tags[other].add(tag_id)
+    return {
+        other: combine(dot, tags, other_tags[other], category_id == categories[other])
+        for other, dot in dots.items()
+        if other in categories
+    }
+
+
+def touch_related(article_ids):
+    """Record that the related lists of the articles changed (Article.related_updated_at)."""
+    Article.objects.filter(pk__in=article_ids).update(related_updated_at=timezone.now())
+
+
+def clear_related(article_id):
+    if RelatedArticle.objects.filter(article_id=article_id).delete()[0]:
+        touch_related([article_id])
+
+
+def save_related(article_id, ranked):
+    RelatedArticle.objects.filter(article_id=article_id).delete()
+    RelatedArticle.objects.bulk_create([
+        RelatedArticle(article_id=article_id, related_id=other, rank=rank, score=score)
+        for rank, (other, score) in enumerate(ranked, start=1)
+    ])
+    touch_related([article_id])
+
+
+def article_tags(article_id):
+    return {tag_id for _, tag_id in active_tag_links([article_id])}
+
+
+def refresh_related_articles(article_id):
+    """Recompute the related list of an indexed article from the stored index."""
+    category_id = published_articles().filter(pk=article_id).values_list('category_id', flat=True).first()
+    if category_id is None:
+        clear_related(article_id)
+        return
+    vector = dict(ArticleTerm.objects.filter(article_id=article_id).values_list('term', 'weight'))
+    scores = score_candidates(article_id, vector, article_tags(article_id), category_id)
+    save_related(article_id, best(scores))
+
+
+def merge_into_related_lists(article_id, scores, owners):
+    """
+    Put an article's new scores into the related lists of other articles
+    (scores are symmetric). A list that loses the article while full may
+    have a better replacement, so it is recomputed; the others are merged
+    without a search. Returns the pks of the lists that changed.
+    """
+    lists = defaultdict(dict)
+    rows = RelatedArticle.objects.filter(article_id__in=owners).order_by('rank')
+    for owner, related, score in rows.values_list('article_id', 'related_id', 'score'):
+        lists[owner][related] = score
+
+    changed = set()
+    for owner in owners:
+        entries = lists[owner]
+        before = best(entries)
+        if owner in scores:
+            entries[article_id] = scores[owner]
+        elif entries.pop(article_id, None) is not None and len(before) == TOP_K:
+            refresh_related_articles(owner)
+            changed.add(owner)
+            continue
+        ranked = best(entries)
+        if ranked != before:
+            save_related(owner, ranked)
+            changed.add(owner)
+    return changed
+
+
+def update_related_articles(article_id):
+    """
+    Re-index one article after it was published, edited or unpublished,
+    and update the related lists it enters or leaves. Returns the pks of
+    the other lists that changed.
+    """
+    row = published_articles().filter(pk=article_id).values_list('category_id', *TEXT_FIELDS).first()
+    referencing = set(RelatedArticle.objects.filter(related_id=article_id).values_list('article_id', flat=True))
+
+    with transaction.atomic():
+        ArticleTerm.objects.filter(article_id=article_id).delete()
+        if row is None:
+            clear_related(article_id)
+            scores = {}
+            owners = referencing
+        else:
+            category_id, *text = row
+            counts = term_counts(*text)
+            document_counts = dict(TermStatistic.objects.filter(term__in=counts).values_list('term', 'document_count'))
+            vector = build_vector(counts, document_counts, published_articles().count())
+            ArticleTerm.objects.bulk_create([
+                ArticleTerm(article_id=article_id, term=term, weight=weight) for term, weight in vector.items()
+            ])
+            scores = score_candidates(article_id, vector, article_tags(article_id), category_id)
+            save_related(article_id, best(scores))
+            # Only the best candidates can have this article in their top k
+            owners = referencing | {other for other, _ in best(scores, 2 * TOP_K)}
+
+        changed = merge_into_related_lists(article_id, scores, owners)
+        # The lists are shown on other articles' pages
+        transaction.on_commit(bump_content_generation)
+    return changed
+
+
+# Deferred updates
+
+def queue_related_update(article_id, refresh_only=False):
+    """
+    Queue an update of the article's related lists, or with refresh_only
+    just a new search for its own list. The row is part of the current
+    transaction, so a rolled back change queues nothing.
+    """
+    PendingRelatedUpdate.objects.create(article_id=article_id, refresh_only=refresh_only)
+
+
+def queue_related_updates(article_ids, batch_size=BATCH_SIZE):
+    """Queue full updates of many articles, one INSERT per batch. Returns the number queued."""
+    queued = 0
+    for batch in batched(article_ids, batch_size):
+        PendingRelatedUpdate.objects.bulk_create([PendingRelatedUpdate(article_id=pk) for pk in batch])
+        queued += len(batch)
+    return queued
+
+
+def apply_pending_updates(batch_size=UPDATE_BATCH_SIZE):
+    """
+    Work off one batch of the queue, oldest first, without locking. Returns
+    the number of articles updated, 0 once the queue is empty.
+    """
+    queue = PendingRelatedUpdate.objects.order_by('pk').values_list('pk', 'article_id', 'refresh_only')
+    rows = list(queue[:batch_size])
+    # An article queued several times is updated once, fully if any entry asks for it
+    refresh_only = {}
+    for _, article_id, refresh in rows:
+        refresh_only[article_id] = refresh_only.get(article_id, True) and refresh
+    for article_id, refresh in refresh_only.items():
+        if refresh:
+            refresh_related_articles(article_id)
+        else:
+            update_related_articles(article_id)
+        cache.touch(UPDATE_LOCK_KEY, UPDATE_LOCK_TIMEOUT)
+    PendingRelatedUpdate.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+    if any(refresh_only.values()):
+        # update_related_articles() bumps by itself
+        bump_content_generation()
+    return len(refresh_only)
+
+
+def process_pending_updates(batch_size=UPDATE_BATCH_SIZE):
+    """
+    Apply the queued updates until the queue is empty. One process works
+    the queue at a time (a cache lock, taken per batch); the others return
+    at once and leave their entries to it. Returns the number of articles
+    updated.
+    """
+    updated = 0
+    while cache.add(UPDATE_LOCK_KEY, True, UPDATE_LOCK_TIMEOUT):
+        try:
+            applied = apply_pending_updates(batch_size)
+        finally:
+            cache.delete(UPDATE_LOCK_KEY)
+        if not applied:
+            break
+        updated += applied
+    return updated
@@ -0,0 +1,156 @@
+"""
+Article body rendering.
+
+render_content() turns the stored article body into the HTML shown on the
+article page, once, when the article is saved (Article.render_content).
+The result is kept in Article.content_html together with the word count
+and reading time, so the detail view does no text processing.
+
+The body may contain basic HTML. Tags outside ALLOWED_TAGS are dropped
+(their text is kept, except for script-like elements), attributes outside
+ALLOWED_ATTRIBUTES are removed and links must be http(s), mailto or
+relative. A body without block-level tags is treated as plain text:
+blank lines separate paragraphs and single newlines become <br>.
+
+Bump RENDERER_VERSION whenever the output of render_content() changes,
+then run ``python manage.py rerender_articles`` to refresh stored HTML.
+"""
+import math
+from collections import namedtuple
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.utils.html import linebreaks
+
+RENDERER_VERSION = 1
+
+WORDS_PER_MINUTE = 200
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'strong', 'b', 'em', 'i', 'u', 's', 'a', 'code', 'pre',
+    'ul', 'ol', 'li', 'blockquote', 'h2', 'h3', 'h4',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+}
+ALLOWED_URL_SCHEMES = {'', 'http', 'https', 'mailto'}
+BLOCK_TAGS = {'p', 'hr', 'pre', 'ul', 'ol', 'blockquote', 'h2', 'h3', 'h4'}
+VOID_TAGS = {'br', 'hr'}
+# The page title is the only h1
+RENAMED_TAGS = {'h1': 'h2'}
+# Elements dropped together with their content
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript', 'textarea', 'select'}
+
+RenderedContent = namedtuple('RenderedContent', ['html', 'word_count', 'reading_time'])
+
+
+def is_safe_url(url):
+    try:
+        return urlsplit(url).scheme.lower() in ALLOWED_URL_SCHEMES
+    except ValueError:
+        return False
+
+
+class Sanitizer(HTMLParser):
+    """Allowlist HTML sanitizer; feed() the markup, then close() and read html."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.text = []
+        self.open_tags = []
+        self.dropping = 0
+        self.has_blocks = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        tag = RENAMED_TAGS.get(tag, tag)
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        self.close_implied(tag)
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        rendered = ''
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name == 'href':
+                # Browsers ignore whitespace and control characters in schemes ("java\tscript:")
+                value = ''.join(char for char in value if char.isprintable() and not char.isspace())
+                if not is_safe_url(value):
+                    continue
+            rendered += f' {name}="{escape(value)}"'
+        self.parts.append(f'<{tag}{rendered}>')
+        if tag in BLOCK_TAGS or tag in ('br', 'li'):
+            # Words never continue across a line or block boundary
+            self.text.append(' ')
+        self.has_blocks = self.has_blocks or tag in BLOCK_TAGS
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in DROPPED_TAGS:
+            self.handle_starttag(tag, attrs)
+            if tag in self.open_tags[-1:]:
+                self.handle_endtag(tag)
+
+    def close_implied(self, tag):
+        """Close the elements that HTML ends implicitly: <p> before a block, <li> before an <li>."""
+        if self.open_tags[-1:] == ['p'] and (tag in BLOCK_TAGS or tag == 'li'):
+            self.handle_endtag('p')
+        if tag == 'li':
+            for open_tag in reversed(self.open_tags):
+                if open_tag in ('ul', 'ol'):
+                    break
+                if open_tag == 'li':
+                    self.handle_endtag('li')
+                    break
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        tag = RENAMED_TAGS.get(tag, tag)
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close any unclosed tags nested inside this one
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag in BLOCK_TAGS or open_tag == 'li':
+                self.text.append(' ')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.parts.append(escape(data, quote=False))
+            self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.parts.append(f'</{self.open_tags.pop()}>')
+
+    @property
+    def html(self):
+        return ''.join(self.parts)
+
+
+def reading_time(word_count):
+    """Reading time in whole minutes (at least 1 for a non-empty body)."""
+    return math.ceil(word_count / WORDS_PER_MINUTE) if word_count else 0
+
+
+def render_content(content):
+    """Return the RenderedContent of an article body."""
+    sanitizer = Sanitizer()
+    sanitizer.feed(content or '')
+    sanitizer.close()
+    html = sanitizer.html
+    if html.strip() and not sanitizer.has_blocks:
+        html = linebreaks(html)
+    word_count = len(''.join(sanitizer.text).split())
+    return RenderedContent(html, word_count, reading_time(word_count))
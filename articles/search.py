@@ -0,0 +1,91 @@
+"""
+Article search backend.
+
+On PostgreSQL, articles are matched against a stored, weighted tsvector
+(``Article.search_vector``: title > excerpt > content) backed by a GIN index,
+and results are ordered by ``SearchRank``. Other database backends fall back
+to the case-insensitive ``icontains`` search.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def get_search_config():
+    """Return the PostgreSQL text search configuration (e.g. 'english')."""
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+def supports_full_text_search(using='default'):
+    """Return True if the given database alias can use the tsvector backend."""
+    return connections[using].vendor == 'postgresql'
+
+
+def article_search_vector():
+    """Weighted search vector expression for an article row."""
+    config = get_search_config()
+    return (
+        SearchVector('title', weight='A', config=config) +
+        SearchVector('excerpt', weight='B', config=config) +
+        SearchVector('content', weight='C', config=config)
+    )
+
+
+def build_search_query(query):
+    """
+    Build a prefix-matching tsquery from free text typed into the search box,
+    so that partially typed words ("educ") still match ("education").
+    Returns None if the text contains no searchable words.
+    """
+    words = WORD_RE.findall(query)
+    if not words:
+        return None
+    raw = ' & '.join(f'{word}:*' for word in words)
+    return SearchQuery(raw, search_type='raw', config=get_search_config())
+
+
+def search_articles(queryset, query):
+    """
+    Filter an Article queryset by a search query and order it by relevance.
+    The queryset is returned unchanged (apart from ordering) for empty queries.
+    """
+    query = query.strip()
+    if not query:
+        return queryset.order_by('-published_at', '-created_at')
+
+    if supports_full_text_search(queryset.db):
+        search_query = build_search_query(query)
+        if search_query is None:
+            return queryset.none()
+        # ts_rank() returns real; as double precision the rank read back
+        # equals the stored one, so cursors can compare against it
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+        ).order_by('-rank', '-published_at', '-created_at')
+
+    return icontains_search(queryset, query)
+
+
+def icontains_search(queryset, query):
+    """Simple case-insensitive search across title, content and excerpt."""
+    return queryset.filter(
+        Q(title__icontains=query) |
+        Q(content__icontains=query) |
+        Q(excerpt__icontains=query)
+    ).order_by('-published_at', '-created_at')
+
+
+def update_search_vectors(queryset):
+    """
+    Recompute the stored search vector for every article in the queryset
+    with a single UPDATE. Returns the number of rows updated.
+    """
+    if not supports_full_text_search(queryset.db):
+        return 0
+    return queryset.update(search_vector=article_search_vector())
@@ -0,0 +1,125 @@
+"""
+Synthetic datasets for benchmarks and load tests.
+
+seed_dataset() inserts authors, categories, tags and published articles
+with bulk_create. Popularity is skewed the way real sites are: a few
+categories, tags and authors account for most articles (Zipf-like
+weights), articles carry 1-5 tags drawn with the same skew, and body sizes
+follow a log-normal distribution around a few hundred words.
+
+Articles are written through articles.bulk.ArticleBulkLoader, which also
+refreshes summaries, search vectors and counters.
+"""
+import math
+import random
+import secrets
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .bulk import BATCH_SIZE, ArticleBulkLoader
+from .models import Article, ArticleStatus, Author, Category, Tag
+
+VOCABULARY = (
+    'justice equality community education healthcare housing policy reform '
+    'environment climate poverty rights access opportunity advocacy women '
+    'immigration labor wages schools funding organizing grassroots voting '
+    'democracy inclusion discrimination dignity public service transport '
+    'water energy rural urban youth elderly disability culture language '
+    'the of and to in a is that for on with as by this are from'
+).split()
+
+
+@dataclass
+class SeededDataset:
+    """Primary keys of the seeded rows, most popular first."""
+    prefix: str
+    author_ids: list = field(default_factory=list)
+    category_ids: list = field(default_factory=list)
+    tag_ids: list = field(default_factory=list)
+    article_ids: list = field(default_factory=list)
+
+
+def zipf_weights(count, exponent):
+    """Weights of ranks 1..count under a Zipf distribution."""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def body_words(rng, median=600, sigma=0.6, minimum=80, maximum=6000):
+    """Number of words of an article body (log-normal around median)."""
+    return int(min(max(rng.lognormvariate(math.log(median), sigma), minimum), maximum))
+
+
+def paragraphs(rng, words):
+    """Generate text of the given number of words, split into paragraphs."""
+    chunks = []
+    while words > 0:
+        size = min(words, rng.randint(40, 120))
+        chunks.append(' '.join(rng.choices(VOCABULARY, k=size)).capitalize() + '.')
+        words -= size
+    return '\n\n'.join(chunks)
+
+
+def bulk_insert(model, objects, batch_size=BATCH_SIZE):
+    """bulk_create in batches, returning the created objects."""
+    created = []
+    for start in range(0, len(objects), batch_size):
+        created.extend(model.objects.bulk_create(objects[start:start + batch_size]))
+    return created
+
+
+def seed_dataset(articles=2000, authors=50, categories=12, tags=200,
+                 zipf_exponent=1.1, seed=42, prefix=None):
+    """
+    Insert a synthetic dataset and return a SeededDataset.
+
+    Slugs start with prefix (random by default) so that the rows never
+    collide with existing content and can be found again.
+    """
+    rng = random.Random(seed)
+    prefix = prefix or f'bench-{secrets.token_hex(3)}'
+    dataset = SeededDataset(prefix=prefix)
+
+    author_objects = bulk_insert(Author, [
+        Author(name=f'Author {prefix} {i}', slug=f'{prefix}-author-{i}', bio=paragraphs(rng, 40))
+        for i in range(authors)
+    ])
+    category_objects = bulk_insert(Category, [
+        Category(name=f'Category {prefix} {i}', slug=f'{prefix}-category-{i}')
+        for i in range(categories)
+    ])
+    tag_objects = bulk_insert(Tag, [
+        Tag(name=f'{prefix} tag {i}', slug=f'{prefix}-tag-{i}')
+        for i in range(tags)
+    ])
+    dataset.author_ids = [obj.pk for obj in author_objects]
+    dataset.category_ids = [obj.pk for obj in category_objects]
+    dataset.tag_ids = [obj.pk for obj in tag_objects]
+
+    author_weights = zipf_weights(authors, zipf_exponent)
+    category_weights = zipf_weights(categories, zipf_exponent)
+    tag_weights = zipf_weights(tags, zipf_exponent)
+    now = timezone.now()
+
+    with ArticleBulkLoader() as loader:
+        for i in range(articles):
+            content = paragraphs(rng, body_words(rng))
+            excerpt = ' '.join(rng.choices(VOCABULARY, k=25)) if rng.random() < 0.7 else ''
+            loader.add(
+                Article(
+                    title=' '.join(rng.choices(VOCABULARY, k=rng.randint(4, 10))).title(),
+                    slug=f'{prefix}-article-{i}',
+                    content=content,
+                    excerpt=excerpt,
+                    author=rng.choices(author_objects, author_weights)[0],
+                    category=rng.choices(category_objects, category_weights)[0],
+                    status=ArticleStatus.PUBLISHED,
+                    published_at=now - timedelta(minutes=i * 7),
+                ),
+                tag_ids=rng.choices(dataset.tag_ids, tag_weights, k=rng.randint(1, 5)),
+            )
+    dataset.article_ids = list(
+        Article.objects.filter(slug__startswith=f'{prefix}-article-').order_by('pk').values_list('pk', flat=True)
+    )
+    return dataset
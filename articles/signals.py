@@ -0,0 +1,186 @@
+"""
+Signal handlers for the articles app.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.cache import content_changed
+from core.navigation import navigation_cache
+from .counters import adjust, is_counted, published_articles
+from .models import Article, Author, Category, RelatedArticle, Tag
+from .related import queue_related_update, touch_related
+
+# Any change to public content invalidates the response cache
+for model in (Article, Author, Category, Tag):
+    post_save.connect(content_changed, sender=model, dispatch_uid=f'content_changed_save_{model.__name__}')
+    post_delete.connect(content_changed, sender=model, dispatch_uid=f'content_changed_delete_{model.__name__}')
+m2m_changed.connect(content_changed, sender=Article.tags.through, dispatch_uid='content_changed_article_tags')
+
+
+@receiver(m2m_changed, sender=Article.tags.through, dispatch_uid='touch_article_tags')
+def touch_articles_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Tags are shown on the article page, so changing the tag links moves
+    the article's updated_at, which the HTTP validators (core.conditional)
+    are built from.
+    """
+    if action == 'pre_clear' and reverse:
+        instance._touch_article_ids = list(instance.articles.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        article_ids = [instance.pk]
+    elif action == 'post_clear':
+        article_ids = getattr(instance, '_touch_article_ids', [])
+    else:
+        article_ids = pk_set
+    if article_ids:
+        Article.objects.filter(pk__in=article_ids).update(updated_at=timezone.now())
+
+
+# Category and tag sidebars are served from the navigation cache
+
+def categories_changed(sender, **kwargs):
+    navigation_cache.invalidate('categories')
+
+
+def tags_changed(sender, **kwargs):
+    navigation_cache.invalidate('tags')
+
+
+post_save.connect(categories_changed, sender=Category, dispatch_uid='navigation_save_Category')
+post_delete.connect(categories_changed, sender=Category, dispatch_uid='navigation_delete_Category')
+post_save.connect(tags_changed, sender=Tag, dispatch_uid='navigation_save_Tag')
+post_delete.connect(tags_changed, sender=Tag, dispatch_uid='navigation_delete_Tag')
+
+
+# Published-article counters (see articles.counters)
+
+def _move(model, old_pk, new_pk, was_counted, now_counted):
+    """Move one published article between two counter rows."""
+    if was_counted and now_counted and old_pk == new_pk:
+        return
+    if was_counted:
+        adjust(model, [old_pk], -1)
+    if now_counted:
+        adjust(model, [new_pk], 1)
+
+
+@receiver(pre_save, sender=Article, dispatch_uid='counters_article_pre_save')
+def remember_article_state(sender, instance, raw=False, using=None, **kwargs):
+    """Load the stored state of the article before it is overwritten."""
+    instance._counter_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._counter_previous = (
+        Article.objects.using(using)
+        .filter(pk=instance.pk)
+        .values('status', 'is_active', 'author_id', 'category_id')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Article, dispatch_uid='counters_article_post_save')
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_counter_previous', None)
+    was_counted = previous is not None and is_counted(previous['status'], previous['is_active'])
+    now_counted = is_counted(instance.status, instance.is_active)
+    if not was_counted and not now_counted:
+        return
+
+    _move(Author, previous and previous['author_id'], instance.author_id, was_counted, now_counted)
+    _move(Category, previous and previous['category_id'], instance.category_id, was_counted, now_counted)
+    # Tags only change through m2m_changed; here the article itself
+    # entered or left the published set
+    if was_counted != now_counted and not created:
+        tag_ids = list(instance.tags.values_list('pk', flat=True))
+        adjust(Tag, tag_ids, 1 if now_counted else -1)
+
+
+@receiver(pre_delete, sender=Article, dispatch_uid='counters_article_pre_delete')
+def remember_article_tags(sender, instance, **kwargs):
+    # The tag links are removed before post_delete is sent
+    instance._counter_tag_ids = []
+    if is_counted(instance.status, instance.is_active):
+        instance._counter_tag_ids = list(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Article, dispatch_uid='counters_article_post_delete')
+def update_counters_on_delete(sender, instance, **kwargs):
+    if not is_counted(instance.status, instance.is_active):
+        return
+    adjust(Author, [instance.author_id], -1)
+    adjust(Category, [instance.category_id], -1)
+    adjust(Tag, getattr(instance, '_counter_tag_ids', []), -1)
+
+
+@receiver(m2m_changed, sender=Article.tags.through, dispatch_uid='counters_article_tags')
+def update_tag_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep tag counters in sync with Article.tags. ``instance`` is an Article
+    (``article.tags.add()``) or, for reverse changes, a Tag
+    (``tag.articles.add()``).
+    """
+    if action == 'pre_clear':
+        if reverse:
+            instance._counter_cleared = published_articles().filter(tags=instance).count()
+        elif is_counted(instance.status, instance.is_active):
+            instance._counter_cleared = list(instance.tags.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        if action == 'post_clear':
+            count = getattr(instance, '_counter_cleared', 0)
+        else:
+            count = published_articles().filter(pk__in=pk_set).count()
+        adjust(Tag, [instance.pk], sign * count)
+    elif is_counted(instance.status, instance.is_active):
+        tag_ids = getattr(instance, '_counter_cleared', []) if action == 'post_clear' else pk_set
+        adjust(Tag, tag_ids, sign)
+
+
+# Related articles (see articles.related) are queued with the change and
+# updated by the process_related_updates worker, so saving an article does
+# not wait for them
+
+@receiver(post_save, sender=Article, dispatch_uid='related_article_post_save')
+def update_related_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_counter_previous', None)
+    was_counted = previous is not None and is_counted(previous['status'], previous['is_active'])
+    if was_counted or is_counted(instance.status, instance.is_active):
+        queue_related_update(instance.pk)
+
+
+@receiver(m2m_changed, sender=Article.tags.through, dispatch_uid='related_article_tags')
+def update_related_on_tag_change(sender, instance, action, reverse, **kwargs):
+    # Changes made from the tag side are picked up by the next full recomputation
+    if reverse or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if is_counted(instance.status, instance.is_active):
+        queue_related_update(instance.pk)
+
+
+@receiver(pre_delete, sender=Article, dispatch_uid='related_article_pre_delete')
+def remember_referencing_articles(sender, instance, **kwargs):
+    instance._related_referencing = list(
+        RelatedArticle.objects.filter(related=instance).values_list('article_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Article, dispatch_uid='related_article_post_delete')
+def refresh_referencing_articles(sender, instance, **kwargs):
+    referencing = getattr(instance, '_related_referencing', [])
+    # The deletion already removed the article from their lists
+    touch_related(referencing)
+    for article_id in referencing:
+        queue_related_update(article_id, refresh_only=True)
+
@@ -0,0 +1,217 @@
+"""
+XML sitemaps, precomputed to files.
+
+write_sitemaps() writes one sitemap file per SITEMAP_LIMIT URLs of each
+section (the protocol allows at most 50,000 URLs per file) and a sitemap
+index listing them, into SITEMAP_ROOT:
+
+    sitemap.xml -> sitemap-pages-1.xml, sitemap-articles-1.xml, sitemap-articles-2.xml, ...
+
+Rows are streamed from ``values_list(...).iterator()`` straight into the
+files, so memory use does not grow with the number of articles. Files are
+written under temporary names and renamed into place, so a crawler never
+reads a half-written sitemap. Each URL carries the row's updated_at as
+lastmod; each index entry the newest lastmod of its file.
+
+``python manage.py generate_sitemaps`` builds the files on deploy (and
+from cron, or after bulk imports). The views (articles.views.sitemap_index,
+sitemap_section) only serve them, so crawls read files instead of
+querying. When the files are older than SITEMAP_MAX_AGE, the first request
+to notice takes a cache lock and rebuilds them in a background thread,
+while every request keeps getting the existing files. SITEMAP_ROOT lies
+outside MEDIA_ROOT, so the files are only served through these views.
+"""
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+
+from core.models import StaticPage
+from .counters import published_articles
+from .models import Author, Category, Tag
+
+SITEMAP_LIMIT = 50_000
+CHUNK_SIZE = 2000
+INDEX_NAME = 'sitemap.xml'
+# Held while one process rebuilds; expires should that process die
+REBUILD_LOCK_KEY = 'sitemaps:rebuild'
+REBUILD_LOCK_TIMEOUT = 600
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_OPEN = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+
+def get_sitemap_root():
+    return Path(getattr(settings, 'SITEMAP_ROOT', settings.BASE_DIR / 'sitemaps'))
+
+
+def absolute_url(path):
+    return settings.SITE_URL.rstrip('/') + path
+
+
+def url_pattern(url_name):
+    """Return a function slug -> absolute URL that resolves the URL pattern once."""
+    prefix, suffix = absolute_url(reverse(url_name, args=['__slug__'])).split('__slug__')
+    return lambda slug: f'{prefix}{slug}{suffix}'
+
+
+def page_urls():
+    """Fixed pages without a lastmod, then the active static pages."""
+    for url_name in ('articles:home', 'articles:list', 'articles:author_list'):
+        yield absolute_url(reverse(url_name)), None
+    url = url_pattern('static_page')
+    pages = StaticPage.objects.filter(is_active=True).order_by('pk').values_list('slug', 'updated_at')
+    for slug, updated_at in pages.iterator(chunk_size=CHUNK_SIZE):
+        yield url(slug), updated_at
+
+
+def slug_urls(queryset, url_name):
+    url = url_pattern(url_name)
+    rows = queryset.order_by('pk').values_list('slug', 'updated_at')
+    for slug, updated_at in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield url(slug), updated_at
+
+
+# section name -> function returning an iterator of (absolute URL, lastmod or None)
+SECTIONS = {
+    'pages': page_urls,
+    'articles': lambda: slug_urls(published_articles(), 'articles:detail'),
+    'authors': lambda: slug_urls(Author.objects.filter(is_active=True), 'articles:author_detail'),
+    'categories': lambda: slug_urls(Category.objects.filter(is_active=True), 'articles:category'),
+    'tags': lambda: slug_urls(Tag.objects.filter(is_active=True), 'articles:tag'),
+}
+
+
+def shard_name(section, number):
+    return f'sitemap-{section}-{number}.xml'
+
+
+def format_lastmod(value):
+    return value.isoformat(timespec='seconds')
+
+
+def temporary_file(root):
+    # Unique per writer: concurrent rebuilds (several workers) must not share a file
+    return tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=root, prefix='.', suffix='.tmp', delete=False)
+
+
+def publish(temporary, path):
+    # Temporary files are private; the sitemaps are readable like other media
+    os.chmod(temporary, 0o644)
+    os.replace(temporary, path)
+
+
+def write_url(file, url, lastmod):
+    lastmod = f'<lastmod>{format_lastmod(lastmod)}</lastmod>' if lastmod else ''
+    file.write(f'<url><loc>{escape(url)}</loc>{lastmod}</url>\n')
+
+
+def write_section(root, section, urls, limit):
+    """Write the shards of one section; returns [(file name, newest lastmod)]."""
+    shards = []
+    file = None
+    count = 0
+    newest = None
+    for url, lastmod in urls:
+        if file is None or count == limit:
+            if file is not None:
+                close_shard(root, file, shards, section, newest)
+            file = temporary_file(root)
+            file.write(XML_HEADER + URLSET_OPEN)
+            count = 0
+            newest = None
+        write_url(file, url, lastmod)
+        count += 1
+        if lastmod is not None and (newest is None or lastmod > newest):
+            newest = lastmod
+    if file is not None:
+        close_shard(root, file, shards, section, newest)
+    return shards
+
+
+def close_shard(root, file, shards, section, newest):
+    file.write('</urlset>\n')
+    file.close()
+    name = shard_name(section, len(shards) + 1)
+    publish(file.name, root / name)
+    shards.append((name, newest))
+
+
+def write_sitemaps(root=None, limit=SITEMAP_LIMIT):
+    """
+    Rebuild every sitemap file and the index. Returns a dict of the number
+    of files per section and the elapsed seconds.
+    """
+    started = time.perf_counter()
+    root = Path(root or get_sitemap_root())
+    root.mkdir(parents=True, exist_ok=True)
+
+    stats = {}
+    entries = []
+    for section, urls in SECTIONS.items():
+        shards = write_section(root, section, urls(), limit)
+        stats[section] = len(shards)
+        entries.extend(shards)
+
+    with temporary_file(root) as file:
+        file.write(XML_HEADER + INDEX_OPEN)
+        for name, newest in entries:
+            url = absolute_url(reverse('sitemap_section', args=[name]))
+            lastmod = f'<lastmod>{format_lastmod(newest)}</lastmod>' if newest else ''
+            file.write(f'<sitemap><loc>{escape(url)}</loc>{lastmod}</sitemap>\n')
+        file.write('</sitemapindex>\n')
+    publish(file.name, root / INDEX_NAME)
+
+    # Shards of sections that shrank are no longer listed
+    current = {name for name, _ in entries}
+    for path in root.glob('sitemap-*.xml'):
+        if path.name not in current:
+            path.unlink(missing_ok=True)
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def rebuild_sitemaps(root):
+    """Rebuild the files and release the rebuild lock; runs in a background thread."""
+    try:
+        write_sitemaps(root)
+    finally:
+        cache.delete(REBUILD_LOCK_KEY)
+        connections.close_all()
+
+
+def ensure_sitemaps():
+    """
+    Return the sitemap root, or None if there are no files to serve yet.
+
+    Stale files are served as they are while one background thread, started
+    by whichever request takes the rebuild lock, rebuilds them. Missing files
+    (before the first generate_sitemaps) are built by the lock holder before
+    it answers; concurrent requests get None meanwhile.
+    """
+    root = get_sitemap_root()
+    try:
+        age = time.time() - (root / INDEX_NAME).stat().st_mtime
+    except FileNotFoundError:
+        age = None
+    if age is not None and age <= getattr(settings, 'SITEMAP_MAX_AGE', 3600):
+        return root
+    if not cache.add(REBUILD_LOCK_KEY, True, REBUILD_LOCK_TIMEOUT):
+        return root if age is not None else None
+    if age is None:
+        try:
+            write_sitemaps(root)
+        finally:
+            cache.delete(REBUILD_LOCK_KEY)
+        return root
+    threading.Thread(target=rebuild_sitemaps, args=(root,), daemon=True).start()
+    return root
@@ -0,0 +1,52 @@
+"""
+{% author_photo %}: responsive, lazily loaded author avatars.
+
+    {% load author_photos %}
+    {% author_photo author 96 "w-24 h-24 rounded-full object-cover" %}
+    {% author_photo author 160 "w-32 h-32 sm:w-40 sm:h-40 ..." sizes="(min-width: 640px) 160px, 128px" loading="eager" %}
+
+size is the largest CSS pixel size the avatar is displayed at; it becomes
+the intrinsic width/height (so the layout does not shift while loading) and
+the default sizes attribute. With thumbnails (articles.thumbnails) the
+browser picks the smallest WebP or JPEG variant for its pixel density;
+without them the original photo is used.
+"""
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..thumbnails import THUMBNAIL_FORMATS, THUMBNAIL_SIZES, thumbnail_name, thumbnail_srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def author_photo(author, size, css_class='', sizes=None, loading='lazy'):
+    if not author.photo:
+        return ''
+    sizes = sizes or f'{size}px'
+    if not author.has_photo_thumbnails:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" width="{}" height="{}" loading="{}" decoding="async">',
+            author.photo.url, author.name, css_class, size, size, loading,
+        )
+
+    photo_name = author.photo.name
+    storage = author.photo.storage
+    *preferred, (fallback, _, _, _) = THUMBNAIL_FORMATS
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (mime_type, thumbnail_srcset(photo_name, extension, storage), sizes)
+            for extension, _, mime_type, _ in preferred
+        ),
+    )
+    # src for browsers without srcset support: the smallest variant that is big enough
+    src_size = next((width for width in THUMBNAIL_SIZES if width >= size), THUMBNAIL_SIZES[-1])
+    image = format_html(
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" width="{}" height="{}" '
+        'loading="{}" decoding="async">',
+        storage.url(thumbnail_name(photo_name, src_size, fallback)),
+        thumbnail_srcset(photo_name, fallback, storage), sizes,
+        author.name, css_class, size, size, loading,
+    )
+    return format_html('<picture>{}{}</picture>', sources, image)
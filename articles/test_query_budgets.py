@@ -0,0 +1,125 @@
+"""
+Query-count budgets for every public view.
+
+Each view is requested as an anonymous visitor, as a staff user and as an
+HTMX request, with the response cache disabled and the navigation
+snapshots cold, i.e. the most expensive path a request can take. The
+dataset has several authors, categories and tagged articles per page, so a
+dropped select_related()/prefetch_related() (N+1 queries in the article
+card loops) exceeds the budget. On failure the captured SQL is printed.
+
+The budgets hold on SQLite and PostgreSQL:
+    DB_ENGINE=sqlite python manage.py test articles
+    python manage.py test articles
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import StaticPage
+from core.navigation import navigation_cache
+from .models import Article, ArticleStatus, Author, Category, Tag
+
+ANONYMOUS = 'anonymous'
+STAFF = 'staff'
+HTMX = 'htmx'
+
+# Logging in adds the session and user lookups
+STAFF_OVERHEAD = 2
+
+# view name -> (url name, args, query string, budget for an anonymous request)
+# Cold navigation costs one query each for static pages, categories and tags;
+# detail pages with HTTP validators (core.conditional) spend one query on
+# them, lists none (content generation).
+VIEWS = {
+    'home': ('articles:home', [], '', 6),
+    'article list': ('articles:list', [], '', 7),
+    'article list page 2': ('articles:list', [], '?page=2', 7),
+    'article list cursor': ('articles:list', [], '?cursor=', 6),
+    'search': ('articles:search', [], '?q=budget', 5),
+    'category': ('articles:category', ['budget-category-0'], '', 8),
+    'tag': ('articles:tag', ['budget-tag-0'], '', 7),
+    'two tags': ('articles:tag', ['budget-tag-0/budget-tag-1'], '', 7),
+    'two tags, all': ('articles:tag', ['budget-tag-0/budget-tag-1'], '?match=all', 7),
+    'article detail': ('articles:detail', ['budget-article-0'], '', 7),
+    'author list': ('articles:author_list', [], '', 4),
+    'author list by articles': ('articles:author_list', [], '?sort=articles', 4),
+    'author detail': ('articles:author_detail', ['budget-author-0'], '', 7),
+    'static page': ('static_page', ['budget-page'], '', 3),
+    'feed': ('articles:feed', [], '', 2),
+    'category feed': ('articles:category_feed', ['budget-category-0'], '', 3),
+    'author feed': ('articles:author_feed_atom', ['budget-author-0'], '', 3),
+    'tag feed': ('articles:tag_feed', ['budget-tag-0'], '', 3),
+    'api': ('articles:api_articles', [], '', 3),
+    'api sync': ('articles:api_articles', [], '?since=2000-01-01T00:00:00Z&fields=id,tags', 3),
+}
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, PERFORMANCE_INSTRUMENTATION_ENABLED=False)
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [Author.objects.create(name=f'Budget Author {i}', slug=f'budget-author-{i}') for i in range(3)]
+        categories = [
+            Category.objects.create(name=f'Budget Category {i}', slug=f'budget-category-{i}') for i in range(3)
+        ]
+        tags = [Tag.objects.create(name=f'Budget Tag {i}', slug=f'budget-tag-{i}') for i in range(4)]
+        for i in range(24):
+            article = Article.objects.create(
+                title=f'Budget article {i}',
+                slug=f'budget-article-{i}',
+                content='Budget content ' * 50,
+                author=authors[i % 3],
+                category=categories[i % 3],
+                status=ArticleStatus.PUBLISHED,
+            )
+            article.tags.set([tags[i % 4], tags[(i + 1) % 4]])
+        StaticPage.objects.create(title='Budget Page', slug='budget-page', content='Budget')
+        cls.staff_user = User.objects.create_user('budget-editor', is_staff=True)
+
+    def setUp(self):
+        self.reset_caches()
+
+    def reset_caches(self):
+        cache.clear()
+        navigation_cache.invalidate()
+
+    def request(self, mode, url):
+        if mode == STAFF:
+            self.client.force_login(self.staff_user)
+        headers = {'HX-Request': 'true'} if mode == HTMX else {}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, headers=headers)
+        return response, context.captured_queries
+
+    def assertWithinBudget(self, name, mode, url, budget):
+        response, queries = self.request(mode, url)
+        self.assertEqual(response.status_code, 200, f'{name} ({mode}): {url}')
+        if len(queries) > budget:
+            sql = '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(queries, start=1))
+            self.fail(
+                f'{name} ({mode}) ran {len(queries)} queries, budget is {budget}: {url}\n{sql}'
+            )
+
+    def check_mode(self, mode):
+        for name, (url_name, args, query_string, budget) in VIEWS.items():
+            if mode == STAFF:
+                budget += STAFF_OVERHEAD
+            url = reverse(url_name, args=args) + query_string
+            with self.subTest(view=name):
+                self.reset_caches()
+                self.client.logout()
+                self.assertWithinBudget(name, mode, url, budget)
+
+    def test_anonymous(self):
+        self.check_mode(ANONYMOUS)
+
+    def test_staff(self):
+        self.check_mode(STAFF)
+
+    def test_htmx(self):
+        self.check_mode(HTMX)
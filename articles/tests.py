@@ -1,3 +1,1344 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipIf, skipUnless
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, Q
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core.cache import get_content_generation
+from core.models import StaticPage
+from core.navigation import navigation_cache
+from .bulk import SlugAllocator
+from .pagination import InvalidCursor, KeysetPaginator
+from .navigation import get_active_categories, get_active_tags
+from .models import Article, ArticleStatus, ArticleTerm, Author, Category, PendingRelatedUpdate, RelatedArticle, Tag
+from .related import UPDATE_LOCK_KEY, process_pending_updates, recompute_related_articles, refresh_related_articles
+from .search import build_search_query, get_search_config, search_articles
+from .sitemaps import REBUILD_LOCK_KEY, rebuild_sitemaps, write_sitemaps
+from .transitions import change_status
+from .rendering import RENDERER_VERSION, render_content
+from .thumbnails import THUMBNAIL_SIZES, thumbnail_name, thumbnail_names
+from .views import ArticleListView, AuthorDetailView, CategoryFilterView, HomeView, TagFilterView
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Jane Writer')
+        cls.category = Category.objects.create(name='News')
+        cls.tag = Tag.objects.create(name='Economy')
+        cls.article = Article.objects.create(
+            title='First article',
+            content='Some content',
+            author=cls.author,
+            category=cls.category,
+            status=ArticleStatus.PUBLISHED,
+        )
+        cls.article.tags.add(cls.tag)
+
+    def setUp(self):
+        cache.clear()
+        navigation_cache.invalidate()
+
+    def get_validators(self, url):
+        # The first request also loads the navigation snapshots
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag'], response['Last-Modified']
+
+    def assertNotModified(self, url, queries=1, **headers):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_list_pages_answer_304_without_running_the_page_queryset(self):
+        # Article lists are validated by the content generation, without a query
+        urls = [
+            (reverse('articles:home'), 0),
+            (reverse('articles:list'), 0),
+            (reverse('articles:category', args=[self.category.slug]), 0),
+            (reverse('articles:tag', args=[self.tag.slug]), 0),
+            (reverse('articles:author_list'), 1),
+        ]
+        for url, queries in urls:
+            with self.subTest(url=url):
+                etag, last_modified = self.get_validators(url)
+                self.assertNotModified(url, queries, if_none_match=etag)
+                self.assertNotModified(url, queries, if_modified_since=last_modified)
+
+    def test_content_change_updates_list_validators(self):
+        url = reverse('articles:list')
+        etag, _ = self.get_validators(url)
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+        # An author shown on a card is renamed; no article row changes
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.name = 'Jane Editor'
+            self.author.save()
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Jane Editor')
+
+    def test_detail_pages_answer_304_without_running_the_page_queryset(self):
+        urls = [
+            reverse('articles:detail', args=[self.article.slug]),
+            reverse('articles:author_detail', args=[self.author.slug]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                etag, last_modified = self.get_validators(url)
+                self.assertNotModified(url, if_none_match=etag)
+                self.assertNotModified(url, if_modified_since=last_modified)
+
+    def test_article_change_returns_full_page(self):
+        url = reverse('articles:detail', args=[self.article.slug])
+        etag, _ = self.get_validators(url)
+        self.article.title = 'Edited title'
+        self.article.save()
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_tag_link_change_updates_list_etag(self):
+        url = reverse('articles:list')
+        etag, _ = self.get_validators(url)
+        self.article.tags.add(Tag.objects.create(name='Politics'))
+        navigation_cache.invalidate()
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_string_is_part_of_the_etag(self):
+        url = reverse('articles:author_list')
+        etag, _ = self.get_validators(url)
+        response = self.client.get(url, {'sort': 'articles'}, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_emptied_related_list_updates_detail_validators(self):
+        other = Article.objects.create(
+            title='Second article',
+            content='Other content',
+            author=self.author,
+            category=self.category,
+            status=ArticleStatus.PUBLISHED,
+        )
+        RelatedArticle.objects.create(article=self.article, related=other, rank=1, score=0.5)
+        url = reverse('articles:detail', args=[self.article.slug])
+        etag, last_modified = self.get_validators(url)
+        # Deleting the only related article leaves the list without rows
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=1)):
+            other.delete()
+        for headers in ({'if-none-match': etag}, {'if-modified-since': last_modified}):
+            with self.subTest(headers=headers):
+                response = self.client.get(url, headers=headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotContains(response, 'Second article')
+                self.assertNotEqual(response['Last-Modified'], last_modified)
+
+    def test_navigation_change_updates_detail_last_modified(self):
+        url = reverse('articles:detail', args=[self.article.slug])
+        etag, last_modified = self.get_validators(url)
+        # A new page in the site menu; the article and its relations are unchanged
+        with mock.patch('core.cache.time.time', return_value=time.time() + 60):
+            with self.captureOnCommitCallbacks(execute=True):
+                StaticPage.objects.create(title='Volunteer', slug='volunteer', content='Join us')
+        for headers in ({'if-none-match': etag}, {'if-modified-since': last_modified}):
+            with self.subTest(headers=headers):
+                response = self.client.get(url, headers=headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Volunteer')
+                self.assertNotEqual(response['Last-Modified'], last_modified)
+
+    def test_missing_article_is_404(self):
+        response = self.client.get(
+            reverse('articles:detail', args=['missing']),
+            headers={'if-none-match': '*'},
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class IndexUsageTests(TestCase):
+    """
+    The main query of each listing view is answered from an index, not a
+    full scan of the article table. With a few rows PostgreSQL prefers a
+    sequential scan anyway, so sequential scans are disabled for the check:
+    the test proves the index is usable for the query shape.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Index Author')
+        cls.category = Category.objects.create(name='Index Category')
+        cls.tag = Tag.objects.create(name='Index Tag')
+        for i in range(40):
+            article = Article.objects.create(
+                title=f'Index article {i}',
+                content='Content',
+                author=cls.author,
+                category=cls.category,
+                status=ArticleStatus.PUBLISHED if i % 4 else ArticleStatus.DRAFT,
+            )
+            if i % 2:
+                article.tags.add(cls.tag)
+        # Enough hidden rows (drafts, deactivated published articles) that
+        # the partial indexes over the visible ones cost less than the plain
+        # indexes on the same columns
+        Article.objects.bulk_create(
+            Article(
+                title=f'Index hidden {i}',
+                slug=f'index-hidden-{i}',
+                content='Content',
+                author=cls.author,
+                category=cls.category,
+                status=ArticleStatus.PUBLISHED if i % 2 else ArticleStatus.DRAFT,
+                is_active=not i % 2,
+            )
+            for i in range(400)
+        )
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+
+    def main_queryset(self, view_class, **kwargs):
+        view = view_class()
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        view.setup(request, **kwargs)
+        if view_class is AuthorDetailView:
+            view.object = view.get_object()
+            return view.get_context_data()['articles'][:10]
+        queryset = view.get_queryset()
+        return queryset if queryset.query.is_sliced else queryset[:10]
+
+    def assertIndexScan(self, queryset, index_name=None):
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            if connection.vendor == 'postgresql':
+                self.assertNotIn('Seq Scan on articles_article', line, plan)
+            elif ' articles_article ' in f'{line} ' and ('SCAN' in line or 'SEARCH' in line):
+                self.assertIn('INDEX', line, plan)
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_feed_uses_published_index(self):
+        self.assertIndexScan(self.main_queryset(HomeView), 'article_published_feed_idx')
+        self.assertIndexScan(self.main_queryset(ArticleListView), 'article_published_feed_idx')
+
+    def test_category_uses_published_index(self):
+        queryset = self.main_queryset(CategoryFilterView, slug=self.category.slug)
+        self.assertIndexScan(queryset, 'article_published_category_idx')
+
+    def test_author_uses_published_index(self):
+        queryset = self.main_queryset(AuthorDetailView, slug=self.author.slug)
+        self.assertIndexScan(queryset, 'article_published_author_idx')
+
+    def test_tag_filter_uses_indexes(self):
+        self.assertIndexScan(self.main_queryset(TagFilterView, slugs=self.tag.slug))
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class TagFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Tag Author')
+        category = Category.objects.create(name='Tag Category')
+        cls.red = Tag.objects.create(name='Red')
+        cls.blue = Tag.objects.create(name='Blue')
+        cls.articles = {}
+        for name, tags in [('red', [cls.red]), ('blue', [cls.blue]), ('both', [cls.red, cls.blue]), ('none', [])]:
+            article = Article.objects.create(
+                title=f'{name} article',
+                content='Content',
+                author=author,
+                category=category,
+                status=ArticleStatus.PUBLISHED,
+            )
+            article.tags.set(tags)
+            cls.articles[name] = article
+
+    def setUp(self):
+        cache.clear()
+        navigation_cache.invalidate()
+
+    def titles(self, slugs, **params):
+        response = self.client.get(reverse('articles:tag', args=[slugs]), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(article.title for article in response.context['articles'])
+
+    def test_any_mode_lists_each_article_once(self):
+        self.assertEqual(
+            self.titles('red/blue'),
+            ['blue article', 'both article', 'red article'],
+        )
+
+    def test_all_mode_requires_every_tag(self):
+        self.assertEqual(self.titles('red/blue', match='all'), ['both article'])
+
+    def test_unknown_slug(self):
+        self.assertEqual(self.titles('red/unknown'), ['both article', 'red article'])
+        self.assertEqual(self.titles('red/unknown', match='all'), [])
+        self.assertEqual(self.titles('unknown'), [])
+
+    def test_inactive_tag_is_ignored(self):
+        self.blue.is_active = False
+        self.blue.save()
+        self.assertEqual(self.titles('blue'), [])
+
+
+def photo_upload(name='photo.png', size=(600, 400), mode='RGBA'):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class NavigationSnapshotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        navigation_cache.invalidate()
+
+    def test_category_and_tag_changes_invalidate_their_snapshot(self):
+        category = Category.objects.create(name='Culture')
+        Tag.objects.create(name='music')
+        self.assertIn('Culture', [row.name for row in get_active_categories()])
+        self.assertEqual([row.name for row in get_active_tags()], ['music'])
+
+        with self.assertNumQueries(0):
+            get_active_categories()
+            get_active_tags()
+
+        Tag.objects.create(name='dance')
+        with self.assertNumQueries(1):
+            self.assertEqual([row.name for row in get_active_tags()], ['dance', 'music'])
+            # Only the tag snapshot was dropped
+            self.assertIn(category.slug, [row.slug for row in get_active_categories()])
+
+        category.delete()
+        self.assertNotIn('Culture', [row.name for row in get_active_categories()])
+
+
+class AuthorThumbnailTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_thumbnails_are_rendered_on_save(self):
+        author = Author.objects.create(name='Photo Author', photo=photo_upload())
+        self.assertTrue(author.has_photo_thumbnails)
+        self.assertEqual(Author.objects.get(pk=author.pk).photo_thumbnails_for, author.photo.name)
+        for size in THUMBNAIL_SIZES:
+            for extension, image_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                with default_storage.open(thumbnail_name(author.photo.name, size, extension)) as thumbnail:
+                    image = Image.open(thumbnail)
+                    self.assertEqual((image.format, image.size), (image_format, (size, size)))
+
+    def test_new_photo_replaces_thumbnails(self):
+        author = Author.objects.create(name='Photo Author', photo=photo_upload('old.png'))
+        old_names = thumbnail_names(author.photo.name)
+        author.photo = photo_upload('new.png', mode='RGB')
+        author.save()
+        self.assertTrue(author.has_photo_thumbnails)
+        self.assertFalse(any(default_storage.exists(name) for name in old_names))
+        self.assertTrue(all(default_storage.exists(name) for name in thumbnail_names(author.photo.name)))
+
+    def test_photos_with_the_same_stem_keep_their_own_thumbnails(self):
+        jpeg = Author.objects.create(name='Jpeg Author', photo=photo_upload('photo.jpg', mode='RGB'))
+        png = Author.objects.create(name='Png Author', photo=photo_upload('photo.png'))
+        self.assertTrue(set(thumbnail_names(jpeg.photo.name)).isdisjoint(thumbnail_names(png.photo.name)))
+
+        # Replacing one author's photo leaves the other's thumbnails alone
+        jpeg.photo = photo_upload('other.jpg', mode='RGB')
+        jpeg.save()
+        self.assertTrue(all(default_storage.exists(name) for name in thumbnail_names(png.photo.name)))
+
+    def test_shared_photo_keeps_its_thumbnails_while_in_use(self):
+        first = Author.objects.create(name='First Author', photo=photo_upload())
+        second = Author.objects.create(name='Second Author', photo=first.photo.name)
+        self.assertTrue(second.has_photo_thumbnails)
+        first.photo = photo_upload('new.png')
+        first.save()
+        self.assertTrue(all(default_storage.exists(name) for name in thumbnail_names(second.photo.name)))
+
+    def test_template_tag(self):
+        template = Template('{% load author_photos %}{% author_photo author 96 "avatar" %}')
+        author = Author.objects.create(name='Photo Author', photo=photo_upload())
+        html = template.render(Context({'author': author}))
+        self.assertInHTML(
+            '<source type="image/webp" sizes="96px" srcset="{}">'.format(', '.join(
+                f'{default_storage.url(thumbnail_name(author.photo.name, size, "webp"))} {size}w'
+                for size in THUMBNAIL_SIZES
+            )),
+            html,
+        )
+        self.assertIn(f'src="{default_storage.url(thumbnail_name(author.photo.name, 128, "jpg"))}"', html)
+        self.assertIn('width="96" height="96" loading="lazy"', html)
+
+        # Without thumbnails the original photo is used
+        Author.objects.filter(pk=author.pk).update(photo_thumbnails_for='')
+        author.refresh_from_db()
+        html = template.render(Context({'author': author}))
+        self.assertNotIn('srcset', html)
+        self.assertIn(f'src="{author.photo.url}"', html)
+
+    def test_backfill_command(self):
+        author = Author.objects.create(name='Photo Author', photo=photo_upload())
+        for name in thumbnail_names(author.photo.name):
+            default_storage.delete(name)
+        Author.objects.filter(pk=author.pk).update(photo_thumbnails_for='')
+
+        call_command('generate_author_thumbnails', processes=2, stdout=StringIO())
+        author.refresh_from_db()
+        self.assertTrue(author.has_photo_thumbnails)
+        self.assertTrue(all(default_storage.exists(name) for name in thumbnail_names(author.photo.name)))
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ArticleSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Summary Author')
+        cls.category = Category.objects.create(name='Summary Category')
+        cls.words = [f'word{i}' for i in range(40)]
+        cls.article = Article.objects.create(
+            title='Long read', content=' '.join(cls.words), author=cls.author, category=cls.category,
+            status=ArticleStatus.PUBLISHED,
+        )
+        cls.with_excerpt = Article.objects.create(
+            title='Short read', content='Body text', excerpt='Hand-written excerpt',
+            author=cls.author, category=cls.category, status=ArticleStatus.PUBLISHED,
+        )
+
+    def test_summary_is_stored_on_save(self):
+        self.assertEqual(self.article.summary, ' '.join(self.words[:Article.SUMMARY_WORDS]) + ' …')
+        self.assertEqual(self.with_excerpt.summary, 'Hand-written excerpt')
+
+        self.article.content = 'Rewritten body'
+        self.article.save(update_fields=['content'])
+        self.article.refresh_from_db(fields=['summary'])
+        self.assertEqual(self.article.summary, 'Rewritten body')
+
+    def test_list_pages_do_not_load_large_columns(self):
+        urls = [
+            reverse('articles:home'),
+            reverse('articles:list'),
+            reverse('articles:category', args=[self.category.slug]),
+        ]
+        deferred = [connection.ops.quote_name(name) for name in Article.LIST_DEFERRED_FIELDS]
+        for url in urls:
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+                self.assertContains(response, self.article.summary)
+                self.assertNotContains(response, self.words[-1])
+                for query in queries:
+                    if 'FROM "articles_article"' in query['sql']:
+                        for column in deferred:
+                            self.assertNotIn(f'"articles_article".{column}', query['sql'])
+
+    def test_backfill_only_missing_summaries(self):
+        Article.objects.filter(pk=self.article.pk).update(summary='')
+        Article.objects.filter(pk=self.with_excerpt.pk).update(summary='Outdated')
+        generation = get_content_generation()
+        out = StringIO()
+        call_command('backfill_summaries', '--only-missing', stdout=out)
+        self.assertIn('Updated 1 article summaries.', out.getvalue())
+        self.article.refresh_from_db(fields=['summary'])
+        self.assertTrue(self.article.summary.startswith('word0 word1'))
+        self.assertEqual(Article.objects.get(pk=self.with_excerpt.pk).summary, 'Outdated')
+        self.assertGreater(get_content_generation(), generation)
+
+
+class ContentRenderingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Render Author')
+        cls.category = Category.objects.create(name='Render Category')
+
+    def create_article(self, content, **kwargs):
+        return Article.objects.create(
+            title='Rendered', content=content, author=self.author, category=self.category,
+            status=ArticleStatus.PUBLISHED, **kwargs
+        )
+
+    def test_plain_text_becomes_paragraphs(self):
+        rendered = render_content('First line\nsecond 1 < 2 & more\n\nNext paragraph')
+        self.assertEqual(
+            rendered.html,
+            '<p>First line<br>second 1 &lt; 2 &amp; more</p>\n\n<p>Next paragraph</p>',
+        )
+        self.assertEqual(rendered.word_count, 10)
+
+    def test_markup_is_sanitized(self):
+        html = render_content(
+            '<h2 class="x">Title</h2><p onclick="steal()">Text <a href="javascript:alert(1)">bad</a> '
+            '<a href="https://example.com/?a=1&b=2" target="_blank">good</a></p>'
+            '<script>alert(1)</script><iframe src="https://example.com"></iframe><ul><li>one<li>two</ul>'
+        ).html
+        self.assertEqual(
+            html,
+            '<h2>Title</h2><p>Text <a>bad</a> <a href="https://example.com/?a=1&amp;b=2">good</a></p>'
+            '<ul><li>one</li><li>two</li></ul>',
+        )
+
+    def test_reading_time(self):
+        self.assertEqual(render_content('').reading_time, 0)
+        self.assertEqual(render_content('word ' * 10).reading_time, 1)
+        self.assertEqual(render_content('word ' * 401).reading_time, 3)
+
+    def test_rendered_on_save(self):
+        article = self.create_article('Hello <b>world</b>')
+        self.assertEqual(article.content_html, '<p>Hello <b>world</b></p>')
+        self.assertEqual((article.word_count, article.reading_time), (2, 1))
+        self.assertEqual(article.content_renderer_version, RENDERER_VERSION)
+
+        article.content = 'Changed text here'
+        article.save(update_fields=['content'])
+        article.refresh_from_db()
+        self.assertEqual((article.content_html, article.word_count), ('<p>Changed text here</p>', 3))
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_detail_page_shows_stored_html(self):
+        article = self.create_article('Body <em>text</em>')
+        Article.objects.filter(pk=article.pk).update(content_html='<p>Stored <em>HTML</em></p>')
+        response = self.client.get(reverse('articles:detail', args=[article.slug]))
+        self.assertContains(response, '<p>Stored <em>HTML</em></p>', html=True)
+        self.assertContains(response, '1 min read')
+
+    def test_rerender_command_updates_outdated_articles(self):
+        outdated = self.create_article('Needs <b>rendering</b>')
+        current = self.create_article('Up to date', slug='up-to-date')
+        Article.objects.filter(pk=outdated.pk).update(content_html='', word_count=0, content_renderer_version=0)
+        Article.objects.filter(pk=current.pk).update(content_html='<p>kept</p>')
+        before = Article.objects.get(pk=outdated.pk).updated_at
+
+        call_command('rerender_articles', processes=2, batch_size=1, stdout=StringIO())
+        outdated.refresh_from_db()
+        current.refresh_from_db()
+        self.assertEqual(outdated.content_html, '<p>Needs <b>rendering</b></p>')
+        self.assertEqual((outdated.word_count, outdated.content_renderer_version), (2, RENDERER_VERSION))
+        self.assertGreater(outdated.updated_at, before)
+        self.assertEqual(current.content_html, '<p>kept</p>')
+
+
+class RelatedArticleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Related Author')
+        cls.food = Category.objects.create(name='Food')
+        cls.sport = Category.objects.create(name='Sport')
+        cls.cooking = Tag.objects.create(name='cooking')
+        cls.football = Tag.objects.create(name='football')
+        cls.curry = cls.create_article('Spicy curry recipe', 'Cooking curry with coconut and chilli', cls.food, cls.cooking)
+        cls.biryani = cls.create_article('Biryani recipe', 'Cooking rice with spices, coconut and chilli', cls.food, cls.cooking)
+        cls.dosa = cls.create_article('Crispy dosa', 'Fermented batter, coconut chutney', cls.food, cls.cooking)
+        cls.match = cls.create_article('Football final', 'The match ended with a late goal', cls.sport, cls.football)
+        recompute_related_articles()
+
+    @classmethod
+    def create_article(cls, title, content, category, tag, **kwargs):
+        article = Article.objects.create(
+            title=title, content=content, author=cls.author, category=category,
+            status=kwargs.pop('status', ArticleStatus.PUBLISHED), **kwargs
+        )
+        article.tags.add(tag)
+        return article
+
+    def setUp(self):
+        cache.clear()
+
+    def related(self, article):
+        return list(RelatedArticle.objects.filter(article=article).order_by('rank').values_list('related_id', flat=True))
+
+    def test_recompute_ranks_similar_articles(self):
+        self.assertEqual(self.related(self.curry), [self.biryani.pk, self.dosa.pk])
+        self.assertEqual(self.related(self.match), [])
+        self.assertTrue(ArticleTerm.objects.filter(article=self.curry, term='curry').exists())
+
+    def test_full_rebuild_matches_incremental_search(self):
+        # Shares no term with the other articles, only a tag
+        snacks = self.create_article('Stadium snacks', 'Sold at the ground', self.sport, self.cooking)
+        recompute_related_articles()
+        articles = [self.curry, self.biryani, self.dosa, self.match, snacks]
+        lists = RelatedArticle.objects.order_by('article_id', 'rank').values_list('article_id', 'related_id', 'score')
+        rebuilt = list(lists)
+        self.assertIn(snacks.pk, self.related(self.curry))
+
+        for article in articles:
+            refresh_related_articles(article.pk)
+        searched = list(lists)
+        self.assertEqual([row[:2] for row in searched], [row[:2] for row in rebuilt])
+        for (_, _, score), (_, _, rebuilt_score) in zip(searched, rebuilt):
+            self.assertAlmostEqual(score, rebuilt_score)
+
+    def test_publish_and_unpublish_update_other_lists(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            korma = self.create_article('Korma curry recipe', 'Curry cooking with coconut', self.food, self.cooking)
+        # Saving only queues the update
+        self.assertNotIn(korma.pk, self.related(self.curry))
+        self.assertEqual(process_pending_updates(), 1)
+        self.assertIn(korma.pk, self.related(self.curry))
+        self.assertEqual(self.related(korma)[0], self.curry.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            korma.status = ArticleStatus.DRAFT
+            korma.save()
+        process_pending_updates()
+        self.assertNotIn(korma.pk, self.related(self.curry))
+        self.assertEqual(self.related(korma), [])
+        self.assertFalse(ArticleTerm.objects.filter(article=korma).exists())
+        self.assertFalse(PendingRelatedUpdate.objects.exists())
+
+    def test_deleted_article_leaves_lists(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dosa.delete()
+        self.assertCountEqual(PendingRelatedUpdate.objects.values_list('article_id', 'refresh_only'),
+                              [(self.curry.pk, True), (self.biryani.pk, True)])
+        generation = get_content_generation()
+        process_pending_updates()
+        self.assertEqual(self.related(self.curry), [self.biryani.pk])
+        self.assertGreater(get_content_generation(), generation)
+
+    def test_request_leaves_its_updates_to_the_worker(self):
+        pilau = self.create_article('Pilau rice', 'Cooking rice with coconut', self.food, self.cooking,
+                                    status=ArticleStatus.DRAFT)
+        self.client.force_login(User.objects.create_superuser('related-admin', 'related@example.com', 'password'))
+        response = self.client.post(reverse('admin:articles_article_changelist'), {
+            'action': 'publish_selected', '_selected_action': [pilau.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn(pilau.pk, self.related(self.biryani))
+        self.assertTrue(PendingRelatedUpdate.objects.filter(article_id=pilau.pk).exists())
+
+        # The worker polls the queue until it is stopped. Like the test
+        # client, keep the connection of the test transaction open
+        worker = 'articles.management.commands.process_related_updates'
+        with mock.patch(f'{worker}.time.sleep', side_effect=KeyboardInterrupt), \
+                mock.patch(f'{worker}.close_old_connections'):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('process_related_updates', interval=10, stdout=StringIO())
+        self.assertIn(pilau.pk, self.related(self.biryani))
+        self.assertFalse(PendingRelatedUpdate.objects.exists())
+
+    def test_command_applies_queued_updates_once(self):
+        PendingRelatedUpdate.objects.bulk_create([
+            PendingRelatedUpdate(article_id=self.match.pk, refresh_only=True),
+            PendingRelatedUpdate(article_id=self.match.pk),
+        ])
+        # Another process is working the queue
+        cache.add(UPDATE_LOCK_KEY, True)
+        self.assertEqual(process_pending_updates(), 0)
+        cache.delete(UPDATE_LOCK_KEY)
+
+        out = StringIO()
+        call_command('process_related_updates', stdout=out)
+        self.assertIn('Updated the related articles of 1 articles', out.getvalue())
+        self.assertFalse(PendingRelatedUpdate.objects.exists())
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_detail_page_lists_related_articles(self):
+        response = self.client.get(reverse('articles:detail', args=[self.curry.slug]))
+        self.assertEqual(list(response.context['related_articles']), [self.biryani, self.dosa])
+        self.assertContains(response, 'Related articles')
+
+
+class FeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Feed Author')
+        cls.category = Category.objects.create(name='Feed Category')
+        cls.tag = Tag.objects.create(name='feedtag')
+        cls.article = Article.objects.create(
+            title='Feed article', content='The full <b>body</b>', excerpt='Short summary',
+            author=cls.author, category=cls.category, status=ArticleStatus.PUBLISHED,
+        )
+        cls.article.tags.add(cls.tag)
+        Article.objects.create(
+            title='Draft article', content='Draft', author=cls.author, category=cls.category,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_list_published_articles(self):
+        urls = [
+            reverse('articles:feed'),
+            reverse('articles:feed_atom'),
+            reverse('articles:category_feed', args=[self.category.slug]),
+            reverse('articles:author_feed', args=[self.author.slug]),
+            reverse('articles:tag_feed_atom', args=[self.tag.slug]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, self.article.get_absolute_url())
+                self.assertContains(response, 'Short summary')
+                self.assertNotContains(response, 'Draft article')
+                self.assertNotContains(response, 'full')
+        self.assertEqual(self.client.get(reverse('articles:tag_feed', args=['missing'])).status_code, 404)
+
+    @override_settings(FEED_FULL_CONTENT=True)
+    def test_full_content(self):
+        response = self.client.get(reverse('articles:feed'))
+        self.assertContains(response, 'The full &lt;b&gt;body&lt;/b&gt;')
+
+    def test_unchanged_feed_is_not_modified(self):
+        url = reverse('articles:category_feed', args=[self.category.slug])
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, headers={'if-none-match': response['ETag']}).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(
+                title='Newer article', content='New', author=self.author, category=self.category,
+                status=ArticleStatus.PUBLISHED,
+            )
+        response = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Newer article')
+
+
+class SitemapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Sitemap Author')
+        category = Category.objects.create(name='Sitemap Category')
+        for i in range(5):
+            Article.objects.create(
+                title=f'Sitemap article {i}', content='Text', author=author, category=category,
+                status=ArticleStatus.PUBLISHED,
+            )
+        Article.objects.create(title='Sitemap draft', content='Text', author=author, category=category)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+
+    def test_sections_are_sharded(self):
+        stats = write_sitemaps(self.root, limit=2)
+        self.assertEqual(stats['articles'], 3)
+        index = (self.root / 'sitemap.xml').read_text()
+        self.assertIn('<loc>https://asanbay.org/sitemap-articles-3.xml</loc>', index)
+        articles = ''.join((self.root / f'sitemap-articles-{i}.xml').read_text() for i in (1, 2, 3))
+        self.assertEqual(articles.count('<url>'), 5)
+        self.assertIn('<loc>https://asanbay.org/articles/sitemap-article-0/</loc><lastmod>', articles)
+        self.assertNotIn('sitemap-draft', articles)
+
+        # Shards no longer listed are removed
+        write_sitemaps(self.root)
+        self.assertFalse((self.root / 'sitemap-articles-2.xml').exists())
+
+    def test_views_build_and_serve_files(self):
+        with override_settings(SITEMAP_ROOT=self.root):
+            response = self.client.get('/sitemap.xml')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'sitemap-articles-1.xml', b''.join(response.streaming_content))
+            response = self.client.get('/sitemap-articles-1.xml', headers={'if-modified-since': response['Last-Modified']})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(self.client.get('/sitemap-articles-9.xml').status_code, 404)
+
+    @override_settings(SITEMAP_MAX_AGE=60)
+    def test_stale_files_are_served_while_rebuilt_in_the_background(self):
+        write_sitemaps(self.root)
+        index = self.root / 'sitemap.xml'
+        index.write_text('stale')
+        os.utime(index, (time.time() - 120,) * 2)
+        with override_settings(SITEMAP_ROOT=self.root), mock.patch('articles.sitemaps.threading.Thread') as thread:
+            for _ in range(2):
+                response = self.client.get('/sitemap.xml')
+                self.assertEqual(b''.join(response.streaming_content), b'stale')
+            # Only the request holding the lock starts a rebuild
+            thread.assert_called_once_with(target=rebuild_sitemaps, args=(self.root,), daemon=True)
+            self.assertTrue(cache.get(REBUILD_LOCK_KEY))
+            # Run here instead of in the thread, keeping the test's connection open
+            with mock.patch('articles.sitemaps.connections') as connections:
+                rebuild_sitemaps(self.root)
+            connections.close_all.assert_called_once_with()
+        self.assertIsNone(cache.get(REBUILD_LOCK_KEY))
+        self.assertIn('<sitemapindex', index.read_text())
+
+    def test_missing_files_while_the_first_build_runs(self):
+        cache.add(REBUILD_LOCK_KEY, True)
+        with override_settings(SITEMAP_ROOT=self.root):
+            response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertFalse((self.root / 'sitemap.xml').exists())
+
+
+class ArticleApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Api Author')
+        cls.news = Category.objects.create(name='News')
+        other = Category.objects.create(name='Other')
+        cls.tag = Tag.objects.create(name='apitag')
+        cls.articles = []
+        for i in range(5):
+            article = Article.objects.create(
+                title=f'Api article {i}', content='Text', author=author,
+                category=cls.news if i % 2 == 0 else other, status=ArticleStatus.PUBLISHED,
+            )
+            cls.articles.append(article)
+        cls.articles[0].tags.add(cls.tag)
+        Article.objects.create(title='Api draft', content='Text', author=author, category=cls.news)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **params):
+        return self.client.get(reverse('articles:api_articles'), params)
+
+    def test_pages_follow_next_links(self):
+        response = self.get(limit=2, fields='id,title,tags,url')
+        data = response.json()
+        self.assertEqual(
+            data['results'][0],
+            {'id': self.articles[4].pk, 'title': 'Api article 4', 'tags': [],
+             'url': 'http://testserver' + self.articles[4].get_absolute_url()},
+        )
+        ids = [item['id'] for item in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            ids += [item['id'] for item in data['results']]
+        self.assertEqual(ids, [article.pk for article in reversed(self.articles)])
+
+    def test_filters_and_errors(self):
+        data = self.get(category=self.news.slug, fields='id').json()
+        self.assertEqual(len(data['results']), 3)
+        data = self.get(tag=self.tag.slug, fields='id,tags').json()
+        self.assertEqual(data['results'], [{'id': self.articles[0].pk, 'tags': ['apitag']}])
+        self.assertEqual(self.get(fields='id,password').status_code, 400)
+        self.assertEqual(self.get(since='yesterday').status_code, 400)
+        self.assertEqual(self.get(limit=1000).status_code, 400)
+        response = self.get(cursor='bogus')
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Invalid cursor.'}))
+
+    def test_since_returns_changes_oldest_first(self):
+        since = Article.objects.latest('updated_at').updated_at
+        changed = self.articles[1]
+        changed.title = 'Edited'
+        changed.save()
+        data = self.get(since=since.isoformat(), fields='id,title').json()
+        self.assertEqual(data['results'], [{'id': changed.pk, 'title': 'Edited'}])
+
+    def test_ndjson_export_streams_every_article(self):
+        response = self.get(format='ndjson', fields='id,author,category')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0]), {'id': self.articles[4].pk, 'author': 'Api Author', 'category': 'News'})
+
+    @mock.patch('articles.api.CHUNK_SIZE', 2)
+    def test_ndjson_export_is_sent_in_chunks(self):
+        response = self.get(format='ndjson', fields='id')
+        self.assertFalse(response.is_async)
+        chunks = list(response.streaming_content)
+        self.assertEqual([len(chunk.splitlines()) for chunk in chunks], [2, 2, 1])
+
+    @mock.patch('articles.api.CHUNK_SIZE', 2)
+    async def test_ndjson_export_is_async_under_asgi(self):
+        # A synchronous iterator would be read into a list before sending
+        response = await self.async_client.get(reverse('articles:api_articles'), {'format': 'ndjson', 'fields': 'id'})
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([len(chunk.splitlines()) for chunk in chunks], [2, 2, 1])
+        ids = [json.loads(line)['id'] for line in b''.join(chunks).decode().splitlines()]
+        self.assertEqual(ids, [article.pk for article in reversed(self.articles)])
+
+
+class ArticleAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin-tests', 'admin@example.com', 'password')
+        cls.tag = Tag.objects.create(name='admintag')
+        for i in range(3):
+            author = Author.objects.create(name=f'Admin Author {i}')
+            category = Category.objects.create(name=f'Admin Category {i}')
+            article = Article.objects.create(
+                title=f'Admin article {i}', content=f'Body word{i}', author=author, category=category,
+            )
+            if i == 0:
+                article.tags.add(cls.tag)
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def changelist(self, query=''):
+        return self.client.get(reverse('admin:articles_article_changelist') + query)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.changelist()
+        with CaptureQueriesContext(connection) as few:
+            self.changelist()
+        Article.objects.create(
+            title='Admin article 3', content='Body', author=Author.objects.create(name='Admin Author 3'),
+            category=Category.objects.create(name='Admin Category 3'),
+        )
+        with CaptureQueriesContext(connection) as more:
+            response = self.changelist()
+        self.assertContains(response, 'Admin Author 3')
+        self.assertEqual(len(more), len(few))
+
+    def test_tag_filter_and_search(self):
+        response = self.changelist('?tag=admintag')
+        self.assertEqual([article.title for article in response.context['cl'].result_list], ['Admin article 0'])
+        self.assertContains(response, 'data-autocomplete-url=')
+        response = self.changelist('?q=word2')
+        self.assertEqual([article.title for article in response.context['cl'].result_list], ['Admin article 2'])
+
+    def test_tag_autocomplete(self):
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'articles', 'model_name': 'article', 'field_name': 'tags', 'term': 'admin',
+        })
+        self.assertEqual(response.json()['results'], [{'id': str(self.tag.pk), 'text': 'admintag'}])
+
+
+class StatusTransitionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Transition Author')
+        cls.category = Category.objects.create(name='Transition Category')
+        cls.tag = Tag.objects.create(name='transitiontag')
+        cls.drafts = []
+        for i in range(3):
+            article = Article.objects.create(
+                title=f'Transition {i}', content='Text', author=cls.author, category=cls.category,
+            )
+            article.tags.add(cls.tag)
+            cls.drafts.append(article)
+        cls.earlier = Article.objects.get(pk=cls.drafts[0].pk).created_at
+        Article.objects.filter(pk=cls.drafts[0].pk).update(published_at=cls.earlier)
+
+    def counters(self):
+        return [
+            model.objects.get(pk=pk).published_articles_count
+            for model, pk in ((Author, self.author.pk), (Category, self.category.pk), (Tag, self.tag.pk))
+        ]
+
+    def test_publish_and_archive_in_one_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = change_status(Article.objects.filter(author=self.author), ArticleStatus.PUBLISHED)
+        self.assertEqual(stats['articles'], 3)
+        self.assertEqual(self.counters(), [3, 3, 3])
+        articles = Article.objects.filter(author=self.author).order_by('pk')
+        # An existing publication date is kept
+        self.assertEqual(articles[0].published_at, self.earlier)
+        self.assertTrue(all(article.published_at for article in articles))
+        self.assertEqual(PendingRelatedUpdate.objects.count(), 3)
+        process_pending_updates()
+        self.assertTrue(RelatedArticle.objects.filter(article=self.drafts[1]).exists())
+
+        stats = change_status(Article.objects.filter(pk=self.drafts[2].pk), ArticleStatus.ARCHIVED)
+        self.assertEqual(stats['articles'], 1)
+        self.assertEqual(self.counters(), [2, 2, 2])
+        self.assertEqual(change_status(Article.objects.filter(pk=self.drafts[2].pk), ArticleStatus.ARCHIVED)['articles'], 0)
+
+    def test_large_selection_queues_every_article(self):
+        for i in range(3, 30):
+            Article.objects.create(title=f'Transition {i}', content='Text', author=self.author, category=self.category)
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = change_status(Article.objects.filter(author=self.author), ArticleStatus.PUBLISHED)
+        self.assertEqual((stats['articles'], stats['related_queued']), (30, 30))
+        self.assertEqual(PendingRelatedUpdate.objects.count(), 30)
+        process_pending_updates()
+        self.assertEqual(RelatedArticle.objects.values('article').distinct().count(), 30)
+
+        # Drafts that are archived never were on a related list
+        change_status(Article.objects.filter(pk__in=[article.pk for article in self.drafts]), ArticleStatus.DRAFT)
+        process_pending_updates()
+        stats = change_status(Article.objects.filter(status=ArticleStatus.DRAFT), ArticleStatus.ARCHIVED)
+        self.assertEqual((stats['articles'], stats['related_queued']), (3, 0))
+
+    def test_admin_action(self):
+        self.client.force_login(User.objects.create_superuser('transition-admin', 'a@example.com', 'password'))
+        response = self.client.post(reverse('admin:articles_article_changelist'), {
+            'action': 'publish_selected',
+            '_selected_action': [article.pk for article in self.drafts[:2]],
+        }, follow=True)
+        self.assertContains(response, '2 articles changed to published')
+        self.assertEqual(self.counters(), [2, 2, 2])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('change_article_status', 'published', '--from-status', 'draft', '--limit', '2', stdout=out)
+        self.assertIn('Changed 2 articles to published', out.getvalue())
+        self.assertIn('Queued the related articles of 2 articles', out.getvalue())
+        self.assertEqual(self.counters(), [2, 2, 2])
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Search Author')
+        category = Category.objects.create(name='Search Category')
+
+        def create(title, content, excerpt=''):
+            return Article.objects.create(
+                title=title, content=content, excerpt=excerpt, author=author, category=category,
+                status=ArticleStatus.PUBLISHED,
+            )
+
+        cls.in_content = create('Field notes', 'The village wells ran dry before the rains came.')
+        cls.in_title = create('Wells of the valley', 'A survey of the region.')
+        cls.in_excerpt = create('Spring survey', 'Nothing about it here.', excerpt='Mapping the wells.')
+        cls.unrelated = create('Harbour report', 'Boats and nets.')
+
+    def test_query_matches_every_word_as_a_prefix(self):
+        self.assertEqual(
+            build_search_query('  wel, dry-season!'),
+            SearchQuery('wel:* & dry:* & season:*', search_type='raw', config=get_search_config()),
+        )
+
+    def test_query_without_words(self):
+        for text in ('', '   ', '?!', '-- & |'):
+            with self.subTest(text=text):
+                self.assertIsNone(build_search_query(text))
+
+    def test_empty_search_lists_everything_by_date(self):
+        queryset = Article.objects.all()
+        self.assertEqual(list(search_articles(queryset, '   ')), list(queryset.order_by('-published_at', '-created_at')))
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search needs PostgreSQL')
+    def test_results_are_ranked_title_excerpt_content(self):
+        results = list(search_articles(Article.objects.all(), 'wel'))
+        self.assertEqual(results, [self.in_title, self.in_excerpt, self.in_content])
+        self.assertGreater(results[0].rank, results[1].rank)
+        self.assertGreater(results[1].rank, results[2].rank)
+        self.assertEqual(list(search_articles(Article.objects.all(), 'wells dry')), [self.in_content])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search needs PostgreSQL')
+    def test_punctuation_only_matches_nothing_without_a_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(list(search_articles(Article.objects.all(), '?!')), [])
+
+    @skipIf(connection.vendor == 'postgresql', 'PostgreSQL uses the tsvector backend')
+    def test_other_databases_fall_back_to_icontains(self):
+        results = search_articles(Article.objects.all(), 'WELLS')
+        self.assertEqual(set(results), {self.in_title, self.in_excerpt, self.in_content})
+        self.assertEqual(list(results), list(results.order_by('-published_at', '-created_at')))
+        self.assertEqual(list(search_articles(Article.objects.all(), 'wells dry')), [])
+
+
+class KeysetPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Keyset Author')
+        category = Category.objects.create(name='Keyset Category')
+        for i in range(12):
+            Article.objects.create(
+                title=f'Keyset {i}', content='Text', author=author, category=category,
+                status=ArticleStatus.PUBLISHED,
+            )
+        # Equal sort keys: only the id tie-breaker orders these rows
+        articles = Article.objects.filter(title__startswith='Keyset')
+        articles.update(published_at=articles.first().published_at, created_at=articles.first().created_at)
+
+    def setUp(self):
+        self.queryset = Article.objects.filter(title__startswith='Keyset').order_by('-published_at', '-created_at')
+        self.expected = list(self.queryset.order_by('-id').values_list('pk', flat=True))
+
+    def pks(self, page):
+        return [article.pk for article in page]
+
+    def test_pages_forward_and_back_with_equal_sort_keys(self):
+        paginator = KeysetPaginator(self.queryset, 5, with_count=True)
+        self.assertEqual(paginator.ordering, [('published_at', True), ('created_at', True), ('id', True)])
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        self.assertEqual(self.pks(first) + self.pks(second) + self.pks(third), self.expected)
+        self.assertEqual((first.has_previous(), first.has_next()), (False, True))
+        self.assertEqual((third.has_previous(), third.has_next()), (True, False))
+        self.assertIsNone(third.next_cursor)
+        self.assertEqual(paginator.count, 12)
+
+        back = paginator.page(third.previous_cursor)
+        self.assertEqual(self.pks(back), self.pks(second))
+        self.assertEqual((back.has_previous(), back.has_next()), (True, True))
+        self.assertEqual(self.pks(paginator.page(back.previous_cursor)), self.pks(first))
+        self.assertFalse(paginator.page(back.previous_cursor).has_previous())
+
+    def test_count_only_when_requested(self):
+        paginator = KeysetPaginator(self.queryset, 3)
+        with self.assertNumQueries(1):
+            paginator.page()
+            self.assertIsNone(paginator.count)
+
+    def test_invalid_and_tampered_cursors(self):
+        paginator = KeysetPaginator(self.queryset, 3)
+        cursor = paginator.page().next_cursor
+        direction, values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        for bad in ['bogus', '!!!', encode(['x', values]), encode([direction, values[:2]]),
+                    encode([direction, ['not a date', values[1], values[2]]]), encode({'n': 1})]:
+            with self.subTest(cursor=bad), self.assertRaises(InvalidCursor):
+                paginator.page(bad)
+
+    def test_unsupported_ordering_is_rejected(self):
+        for queryset in (Article.objects.all(), Article.objects.order_by('author__name')):
+            with self.subTest(ordering=queryset.query.order_by), self.assertRaises(ImproperlyConfigured):
+                KeysetPaginator(queryset, 3)
+
+    @override_settings(ARTICLE_PAGINATION='cursor', RESPONSE_CACHE_ENABLED=False)
+    def test_category_view_follows_cursors(self):
+        url = reverse('articles:category', kwargs={'slug': Category.objects.get(name='Keyset Category').slug})
+        first = self.client.get(url)
+        self.assertTrue(first.context['cursor_pagination'])
+        second = self.client.get(url, {'cursor': first.context['page_obj'].next_cursor})
+        self.assertEqual(
+            [article.pk for article in first.context['articles']] +
+            [article.pk for article in second.context['articles']],
+            self.expected,
+        )
+        self.assertEqual(self.client.get(url, {'cursor': 'bogus'}).status_code, 404)
+
+
+class PublishedCounterTests(TestCase):
+    """The stored counters must always equal a Count() over the published articles."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [Author.objects.create(name=f'Counter Author {i}') for i in range(2)]
+        cls.categories = [Category.objects.create(name=f'Counter Category {i}') for i in range(2)]
+        cls.tags = [Tag.objects.create(name=f'countertag{i}') for i in range(3)]
+
+    def create(self, status=ArticleStatus.PUBLISHED, tags=(), **fields):
+        article = Article.objects.create(
+            title=f'Counted {Article.objects.count()}', content='Text', author=self.authors[0],
+            category=self.categories[0], status=status, **fields,
+        )
+        article.tags.add(*tags)
+        return article
+
+    def assertCountersMatch(self):
+        published = Q(articles__status=ArticleStatus.PUBLISHED, articles__is_active=True)
+        for model in (Author, Category, Tag):
+            rows = model.objects.annotate(expected=Count('articles', filter=published))
+            self.assertEqual(
+                {row.pk: row.published_articles_count for row in rows},
+                {row.pk: row.expected for row in rows},
+                model.__name__,
+            )
+
+    def test_status_and_visibility_changes(self):
+        article = self.create(status=ArticleStatus.DRAFT, tags=self.tags[:2])
+        self.assertCountersMatch()
+        for changes in ({'status': ArticleStatus.PUBLISHED}, {'is_active': False}, {'is_active': True},
+                        {'status': ArticleStatus.ARCHIVED}, {'status': ArticleStatus.PUBLISHED}):
+            for field, value in changes.items():
+                setattr(article, field, value)
+            article.save()
+            with self.subTest(**changes):
+                self.assertCountersMatch()
+        self.assertEqual(Tag.objects.get(pk=self.tags[0].pk).published_articles_count, 1)
+
+    def test_author_and_category_reassignment(self):
+        article = self.create(tags=self.tags[:1])
+        article.author = self.authors[1]
+        article.save()
+        self.assertCountersMatch()
+        article.category = self.categories[1]
+        article.status = ArticleStatus.DRAFT
+        article.save()
+        self.assertCountersMatch()
+        article.status = ArticleStatus.PUBLISHED
+        article.author = self.authors[0]
+        article.save()
+        self.assertCountersMatch()
+
+    def test_deletes(self):
+        published = self.create(tags=self.tags)
+        draft = self.create(status=ArticleStatus.DRAFT, tags=self.tags)
+        self.assertCountersMatch()
+        published.delete()
+        self.assertCountersMatch()
+        draft.delete()
+        self.assertCountersMatch()
+
+    def test_tag_changes_from_the_article_side(self):
+        article = self.create(tags=self.tags[:1])
+        draft = self.create(status=ArticleStatus.DRAFT)
+        article.tags.add(self.tags[1], self.tags[2])
+        draft.tags.add(self.tags[1])
+        self.assertCountersMatch()
+        article.tags.remove(self.tags[0])
+        self.assertCountersMatch()
+        article.tags.set([self.tags[0]])
+        self.assertCountersMatch()
+        article.tags.clear()
+        draft.tags.clear()
+        self.assertCountersMatch()
+
+    def test_tag_changes_from_the_tag_side(self):
+        published = [self.create(), self.create()]
+        draft = self.create(status=ArticleStatus.DRAFT)
+        tag = self.tags[0]
+        tag.articles.add(*published, draft)
+        self.assertCountersMatch()
+        tag.articles.remove(published[0], draft)
+        self.assertCountersMatch()
+        tag.articles.add(published[0])
+        tag.articles.clear()
+        self.assertCountersMatch()
+        self.assertEqual(Tag.objects.get(pk=tag.pk).published_articles_count, 0)
+
+
+class BulkImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Import Author')
+        cls.category = Category.objects.create(name='Import Category')
+        Article.objects.create(title='Harvest report', content='Text', author=cls.author, category=cls.category)
+        Article.objects.create(title='Other', slug='harvest-report-1', content='Text', author=cls.author,
+                               category=cls.category)
+
+    def import_file(self, lines, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as handle:
+            handle.write('\n'.join(lines) + '\n')
+        self.addCleanup(Path(handle.name).unlink)
+        call_command('import_articles', handle.name, *args, stdout=StringIO())
+        return handle.name
+
+    def row(self, title, **fields):
+        return json.dumps({'title': title, 'content': 'Body', 'author': 'Import Author',
+                           'category': 'Import Category', 'tags': ['harvest'], **fields})
+
+    def test_slugs_are_allocated_per_batch_with_one_query(self):
+        allocator = SlugAllocator(Article)
+        long_title = 'word ' * 60
+        Article.objects.create(title='Long', slug=allocator.base(long_title), content='Text', author=self.author,
+                               category=self.category)
+        with self.assertNumQueries(1):
+            slugs = allocator.allocate_many(['Harvest report', 'Harvest report', '!!!', long_title], fallback='article')
+        self.assertEqual(slugs[:3], ['harvest-report-2', 'harvest-report-3', 'article'])
+        self.assertEqual(len(slugs[3]), 200)
+        self.assertTrue(slugs[3].endswith('-1'))
+
+    def test_import_maintains_counters_and_slugs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_file([self.row('Harvest report'), '', self.row('Second', slug='Harvest Report')],
+                             '--batch-size', '1')
+        self.assertEqual(
+            list(Article.objects.filter(content='Body').order_by('pk').values_list('slug', flat=True)),
+            ['harvest-report-2', 'harvest-report-3'],
+        )
+        self.assertEqual(Tag.objects.get(slug='harvest').published_articles_count, 2)
+        self.assertEqual(Author.objects.get(pk=self.author.pk).published_articles_count, 2)
+
+    def test_failed_import_refreshes_the_written_batches(self):
+        generation = get_content_generation()
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaisesMessage(CommandError, ':3: missing "title"'):
+            self.import_file([self.row('First'), self.row('Second'), self.row('')], '--batch-size', '2')
+        self.assertEqual(Article.objects.filter(content='Body').count(), 2)
+        self.assertEqual(Tag.objects.get(slug='harvest').published_articles_count, 2)
+        self.assertEqual(Author.objects.get(pk=self.author.pk).published_articles_count, 2)
+        self.assertNotEqual(get_content_generation(), generation)
+
+    def test_malformed_rows_are_reported_with_their_line(self):
+        cases = [
+            ([self.row('First'), '{"title": '], ':2: invalid JSON'),
+            (['["not", "an", "object"]'], ':1: expected a JSON object'),
+            ([self.row('Tags', tags='harvest')], ':1: "tags" must be a list of names'),
+            ([self.row('Author', author=['Import Author'])], ':1: "author" must be a string'),
+            ([self.row('x' * 201)], ':1: "title" is longer than 200 characters'),
+            ([self.row('Long tag', author='New Author', tags=['t' * 51])],
+             f':1: tag name "{"t" * 50}..." is longer than 50 characters'),
+        ]
+        for lines, message in cases:
+            with self.subTest(message=message), self.assertRaisesMessage(CommandError, message):
+                self.import_file(lines)
+        self.assertFalse(Article.objects.filter(content='Body').exists())
+        # Nothing of a rejected row is written
+        self.assertFalse(Author.objects.filter(name='New Author').exists())
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class AsyncSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Search Author')
+        category = Category.objects.create(name='Search Category')
+        for i in range(12):
+            Article.objects.create(
+                title=f'Harvest report {i}', content='Harvest numbers', author=author, category=category,
+                status=ArticleStatus.PUBLISHED,
+            )
+        Article.objects.create(title='Unrelated', content='Other', author=author, category=category,
+                               status=ArticleStatus.PUBLISHED)
+
+    def setUp(self):
+        navigation_cache.invalidate()
+        self.url = reverse('articles:search')
+
+    async def test_pages_are_read_through_the_async_client(self):
+        response = await self.async_client.get(self.url, {'q': 'harvest'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertEqual(len(response.context['articles']), 10)
+        self.assertTemplateUsed(response, 'articles/article_list.html')
+
+        response = await self.async_client.get(self.url, {'q': 'harvest', 'page': 2}, headers={'HX-Request': 'true'})
+        self.assertEqual(len(response.context['articles']), 2)
+        self.assertTemplateUsed(response, 'articles/article_list_partial.html')
+        self.assertEqual((await self.async_client.get(self.url, {'q': 'harvest', 'page': 3})).status_code, 404)
+
+    async def test_cursor_pages(self):
+        first = await self.async_client.get(self.url, {'q': 'harvest', 'cursor': '', 'count': '1'})
+        page = first.context['page_obj']
+        self.assertEqual(first.context['paginator'].count, 12)
+        self.assertTrue(page.has_next())
+        second = await self.async_client.get(self.url, {'q': 'harvest', 'cursor': page.next_cursor})
+        titles = {article.title for article in first.context['articles']}
+        titles |= {article.title for article in second.context['articles']}
+        self.assertEqual(len(titles), 12)
+        self.assertFalse(second.context['page_obj'].has_next())
+        self.assertEqual((await self.async_client.get(self.url, {'q': 'harvest', 'cursor': 'bogus'})).status_code, 404)
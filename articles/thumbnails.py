@@ -0,0 +1,91 @@
+"""
+Fixed-size author photo thumbnails.
+
+Author photos are uploaded at any size but shown as small round avatars.
+render_thumbnails() writes square crops of a photo at each of
+THUMBNAIL_SIZES, as WebP plus a JPEG fallback, next to the original:
+
+    authors/jane.jpg -> authors/thumbs/jane.jpg-64.webp, authors/thumbs/jane.jpg-64.jpg, ...
+
+Names are derived from the whole photo file name, extension included (so
+jane.jpg and jane.png, two different uploads, never share thumbnails), and
+templates can build the URLs without a query. Author.photo_thumbnails_for
+records the photo name the thumbnails were rendered for; a new upload gets
+a new name (the storage never overwrites), which makes the old thumbnails
+stale.
+
+The module does not import the models, so that it can be imported by the
+worker processes of the generate_author_thumbnails command.
+"""
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+THUMBNAIL_SIZES = (64, 128, 256)
+
+# (extension, Pillow format, MIME type, save options), preferred first
+THUMBNAIL_FORMATS = (
+    ('webp', 'WEBP', 'image/webp', {'quality': 80, 'method': 6}),
+    ('jpg', 'JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+def thumbnail_name(photo_name, size, extension):
+    directory, filename = posixpath.split(photo_name)
+    return posixpath.join(directory, 'thumbs', f'{filename}-{size}.{extension}')
+
+
+def thumbnail_names(photo_name):
+    return [
+        thumbnail_name(photo_name, size, extension)
+        for size in THUMBNAIL_SIZES
+        for extension, *_ in THUMBNAIL_FORMATS
+    ]
+
+
+def thumbnail_srcset(photo_name, extension, storage=default_storage):
+    """The srcset attribute value of one format: "url 64w, url 128w, ..."."""
+    return ', '.join(
+        f'{storage.url(thumbnail_name(photo_name, size, extension))} {size}w'
+        for size in THUMBNAIL_SIZES
+    )
+
+
+def flatten(image):
+    """Return an RGB copy of the image, with transparency composited on white."""
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render_thumbnails(photo_name, storage=default_storage):
+    """
+    Write every thumbnail of a stored photo, replacing existing ones, and
+    return photo_name. Raises OSError if the photo cannot be read.
+    """
+    with storage.open(photo_name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image = flatten(image) if image.mode in ('RGBA', 'LA', 'P') else image.convert('RGB')
+
+    for size in THUMBNAIL_SIZES:
+        # Centre crop to a square, as the avatars are displayed (object-cover)
+        thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        for extension, image_format, _, options in THUMBNAIL_FORMATS:
+            buffer = BytesIO()
+            thumbnail.save(buffer, image_format, **options)
+            name = thumbnail_name(photo_name, size, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+    return photo_name
+
+
+def delete_thumbnails(photo_name, storage=default_storage):
+    for name in thumbnail_names(photo_name):
+        if storage.exists(name):
+            storage.delete(name)
@@ -0,0 +1,79 @@
+"""
+Set-based status changes for many articles.
+
+change_status() moves a whole selection of articles to a status with one
+UPDATE, instead of an Article.save() (and its signal handlers) per row:
+
+    UPDATE articles_article
+       SET status = 'published',
+           published_at = COALESCE(published_at, now()),
+           updated_at = now()
+     WHERE <selection> AND status <> 'published'
+
+UPDATE bypasses the signals, so the derived data is refreshed in one batch
+afterwards: the published-article counters of the touched authors,
+categories and tags (one UPDATE per model), the related-article lists and
+the response cache generation. The search vectors do not depend on the
+status and are left alone.
+
+Every article that enters or leaves the published set is queued for a
+related-list update (articles.related.queue_related_updates(), one INSERT
+per batch), whatever the size of the selection; the process_related_updates
+worker applies them.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce, Now
+
+from core.cache import bump_content_generation
+from .counters import recount_published_articles
+from .models import Article, ArticleStatus
+from .related import queue_related_updates
+
+
+def change_status(queryset, status):
+    """
+    Move the articles of the queryset to status with one UPDATE. Returns a
+    dict with the number of changed articles, the number of articles queued
+    for a related-list update and the phase timings (s).
+    """
+    started = time.perf_counter()
+    changed = queryset.exclude(status=status)
+    through = Article.tags.through
+    with transaction.atomic():
+        # The rows are selected by their old status, so the touched
+        # authors, categories and tags are read before the UPDATE
+        author_ids = list(changed.order_by().values_list('author_id', flat=True).distinct())
+        category_ids = list(changed.order_by().values_list('category_id', flat=True).distinct())
+        tag_ids = list(
+            through.objects.filter(article__in=changed.values('pk')).values_list('tag_id', flat=True).distinct()
+        )
+        # Only articles entering or leaving the published set change related lists
+        if status == ArticleStatus.PUBLISHED:
+            moving = changed.filter(is_active=True)
+        else:
+            moving = changed.filter(status=ArticleStatus.PUBLISHED, is_active=True)
+        article_ids = list(moving.order_by('pk').values_list('pk', flat=True))
+        selected = time.perf_counter()
+
+        values = {'status': status, 'updated_at': Now()}
+        if status == ArticleStatus.PUBLISHED:
+            values['published_at'] = Coalesce(F('published_at'), Now())
+        count = changed.update(**values)
+        updated = time.perf_counter()
+
+        recount_published_articles(author_ids=author_ids, category_ids=category_ids, tag_ids=tag_ids)
+        related_queued = queue_related_updates(article_ids)
+        transaction.on_commit(bump_content_generation)
+    finished = time.perf_counter()
+
+    return {
+        'articles': count,
+        'related_queued': related_queued,
+        'select_seconds': selected - started,
+        'update_seconds': updated - selected,
+        'refresh_seconds': finished - updated,
+        'total_seconds': finished - started,
+    }
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, feeds, views
 
 app_name = 'articles'
 
@@ -12,5 +12,14 @@ urlpatterns = [
     path('articles/<slug:slug>/', views.ArticleDetailView.as_view(), name='detail'),
     path('authors/', views.AuthorListView.as_view(), name='author_list'),
     path('authors/<slug:slug>/', views.AuthorDetailView.as_view(), name='author_detail'),
+    path('api/articles/', api.ArticleApiView.as_view(), name='api_articles'),
+    path('feeds/', feeds.ArticleFeed.as_view(), name='feed'),
+    path('feeds/atom/', feeds.AtomArticleFeed.as_view(), name='feed_atom'),
+    path('feeds/category/<slug:slug>/', feeds.CategoryFeed.as_view(), name='category_feed'),
+    path('feeds/category/<slug:slug>/atom/', feeds.AtomCategoryFeed.as_view(), name='category_feed_atom'),
+    path('feeds/author/<slug:slug>/', feeds.AuthorFeed.as_view(), name='author_feed'),
+    path('feeds/author/<slug:slug>/atom/', feeds.AtomAuthorFeed.as_view(), name='author_feed_atom'),
+    path('feeds/tag/<slug:slug>/', feeds.TagFeed.as_view(), name='tag_feed'),
+    path('feeds/tag/<slug:slug>/atom/', feeds.AtomTagFeed.as_view(), name='tag_feed_atom'),
 ]
 
@@ -1,10 +1,29 @@
+from asgiref.sync import sync_to_async
 from django.views.generic import ListView, DetailView
-from django.db.models import Q, Count
+from django.http import HttpResponse
+from django.views.static import serve
 from django.shortcuts import get_object_or_404
-from .models import Article, ArticleStatus, Category, Tag, Author
+from django.db.models import Count, Exists, Max, OuterRef, Q, Sum
+from core.cache import CachedResponseMixin
+from core.conditional import ConditionalGetMixin, content_validators, latest
+from core.navigation import get_static_pages
+from core.replicas import ReplicaReadMixin, replica_reads
+from .counters import published_articles
+from .models import Article, ArticleStatus, Category, Author
+from .navigation import get_active_categories, get_active_tags
+from .pagination import KeysetPaginationMixin
+from .search import search_articles
+from .sitemaps import INDEX_NAME, ensure_sitemaps
 
 
-class HomeView(ListView):
+class ArticleNavigationMixin:
+    """Article pages render the category and tag lists next to the static page menu."""
+
+    def get_navigation(self):
+        return (get_static_pages(), get_active_categories(), get_active_tags())
+
+
+class HomeView(CachedResponseMixin, ReplicaReadMixin, ArticleNavigationMixin, ConditionalGetMixin, ListView):
     """
     Home page displaying recent articles.
     Shows last 10-15 published articles.
@@ -17,24 +36,27 @@ class HomeView(ListView):
     context_object_name = 'articles'
     paginate_by = None  # Don't paginate on home page, just show recent articles
 
+    def get_validators(self):
+        return content_validators()
+
     def get_queryset(self):
         # Home page always shows recent articles, no filtering
         return Article.objects.filter(
             status=ArticleStatus.PUBLISHED,
             is_active=True
-        ).select_related('author', 'category').prefetch_related('tags').order_by('-published_at', '-created_at')[:15]
+        ).select_related('author', 'category').prefetch_related('tags').defer(*Article.LIST_DEFERRED_FIELDS).order_by('-published_at', '-created_at')[:15]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
         # Get all active categories and tags for navigation panels
-        context['categories'] = Category.objects.filter(is_active=True).order_by('name')
-        context['tags'] = Tag.objects.filter(is_active=True).order_by('name')
+        context['categories'] = get_active_categories()
+        context['tags'] = get_active_tags()
         
         return context
 
 
-class ArticleListView(ListView):
+class ArticleListView(CachedResponseMixin, ReplicaReadMixin, ArticleNavigationMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
     Display a list of published articles.
     Public access - no login required.
@@ -44,22 +66,25 @@ class ArticleListView(ListView):
     context_object_name = 'articles'
     paginate_by = 10
 
+    def get_validators(self):
+        return content_validators()
+
     def get_queryset(self):
         queryset = Article.objects.filter(
             status=ArticleStatus.PUBLISHED,
             is_active=True
-        ).select_related('author', 'category').prefetch_related('tags').order_by('-published_at', '-created_at')
+        ).select_related('author', 'category').prefetch_related('tags').defer(*Article.LIST_DEFERRED_FIELDS).order_by('-published_at', '-created_at')
         return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_query'] = ''  # Initialize search_query for template
-        context['categories'] = Category.objects.filter(is_active=True).order_by('name')
+        context['categories'] = get_active_categories()
         context['selected_category'] = None
         return context
 
 
-class ArticleDetailView(DetailView):
+class ArticleDetailView(CachedResponseMixin, ReplicaReadMixin, ArticleNavigationMixin, ConditionalGetMixin, DetailView):
     """
     Display a single article.
     Public access - no login required.
@@ -70,19 +95,50 @@ class ArticleDetailView(DetailView):
     slug_field = 'slug'
     slug_url_kwarg = 'slug'
 
-    def get_queryset(self):
+    def get_visible_articles(self):
         # Allow viewing published articles, or draft/archived if user is staff
-        queryset = Article.objects.filter(is_active=True).select_related('author', 'category').prefetch_related('tags')
+        queryset = Article.objects.filter(is_active=True)
         if not self.request.user.is_staff:
             queryset = queryset.filter(status=ArticleStatus.PUBLISHED)
         return queryset
 
+    def get_validators(self):
+        # related_updated_at moves on every write of the related list,
+        # including one that empties it (articles.related)
+        row = self.get_visible_articles().filter(
+            slug=self.kwargs.get(self.slug_url_kwarg)
+        ).annotate(
+            related_articles_updated=Max('related_links__related__updated_at'),
+        ).values_list(
+            'updated_at', 'author__updated_at', 'category__updated_at',
+            'related_updated_at', 'related_articles_updated',
+        ).first()
+        if row is None:
+            return None
+        return latest(*row), None
+
+    def get_queryset(self):
+        return self.get_visible_articles().select_related('author', 'category').prefetch_related('tags').defer(*Article.DETAIL_DEFERRED_FIELDS)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Precomputed by articles.related; one query on the (article, rank) index
+        context['related_articles'] = published_articles().filter(
+            related_from__article=self.object
+        ).select_related('category').defer(*Article.LIST_DEFERRED_FIELDS).order_by('related_from__rank')
+        return context
+
 
-class ArticleSearchView(ListView):
+class ArticleSearchView(ReplicaReadMixin, KeysetPaginationMixin, ListView):
     """
-    Search articles by keywords using simple case-insensitive search.
+    Search articles by keywords.
     HTMX-powered for real-time search results.
-    Searches across title, content, and excerpt fields.
+    Uses PostgreSQL full-text search over title, excerpt and content
+    (ranked by relevance), see articles.search.
+    Async: the page is read through the async ORM, whose queries still run
+    in the request's thread (sync_to_async). Under ASGI (SERVER_MODE=asgi)
+    that thread is made per request rather than taken from the fixed
+    GUNICORN_THREADS; under WSGI each request pays for a one-off event loop.
     """
     model = Article
     template_name = 'articles/article_list.html'
@@ -107,29 +163,30 @@ class ArticleSearchView(ListView):
         queryset = Article.objects.filter(
             status=ArticleStatus.PUBLISHED,
             is_active=True
-        ).select_related('author', 'category').prefetch_related('tags')
-        
-        if not query:
-            return queryset.order_by('-published_at', '-created_at')
-        
-        # Simple case-insensitive search across title, content, and excerpt
-        queryset = queryset.filter(
-            Q(title__icontains=query) | 
-            Q(content__icontains=query) | 
-            Q(excerpt__icontains=query)
-        ).order_by('-published_at', '-created_at')
+        ).select_related('author', 'category').prefetch_related('tags').defer(*Article.LIST_DEFERRED_FIELDS)
         
-        return queryset
+        return search_articles(queryset, query)
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        self.page = await self.apaginate_queryset(self.object_list, self.get_paginate_by(self.object_list))
+        # The navigation cache may be the database cache
+        self.categories = await sync_to_async(get_active_categories)()
+        return self.render_to_response(self.get_context_data())
+
+    def paginate_queryset(self, queryset, page_size):
+        # Already read by get()
+        return self.page
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('q', '')
-        context['categories'] = Category.objects.filter(is_active=True).order_by('name')
+        context['categories'] = self.categories
         context['selected_category'] = None
         return context
 
 
-class CategoryFilterView(ListView):
+class CategoryFilterView(CachedResponseMixin, ReplicaReadMixin, ArticleNavigationMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
     Filter articles by category.
     Public access - no login required.
@@ -139,6 +196,9 @@ class CategoryFilterView(ListView):
     context_object_name = 'articles'
     paginate_by = 10
 
+    def get_validators(self):
+        return content_validators()
+
     def get_queryset(self):
         category_slug = self.kwargs.get('slug')
         self.category = get_object_or_404(Category, slug=category_slug, is_active=True)
@@ -147,22 +207,23 @@ class CategoryFilterView(ListView):
             category=self.category,
             status=ArticleStatus.PUBLISHED,
             is_active=True
-        ).select_related('author', 'category').prefetch_related('tags').order_by('-published_at', '-created_at')
+        ).select_related('author', 'category').prefetch_related('tags').defer(*Article.LIST_DEFERRED_FIELDS).order_by('-published_at', '-created_at')
         
         return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(is_active=True).order_by('name')
+        context['categories'] = get_active_categories()
         context['selected_category'] = self.category
         context['search_query'] = ''
         return context
 
 
-class TagFilterView(ListView):
+class TagFilterView(CachedResponseMixin, ReplicaReadMixin, ArticleNavigationMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
-    Filter articles by tag(s).
-    Supports multiple tags with OR logic (articles with any of the selected tags).
+    Filter articles by tag(s), e.g. /articles/tag/education/community/.
+    ?match=any (default) lists articles with any of the selected tags,
+    ?match=all only those with every selected tag.
     Public access - no login required.
     """
     model = Article
@@ -170,40 +231,62 @@ class TagFilterView(ListView):
     context_object_name = 'articles'
     paginate_by = 10
 
+    MATCH_ANY = 'any'
+    MATCH_ALL = 'all'
+
+    def get_match_mode(self):
+        return self.MATCH_ALL if self.request.GET.get('match') == self.MATCH_ALL else self.MATCH_ANY
+
+    def get_selected_tags(self):
+        """
+        Resolve the slugs in the URL against the cached active tag list, so
+        the article query needs no join or extra query to find the tags.
+        Unknown slugs are ignored in any mode and match nothing in all mode.
+        """
+        if not hasattr(self, 'selected_tags'):
+            slugs = {slug for slug in self.kwargs.get('slugs', '').split('/') if slug}
+            self.requested_slug_count = len(slugs)
+            self.selected_tags = [tag for tag in get_active_tags() if tag.slug in slugs]
+        return self.selected_tags
+
+    def filter_by_tags(self, queryset):
+        """
+        Semi-join on the tags through-table (EXISTS), so every article
+        appears once without DISTINCT and COUNT(*) stays a plain count.
+        """
+        tags = self.get_selected_tags()
+        if not tags:
+            return queryset.none()
+        through = Article.tags.through.objects.filter(article=OuterRef('pk'))
+        if self.get_match_mode() == self.MATCH_ANY:
+            return queryset.filter(Exists(through.filter(tag_id__in=[tag.pk for tag in tags])))
+        if len(tags) < self.requested_slug_count:
+            return queryset.none()
+        for tag in tags:
+            queryset = queryset.filter(Exists(through.filter(tag_id=tag.pk)))
+        return queryset
+
+    def get_validators(self):
+        return content_validators()
+
     def get_queryset(self):
-        tag_slugs = self.kwargs.get('slugs', '').split('/')
-        # Filter out empty strings
-        tag_slugs = [slug for slug in tag_slugs if slug]
-        
-        if not tag_slugs:
-            return Article.objects.none()
-        
-        # Get tag objects
-        tags = Tag.objects.filter(slug__in=tag_slugs, is_active=True)
-        if not tags.exists():
-            return Article.objects.none()
-        
-        self.tags = tags
-        
-        # Filter articles that have any of the selected tags (OR logic)
         queryset = Article.objects.filter(
-            tags__in=tags,
             status=ArticleStatus.PUBLISHED,
             is_active=True
-        ).select_related('author', 'category').prefetch_related('tags').distinct().order_by('-published_at', '-created_at')
-        
-        return queryset
+        ).select_related('author', 'category').prefetch_related('tags').defer(*Article.LIST_DEFERRED_FIELDS).order_by('-published_at', '-created_at')
+        return self.filter_by_tags(queryset)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(is_active=True).order_by('name')
+        context['categories'] = get_active_categories()
         context['selected_category'] = None
-        context['selected_tags'] = getattr(self, 'tags', Tag.objects.none())
+        context['selected_tags'] = self.get_selected_tags()
+        context['tag_match'] = self.get_match_mode()
         context['search_query'] = ''
         return context
 
 
-class AuthorListView(ListView):
+class AuthorListView(CachedResponseMixin, ReplicaReadMixin, ConditionalGetMixin, ListView):
     """
     Display a list of all authors.
     Supports sorting: alphabetical (default) or by article count.
@@ -214,13 +297,18 @@ class AuthorListView(ListView):
     context_object_name = 'authors'
     paginate_by = 20
 
-    def get_queryset(self):
-        queryset = Author.objects.filter(is_active=True).annotate(
-            published_articles_count=Count(
-                'articles',
-                filter=Q(articles__status=ArticleStatus.PUBLISHED, articles__is_active=True)
-            )
+    def get_validators(self):
+        # Stored counters change without touching updated_at
+        stats = Author.objects.filter(is_active=True).aggregate(
+            latest=Max('updated_at'),
+            total=Count('pk'),
+            articles=Sum('published_articles_count'),
         )
+        return stats['latest'], (stats['total'], stats['articles'])
+
+    def get_queryset(self):
+        # published_articles_count is a stored, indexed counter (articles.counters)
+        queryset = Author.objects.filter(is_active=True)
         
         # Get sort parameter
         sort_by = self.request.GET.get('sort', 'name')
@@ -238,7 +326,7 @@ class AuthorListView(ListView):
         return context
 
 
-class AuthorDetailView(DetailView):
+class AuthorDetailView(CachedResponseMixin, ReplicaReadMixin, ArticleNavigationMixin, ConditionalGetMixin, DetailView):
     """
     Display an author's profile and their published articles.
     Public access - no login required.
@@ -249,6 +337,20 @@ class AuthorDetailView(DetailView):
     slug_field = 'slug'
     slug_url_kwarg = 'slug'
 
+    def get_validators(self):
+        published = Q(articles__status=ArticleStatus.PUBLISHED, articles__is_active=True)
+        row = Author.objects.filter(
+            slug=self.kwargs.get(self.slug_url_kwarg),
+            is_active=True,
+        ).annotate(
+            latest_article=Max('articles__updated_at', filter=published),
+            latest_category=Max('articles__category__updated_at', filter=published),
+            total=Count('articles', filter=published),
+        ).values_list('updated_at', 'latest_article', 'latest_category', 'total').first()
+        if row is None:
+            return None
+        return latest(*row[:3]), row[3]
+
     def get_queryset(self):
         return Author.objects.filter(is_active=True)
 
@@ -261,7 +363,33 @@ class AuthorDetailView(DetailView):
             author=author,
             status=ArticleStatus.PUBLISHED,
             is_active=True
-        ).select_related('category').prefetch_related('tags').order_by('-published_at', '-created_at')
+        ).select_related('category').prefetch_related('tags').defer(*Article.LIST_DEFERRED_FIELDS).order_by('-published_at', '-created_at')
         
         context['articles'] = articles
         return context
+
+
+def serve_sitemap(request, name):
+    root = ensure_sitemaps()
+    if root is None:
+        # The first build is running in another request
+        response = HttpResponse('Sitemaps are being generated.', status=503, content_type='text/plain')
+        response['Retry-After'] = '60'
+        return response
+    return serve(request, name, document_root=root)
+
+
+@replica_reads
+def sitemap_index(request):
+    """
+    Serve the precomputed sitemap index (articles.sitemaps); stale files are
+    served while they are rebuilt in the background. Answers
+    If-Modified-Since with 304.
+    """
+    return serve_sitemap(request, INDEX_NAME)
+
+
+@replica_reads
+def sitemap_section(request, name):
+    """Serve one precomputed sitemap file listed in the index."""
+    return serve_sitemap(request, name)
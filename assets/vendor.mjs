@@ -0,0 +1,29 @@
+// Copy the third-party browser assets from node_modules into static/vendor,
+// so that they are served (hashed and precompressed) from our own origin.
+import { copyFileSync, mkdirSync } from 'node:fs';
+import { dirname, join } from 'node:path';
+import { fileURLToPath } from 'node:url';
+
+const root = join(dirname(fileURLToPath(import.meta.url)), '..');
+const modules = join(root, 'node_modules');
+const vendor = join(root, 'static', 'vendor');
+
+// Font weights used by the templates (font-normal, -medium, -semibold, -bold)
+// and the subsets of the site's languages; must match assets/css/site.css.
+const FONT_WEIGHTS = [400, 500, 600, 700];
+const FONT_SUBSETS = ['latin', 'tamil'];
+
+function copy(source, target) {
+  mkdirSync(dirname(target), { recursive: true });
+  copyFileSync(source, target);
+  console.log(`${target.slice(root.length + 1)}`);
+}
+
+copy(join(modules, 'htmx.org', 'dist', 'htmx.min.js'), join(vendor, 'htmx.min.js'));
+
+for (const subset of FONT_SUBSETS) {
+  for (const weight of FONT_WEIGHTS) {
+    const file = `mukta-malar-${subset}-${weight}-normal.woff2`;
+    copy(join(modules, '@fontsource', 'mukta-malar', 'files', file), join(vendor, 'fonts', file));
+  }
+}
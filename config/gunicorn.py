@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration: gunicorn -c config/gunicorn.py
+
+SERVER_MODE selects how each worker process serves requests:
+- wsgi (default): config.wsgi with GUNICORN_THREADS threads per worker. A
+  worker serves that many requests at a time; slow requests (searches,
+  exports) queue everything behind them once all threads are busy.
+- asgi: config.asgi on uvicorn workers (uvicorn-worker). The event loop
+  accepts every request; sync views and middleware, and the queries of
+  async views (search, through the async ORM's sync_to_async), run in a
+  thread per request. The database connection pool (DB_POOL_MAX_SIZE)
+  then bounds the queries running at once per worker, so raise it for
+  ASGI.
+
+GUNICORN_WORKERS sets the number of worker processes in both modes.
+"""
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '3'))
+timeout = 60
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif SERVER_MODE == 'wsgi':
+    wsgi_app = 'config.wsgi:application'
+    threads = int(os.getenv('GUNICORN_THREADS', '2'))
+else:
+    raise ValueError(f'SERVER_MODE must be wsgi or asgi, not {SERVER_MODE!r}')
@@ -51,18 +51,22 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'django.contrib.postgres',  # Available for future use if needed
+    'django.contrib.postgres',  # Full-text search (articles.search)
     # Local apps
     'core',
     'articles',
 ]
 
 MIDDLEWARE = [
+    # Outermost, so that its total time covers the whole middleware stack
+    'core.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Read-after-write pinning for the optional read replica (core.replicas)
+    'core.replicas.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -92,15 +96,156 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# DB_ENGINE=sqlite runs the site and the test suite without a PostgreSQL
+# server (full-text search then falls back to icontains, see articles.search)
+DB_ENGINES = {
+    'postgresql': {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'asanbay_db'),
         'USER': os.getenv('POSTGRES_USER', 'asanbay_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'asanbay_password'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # Pooled connections are checked (a round trip) before being handed out
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', str(BASE_DIR / 'db.sqlite3')),
+    },
+}
+# Connection reuse on PostgreSQL: each worker process keeps a psycopg
+# connection pool (psycopg[pool]) shared by its threads, instead of
+# connecting and authenticating on every request. DB_POOL_MAX_SIZE should
+# be at least the number of threads per worker; core.instrumentation
+# reports the pool statistics. DB_POOL=False connects per request.
+if os.getenv('DB_POOL', 'True').lower() == 'true':
+    DB_ENGINES['postgresql']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '4')),
+            # Seconds a request waits for a free connection before failing
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            # Idle connections above min_size are closed after this many seconds
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+            # Connections are replaced after this many seconds
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+        },
     }
+DATABASES = {
+    'default': DB_ENGINES[os.getenv('DB_ENGINE', 'postgresql')],
+}
+
+# Optional read replica for the public pages (core.replicas): a PostgreSQL
+# standby (DB_REPLICA_HOST, DB_REPLICA_NAME) or, to try the routing locally,
+# a second SQLite file (SQLITE_REPLICA_PATH). Tests mirror it to default.
+REPLICA_DATABASE = 'replica'
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME') or os.getenv('SQLITE_REPLICA_PATH'):
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[REPLICA_DATABASE]['NAME'] = os.getenv('SQLITE_REPLICA_PATH', DATABASES['default']['NAME'])
+    else:
+        DATABASES[REPLICA_DATABASE]['HOST'] = os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST'])
+        DATABASES[REPLICA_DATABASE]['PORT'] = os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT'])
+        DATABASES[REPLICA_DATABASE]['NAME'] = os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME'])
+        # A replica that is down must fail its lag check quickly, not after
+        # the TCP timeout or DB_POOL_TIMEOUT: the pages fall back to the primary
+        replica_timeout = int(os.getenv('DB_REPLICA_CONNECT_TIMEOUT', '2'))
+        replica_options = {**DATABASES['default'].get('OPTIONS', {}), 'connect_timeout': replica_timeout}
+        if 'pool' in replica_options:
+            replica_options['pool'] = {**replica_options['pool'], 'timeout': replica_timeout}
+        DATABASES[REPLICA_DATABASE]['OPTIONS'] = replica_options
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Read from the primary while the replica lags more than this (seconds)
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', '5'))
+# How often each process re-checks the replica's lag (seconds)
+REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', '5'))
+# After writing, a browser reads from the primary for this long (seconds)
+REPLICA_PIN_COOKIE = 'db_primary'
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '15'))
+
+# Cache
+# Choose a backend that needs no outside services: 'locmem' (per process,
+# fine for development), 'file' or 'db' (shared between gunicorn workers;
+# 'db' requires `python manage.py createcachetable`).
+# Above MAX_ENTRIES the shared backends delete a third of the entries at
+# random, current pages included; Django's default (300) is far below the
+# number of public pages. The file backend lists its directory on every
+# write, so it should not be much larger than needed either.
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '20000'))
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'asanbay',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
+}
+
+# Full-page cache for anonymous visitors (core.cache). Entries are keyed on
+# a content generation number that is bumped on every content change.
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '3600'))
+# Each process adds its hit/miss counts to the shared counters this often (seconds)
+RESPONSE_CACHE_STATS_INTERVAL = int(os.getenv('RESPONSE_CACHE_STATS_INTERVAL', '10'))
+
+# Lifetime (seconds) of the per-process navigation snapshots (core.navigation)
+NAVIGATION_CACHE_TIMEOUT = int(os.getenv('NAVIGATION_CACHE_TIMEOUT', '300'))
+
+# Full-text search
+# PostgreSQL text search configuration used to build Article.search_vector
+# (e.g. 'english', 'simple'). Run `python manage.py rebuild_search_index`
+# after changing it.
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'english')
+
+# Article list pagination: 'offset' (page numbers) or 'cursor' (keyset
+# pagination without COUNT(*)/OFFSET scans, see articles.pagination)
+ARTICLE_PAGINATION = os.getenv('ARTICLE_PAGINATION', 'offset')
+
+# RSS/Atom feeds (articles.feeds): newest articles per feed, and whether
+# items carry the article body instead of the card summary
+FEED_ITEMS = int(os.getenv('FEED_ITEMS', '20'))
+FEED_FULL_CONTENT = os.getenv('FEED_FULL_CONTENT', 'False').lower() == 'true'
+
+# Per-request performance instrumentation (core.instrumentation)
+PERFORMANCE_INSTRUMENTATION_ENABLED = os.getenv('PERFORMANCE_INSTRUMENTATION_ENABLED', 'True').lower() == 'true'
+# Fraction of anonymous requests measured in detail (logged-in users and DEBUG: always)
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', '0.05'))
+# Who receives the Server-Timing header: 'staff' (staff users, everybody in DEBUG), 'all' or 'off'
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'staff')
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS', '500'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # Slow requests, one JSON object per line
+        'core.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
 
 
@@ -144,10 +289,28 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Hashed file names plus .gz/.br copies written by collectstatic (core.storage);
+# assets under static/dist and static/vendor are built with `npm run build`
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Media files (User uploaded content)
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Sitemaps (articles.sitemaps): absolute URL of the site, where the
+# precomputed files are written (outside MEDIA_ROOT, which nginx serves
+# as it is) and how old (seconds) they may get
+SITE_URL = os.getenv('SITE_URL', 'https://asanbay.org')
+SITEMAP_ROOT = Path(os.getenv('SITEMAP_ROOT', str(BASE_DIR / 'sitemaps')))
+SITEMAP_MAX_AGE = int(os.getenv('SITEMAP_MAX_AGE', '3600'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -16,9 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from articles import views as article_views
 from core import views as core_views
 
 urlpatterns = [
@@ -26,6 +27,9 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(next_page='/'), name='logout'),
     path('', include('articles.urls')),
     path('page/<slug:slug>/', core_views.StaticPageView.as_view(), name='static_page'),
+    # Sitemaps must sit at the root to list URLs of the whole site
+    path('sitemap.xml', article_views.sitemap_index, name='sitemap'),
+    re_path(r'^(?P<name>sitemap-[a-z]+-[0-9]+\.xml)$', article_views.sitemap_section, name='sitemap_section'),
 ]
 
 # Serve media files in development
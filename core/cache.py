@@ -0,0 +1,238 @@
+"""
+Full-response cache for public pages.
+
+Anonymous GET responses are cached under a key built from the request URL,
+the HTMX header and a global *content generation* number. Any change to
+site content (articles, authors, categories, tags, static pages) bumps the
+generation, so every previously cached page is skipped at once without
+purging individual keys; stale entries simply age out of the cache.
+
+The cache alias is configured with RESPONSE_CACHE_ALIAS. Use a backend that
+is shared between worker processes (file or database cache) in production,
+otherwise a content change only invalidates the worker that made it.
+
+Cached responses keep the ETag / Last-Modified validators added by
+core.conditional, so a revalidating client is answered with 304 Not
+Modified straight from the cache.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+CONTENT_GENERATION_KEY = 'content:generation'
+CONTENT_CHANGED_KEY = 'content:changed_at'
+HITS_KEY = 'response_cache:hits'
+MISSES_KEY = 'response_cache:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def get_content_generation():
+    """
+    Return the current content generation number.
+
+    A missing generation (first start, cache eviction) is initialised from
+    the clock rather than from 1, so it can never collide with a generation
+    that was used before and has entries left in the cache.
+    """
+    cache = get_cache()
+    generation = cache.get(CONTENT_GENERATION_KEY)
+    if generation is None:
+        now = time.time()
+        cache.add(CONTENT_GENERATION_KEY, int(now * 1000), timeout=None)
+        # Any change made before now is covered by the new generation
+        cache.add(CONTENT_CHANGED_KEY, now, timeout=None)
+        generation = cache.get(CONTENT_GENERATION_KEY)
+    return generation
+
+
+def bump_content_generation():
+    """Invalidate every cached response by moving to a new generation."""
+    cache = get_cache()
+    now = time.time()
+    generation = max(
+        (cache.get(CONTENT_GENERATION_KEY) or 0) + 1,
+        int(now * 1000),
+    )
+    cache.set_many({CONTENT_GENERATION_KEY: generation, CONTENT_CHANGED_KEY: now}, timeout=None)
+    return generation
+
+
+def get_content_changed_at():
+    """Time (epoch seconds) of the last generation bump, or None if unknown."""
+    return get_cache().get(CONTENT_CHANGED_KEY)
+
+
+def content_changed(sender=None, **kwargs):
+    """
+    Signal receiver for content models (post_save, post_delete, m2m_changed).
+    The bump is deferred until the transaction commits, so that a request
+    running concurrently cannot cache the old content under the new generation.
+    """
+    if kwargs.get('action', '').startswith('pre_'):
+        return
+    transaction.on_commit(bump_content_generation)
+
+
+class ResponseCacheCounters:
+    """
+    Hit/miss counts of this process, added to the shared counters at most
+    every RESPONSE_CACHE_STATS_INTERVAL seconds. Counting in the shared
+    cache on every request would write to it (a file with the file
+    backend) even for hits. A flush is a get and a set, so concurrent
+    flushes of two workers may occasionally lose one worker's counts.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.flushed_at = time.monotonic()
+
+    def record(self, hit):
+        interval = getattr(settings, 'RESPONSE_CACHE_STATS_INTERVAL', 10)
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            due = time.monotonic() - self.flushed_at >= interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            counts = {HITS_KEY: self.hits, MISSES_KEY: self.misses}
+            self.hits = self.misses = 0
+            self.flushed_at = time.monotonic()
+        counts = {key: count for key, count in counts.items() if count}
+        if not counts:
+            return
+        # cache.incr() re-stores the value with the default timeout on most
+        # backends, so counters are updated with an explicit non-expiring set
+        cache = get_cache()
+        stored = cache.get_many(list(counts))
+        cache.set_many({key: stored.get(key, 0) + count for key, count in counts.items()}, timeout=None)
+
+
+response_cache_counters = ResponseCacheCounters()
+
+
+def get_response_cache_stats():
+    """
+    Return the shared hit/miss counters. The counts of other processes
+    reach them within RESPONSE_CACHE_STATS_INTERVAL seconds.
+    """
+    response_cache_counters.flush()
+    cache = get_cache()
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+        'generation': get_content_generation(),
+    }
+
+
+def reset_response_cache_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def is_htmx_request(request):
+    return (
+        request.headers.get('HX-Request') == 'true' or
+        request.META.get('HTTP_HX_REQUEST') == 'true'
+    )
+
+
+def get_response_cache_key(request, generation):
+    material = '|'.join([
+        str(generation),
+        request.scheme,
+        request.get_host(),
+        request.get_full_path(),
+        'htmx' if is_htmx_request(request) else 'page',
+    ])
+    return 'response:' + hashlib.md5(material.encode()).hexdigest()
+
+
+def is_cacheable_request(request):
+    if not getattr(settings, 'RESPONSE_CACHE_ENABLED', True):
+        return False
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Pending flash messages are stored in a cookie for anonymous visitors
+    if 'messages' in request.COOKIES:
+        return False
+    return not request.user.is_authenticated
+
+
+def is_cacheable_response(response):
+    return (
+        response.status_code == 200 and
+        not response.streaming and
+        not response.cookies and
+        'private' not in response.get('Cache-Control', '') and
+        'no-store' not in response.get('Cache-Control', '')
+    )
+
+
+def cache_public_response(view_func):
+    """
+    View decorator that serves anonymous GET requests from the response
+    cache and stores cacheable responses for the current content generation.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = get_response_cache_key(request, get_content_generation())
+        response = cache.get(key)
+        if response is not None:
+            response_cache_counters.record(hit=True)
+            last_modified = response.get('Last-Modified')
+            response = get_conditional_response(
+                request,
+                etag=response.get('ETag'),
+                last_modified=last_modified and parse_http_date_safe(last_modified),
+                response=response,
+            )
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response_cache_counters.record(hit=False)
+        response = view_func(request, *args, **kwargs)
+        if is_cacheable_response(response):
+            response['X-Cache'] = 'MISS'
+            timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 3600)
+            if hasattr(response, 'render') and callable(response.render):
+                response.add_post_render_callback(lambda r: cache.set(key, r, timeout))
+            else:
+                cache.set(key, response, timeout)
+        return response
+
+    return _wrapped_view
+
+
+class CachedResponseMixin:
+    """
+    Class-based view mixin applying cache_public_response to the view.
+    Cache hits are served without instantiating the view.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return cache_public_response(super().as_view(**initkwargs))
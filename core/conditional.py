@@ -0,0 +1,133 @@
+"""
+HTTP conditional GET (ETag / Last-Modified / 304 Not Modified) for public pages.
+
+Views using ConditionalGetMixin describe the data a page shows in
+get_validators(): one cheap query returning the latest ``updated_at`` of
+the rows on the page plus a few values that change when rows are added or
+removed (row counts, stored counters), or, for pages listing site content,
+content_validators(), which needs no query at all. The mixin turns them into an ETag
+and a Last-Modified header, and answers If-None-Match / If-Modified-Since
+with 304 Not Modified before the page queryset is evaluated or the template
+rendered.
+
+The ETag additionally covers the navigation snapshots rendered on the page
+(core.navigation), the query string, the HTMX flag and the viewer, so it
+changes whenever any of these would change the HTML. Last-Modified also
+moves with the navigation: it is the latest of the page's own time and the
+times the snapshots last changed.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_content_changed_at, get_content_generation, is_htmx_request
+from .navigation import get_static_pages
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def latest(*timestamps):
+    """The most recent of the given datetimes, ignoring None."""
+    return max((value for value in timestamps if value is not None), default=None)
+
+
+def content_validators():
+    """
+    Validators for pages listing site content (article lists, feeds, the
+    API): the content generation (core.cache), which moves on every
+    committed change to articles, authors, categories, tags and their
+    links, deletions included, and the time of that change. Unlike an
+    aggregate over the listed rows this costs no query, at the price of
+    new validators for every list whenever any content changes.
+    """
+    generation = get_content_generation()
+    changed_at = get_content_changed_at()
+    last_modified = datetime.fromtimestamp(changed_at, tz=timezone.utc) if changed_at is not None else None
+    return last_modified, generation
+
+
+def get_viewer_key(request):
+    """
+    Identify who the page is rendered for. Authenticated pages contain the
+    user menu and a CSRF token, which changes on login with the session key.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return 'anonymous'
+    return ('user', user.pk, user.is_staff, request.session.session_key)
+
+
+def is_conditional_request(request):
+    # Pending flash messages are rendered once, the page must not be skipped
+    return request.method in ('GET', 'HEAD') and 'messages' not in request.COOKIES
+
+
+def set_validators(request, response, etag, last_modified):
+    """Add the validators to a 200 or 304 response and ask clients to revalidate."""
+    response.headers.setdefault('ETag', etag)
+    if last_modified is not None:
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, no_cache=True)
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True)
+    patch_vary_headers(response, ('HX-Request',))
+
+
+class ConditionalGetMixin:
+    """
+    Class-based view mixin answering conditional GET requests.
+    Subclasses implement get_validators() and, if the page shows more than
+    the static page menu, get_navigation().
+    """
+
+    def get_validators(self):
+        """
+        Return ``(last_modified, state)`` for the data shown on the page,
+        using at most one query. last_modified is a datetime or None, state
+        is any repr-able value covering changes not reflected by
+        last_modified. Return None when the object does not exist, so the
+        view produces its normal (404) response.
+        """
+        return None
+
+    def get_navigation(self):
+        """Navigation snapshots (core.navigation.Snapshot) rendered on the page."""
+        return (get_static_pages(),)
+
+    def get(self, request, *args, **kwargs):
+        if not is_conditional_request(request):
+            return super().get(request, *args, **kwargs)
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        last_modified, state = validators
+        navigation = self.get_navigation()
+        return conditional_response(
+            request,
+            latest(last_modified, *(snapshot.changed_at for snapshot in navigation)),
+            (state, navigation, is_htmx_request(request)),
+            lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs),
+        )
+
+
+def conditional_response(request, last_modified, state, get_response):
+    """
+    Answer a conditional request for a resource with the given validators
+    (see ConditionalGetMixin.get_validators) with 304 Not Modified, or call
+    get_response() and add the validators to its response. The ETag also
+    covers the URL and the viewer.
+    """
+    etag = make_etag(last_modified, state, request.get_full_path(), get_viewer_key(request))
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = get_response()
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        set_validators(request, response, etag, timestamp)
+    return response
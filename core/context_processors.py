@@ -1,11 +1,11 @@
-from .models import StaticPage
+from .navigation import get_static_pages
 
 
 def static_pages(request):
     """
     Context processor to make active static pages available in all templates.
+    Served from the process-local navigation cache (core.navigation).
     """
     return {
-        'static_pages': StaticPage.objects.filter(is_active=True).order_by('title')
+        'static_pages': get_static_pages()
     }
-
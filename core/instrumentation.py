@@ -0,0 +1,280 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware measures, for a sample of requests:
+- the number of SQL queries, their total time and the slowest statement
+  (through a database execute wrapper on every connection of the thread),
+- the time spent rendering Django templates,
+- the total time of the request.
+
+The figures are sent in a ``Server-Timing`` header (shown by the browser's
+developer tools) to staff users, or to everybody when DEBUG is on, and
+requests slower than SLOW_REQUEST_THRESHOLD_MS are written to the
+``core.performance`` logger as one JSON object per line.
+
+Settings:
+- PERFORMANCE_INSTRUMENTATION_ENABLED: turn the middleware off entirely.
+- PERFORMANCE_SAMPLE_RATE: fraction (0-1) of anonymous requests that are
+  measured in detail. Requests carrying a session cookie (logged-in
+  editors) and all requests in DEBUG are always measured. The total time
+  of every request is measured, so slow requests are logged even when not
+  sampled, just without the detailed figures.
+- SERVER_TIMING: 'staff' (staff users and DEBUG), 'all' or 'off'.
+- SLOW_REQUEST_THRESHOLD_MS: log requests taking at least this long.
+
+Measured requests also report the connection pools of their worker process
+(pool_stats(), PostgreSQL with DATABASES OPTIONS 'pool'): connections in
+use (including the request's own) out of the pool size, requests waiting
+for a connection and their average wait, as ``db-pool`` in Server-Timing
+and ``pools`` in the slow request log.
+
+The state of the measured request is local to the thread or async task
+serving it (asgiref's Local), so the middleware works with gunicorn's
+threaded workers and, sync or async, under ASGI. There the database runs
+in the request's sync thread (sync_to_async), so the execute wrappers are
+installed and the pools read in that thread.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.performance')
+
+SLOWEST_SQL_MAX_LENGTH = 500
+
+_state = Local()
+
+
+class RequestMetrics:
+    """Figures collected while one request is processed."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest_sql = None
+        self.slowest_sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.sql_time += duration
+        if duration >= self.slowest_sql_time:
+            self.slowest_sql_time = duration
+            self.slowest_sql = sql
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'slowest_sql_ms': round(self.slowest_sql_time * 1000, 2),
+            'slowest_sql': (self.slowest_sql or '')[:SLOWEST_SQL_MAX_LENGTH] or None,
+            'template_ms': round(self.template_time * 1000, 2),
+        }
+
+    def server_timing(self, total):
+        app_time = max(total - self.sql_time - self.template_time, 0.0)
+        return ', '.join([
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'db-slowest;dur={self.slowest_sql_time * 1000:.1f}',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'app;dur={app_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def current_metrics():
+    """Metrics of the request being measured in this thread, or None."""
+    return getattr(_state, 'metrics', None)
+
+
+def pool_stats():
+    """Statistics of this process's connection pools, by database alias."""
+    stats = {}
+    for connection in connections.all(initialized_only=True):
+        pool = getattr(connection, 'pool', None)
+        if pool is None:
+            continue
+        raw = pool.get_stats()
+        # Counters only appear once non-zero; requests_queued had to wait
+        queued = raw.get('requests_queued', 0)
+        stats[connection.alias] = {
+            'in_use': raw.get('pool_size', 0) - raw.get('pool_available', 0),
+            'size': raw.get('pool_size', 0),
+            'max_size': raw.get('pool_max', 0),
+            'waiting': raw.get('requests_waiting', 0),
+            'requests': raw.get('requests_num', 0),
+            'queued': queued,
+            'avg_wait_ms': round(raw.get('requests_wait_ms', 0) / queued, 2) if queued else 0.0,
+            'timeouts': raw.get('requests_errors', 0),
+            'bad_connections': raw.get('returns_bad', 0) + raw.get('connections_lost', 0),
+        }
+    return stats
+
+
+def pool_server_timing(stats):
+    return ', '.join(
+        f'db-pool;dur={pool["avg_wait_ms"]:.1f};'
+        f'desc="{alias}: {pool["in_use"]}/{pool["max_size"]} in use, {pool["waiting"]} waiting"'
+        for alias, pool in stats.items()
+    )
+
+
+class QueryTimer:
+    """Database execute wrapper adding each query to the request metrics."""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.record_query(sql, time.perf_counter() - start)
+
+
+def instrument_template_rendering():
+    """
+    Wrap the render method of the Django template backend so that the time
+    spent rendering is added to the metrics of the current request. Only
+    the outermost render is timed, templates rendered from inside another
+    one are part of its time.
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'instrumented', False):
+        return
+    original_render = Template.render
+
+    @wraps(original_render)
+    def render(self, context=None, request=None):
+        metrics = current_metrics()
+        if metrics is None:
+            return original_render(self, context, request)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - start
+
+    render.instrumented = True
+    Template.render = render
+
+
+def time_queries(stack, metrics):
+    """Add a QueryTimer to every connection of the current thread, until the stack closes."""
+    timer = QueryTimer(metrics)
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timer))
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        instrument_template_rendering()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not getattr(settings, 'PERFORMANCE_INSTRUMENTATION_ENABLED', True):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        if not self.should_sample(request):
+            response = self.get_response(request)
+            self.log_if_slow(request, response, time.perf_counter() - start, None)
+            return response
+
+        metrics = RequestMetrics()
+        _state.metrics = metrics
+        try:
+            with ExitStack() as stack:
+                time_queries(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        total = time.perf_counter() - start
+
+        self.report(request, response, total, metrics, pool_stats(), getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'PERFORMANCE_INSTRUMENTATION_ENABLED', True):
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        if not self.should_sample(request):
+            response = await self.get_response(request)
+            self.log_if_slow(request, response, time.perf_counter() - start, None)
+            return response
+
+        metrics = RequestMetrics()
+        _state.metrics = metrics
+        stack = ExitStack()
+        try:
+            await sync_to_async(time_queries)(stack, metrics)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _state.metrics = None
+        total = time.perf_counter() - start
+
+        user = await request.auser() if hasattr(request, 'auser') else None
+        self.report(request, response, total, metrics, await sync_to_async(pool_stats)(), user)
+        return response
+
+    def report(self, request, response, total, metrics, pools, user):
+        if self.show_server_timing(user):
+            response['Server-Timing'] = ', '.join(filter(None, [metrics.server_timing(total), pool_server_timing(pools)]))
+        self.log_if_slow(request, response, total, metrics, pools)
+
+    def should_sample(self, request):
+        if settings.DEBUG or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return True
+        return random.random() < getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 0.05)
+
+    def show_server_timing(self, user):
+        mode = getattr(settings, 'SERVER_TIMING', 'staff')
+        if mode == 'all':
+            return True
+        if mode == 'staff':
+            return settings.DEBUG or bool(user is not None and user.is_staff)
+        return False
+
+    def log_if_slow(self, request, response, total, metrics, pools=None):
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+        total_ms = total * 1000
+        if total_ms < threshold:
+            return
+        record = {
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'cache': response.get('X-Cache'),
+            'sampled': metrics is not None,
+        }
+        if metrics is not None:
+            record.update(metrics.as_dict())
+        if pools:
+            record['pools'] = pools
+        logger.warning(json.dumps(record))
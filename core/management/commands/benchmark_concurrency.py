@@ -0,0 +1,143 @@
+"""
+Django management command to load a running server with concurrent clients.
+Usage: python manage.py benchmark_concurrency http://127.0.0.1:8000/articles/search/?q=water [URL ...]
+                                              [--clients 50 200] [--duration 20] [--warmup 3]
+
+Opens --clients keep-alive HTTP/1.1 connections at once; each requests the
+URLs in turn for --duration seconds. For each level of concurrency the
+command reports requests per second, latency percentiles (overall and per
+URL) and errors (4xx/5xx responses, timeouts, dropped connections). Start the server with
+SERVER_MODE=wsgi and then SERVER_MODE=asgi (config/gunicorn.py) to compare
+the two modes under the same load. Only asyncio is used, no load testing
+tool needs to be installed; run it from another machine where possible,
+since the clients and the server otherwise share the CPUs.
+"""
+import asyncio
+import statistics
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+REQUEST_TIMEOUT = 60
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, whether the server closes the connection)."""
+    status_line = await reader.readuntil(b'\r\n')
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := await reader.readuntil(b'\r\n')) != b'\r\n':
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if headers.get('transfer-encoding') == 'chunked':
+        while size := int((await reader.readuntil(b'\r\n')).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readuntil(b'\r\n')
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection') == 'close'
+
+
+class Stats:
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = 0
+
+
+async def run_client(target, paths, offset, deadline, stats):
+    host, port, host_header = target
+    reader = writer = None
+    index = offset
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            request = f'GET {path} HTTP/1.1\r\nHost: {host_header}\r\nConnection: keep-alive\r\n\r\n'
+            start = time.perf_counter()
+            writer.write(request.encode())
+            await writer.drain()
+            status, close = await asyncio.wait_for(read_response(reader), REQUEST_TIMEOUT)
+            elapsed = (time.perf_counter() - start) * 1000
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, TimeoutError):
+            stats.errors += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            continue
+        if status >= 400:
+            stats.errors += 1
+        else:
+            stats.timings[path].append(elapsed)
+        if close:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_level(target, paths, clients, seconds):
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(run_client(target, paths, i, deadline, stats) for i in range(clients)))
+    return stats, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Loads a running server with concurrent keep-alive clients and reports throughput and tail latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='URLs to request (http only), in turn')
+        parser.add_argument(
+            '--clients',
+            type=int,
+            nargs='+',
+            default=[50, 200],
+            help='Concurrent clients, one run per value (default: 50 200)',
+        )
+        parser.add_argument('--duration', type=float, default=20, help='Seconds per run (default: 20)')
+        parser.add_argument('--warmup', type=float, default=3, help='Untimed seconds before each run (default: 3)')
+
+    def handle(self, *args, **options):
+        targets = {(parts.hostname, parts.port or 80, parts.netloc) for parts in map(urlsplit, options['urls'])}
+        if len(targets) != 1 or any(not url.startswith('http://') for url in options['urls']):
+            raise CommandError('All URLs must be http:// URLs of the same server.')
+        target = targets.pop()
+        paths = [
+            (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+            for parts in map(urlsplit, options['urls'])
+        ]
+
+        self.stdout.write(f'{"clients":>8}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}{"errors":>8}')
+        for clients in options['clients']:
+            asyncio.run(run_level(target, paths, clients, options['warmup']))
+            stats, elapsed = asyncio.run(run_level(target, paths, clients, options['duration']))
+            timings = sorted(timing for path_timings in stats.timings.values() for timing in path_timings)
+            if not timings:
+                raise CommandError(f'No successful responses with {clients} clients ({stats.errors} errors).')
+            self.stdout.write(
+                f'{clients:>8}{len(timings) / elapsed:>9.1f}{percentile(timings, 0.50):>9.1f}'
+                f'{percentile(timings, 0.95):>9.1f}{percentile(timings, 0.99):>9.1f}{timings[-1]:>9.1f}'
+                f'{stats.errors:>8}'
+            )
+            if len(paths) > 1:
+                for path in paths:
+                    path_timings = sorted(stats.timings[path])
+                    if path_timings:
+                        self.stdout.write(
+                            f'{"":>8}  {path}: p50 {percentile(path_timings, 0.50):.1f} ms, '
+                            f'p99 {percentile(path_timings, 0.99):.1f} ms, '
+                            f'mean {statistics.fmean(path_timings):.1f} ms'
+                        )
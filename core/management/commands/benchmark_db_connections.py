@@ -0,0 +1,125 @@
+"""
+Django management command to measure what connection pooling saves per request.
+Usage: python manage.py benchmark_db_connections [--requests 300] [--threads 2] [--path /]
+
+Requests a page through the Django test client the way a gunicorn worker
+serves it: every request ends with close_old_connections(), the
+request_finished handler the test client leaves out. Without a pool that
+closes the connection, so the next request connects and authenticates
+again; with the pool (DATABASES OPTIONS 'pool', see config/settings.py) it
+hands the connection back.
+
+The same requests run twice, once connecting per request and once pooled,
+from --threads threads (gunicorn's --threads), and the command reports the
+latency per request and the statistics of the pool. The response cache is
+off, so every request reaches the database. PostgreSQL only.
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections
+from django.test import Client, override_settings
+
+DEFAULT_POOL = {'min_size': 2, 'max_size': 4}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def configure_pool(options):
+    """Switch the default database to a connection per request (None) or a pool with these options."""
+    connections.close_all()
+    connection.close_pool()
+    # Every thread's connection is built from this dict
+    database = connections.settings[DEFAULT_DB_ALIAS]
+    if options is None:
+        database['OPTIONS'].pop('pool', None)
+    else:
+        database['OPTIONS']['pool'] = options
+
+
+class Command(BaseCommand):
+    help = 'Compares request latency with a new database connection per request and with the connection pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Timed requests per mode (default: 300)')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per mode (default: 10)')
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=2,
+            help='Concurrent threads, like gunicorn --threads (default: 2)',
+        )
+        parser.add_argument('--path', default='/', help='Page to request (default: /)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Connection pooling needs PostgreSQL (DB_ENGINE=postgresql).')
+
+        database = connections.settings[DEFAULT_DB_ALIAS]
+        configured = database['OPTIONS'].get('pool')
+        pool_options = configured if isinstance(configured, dict) else DEFAULT_POOL
+        self.stdout.write(
+            f"{options['requests']} requests of {options['path']} from {options['threads']} threads, "
+            f"pool {pool_options}"
+        )
+        self.stdout.write(f'{"mode":<20}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"mean ms":>9}{"req/s":>9}')
+
+        try:
+            with override_settings(RESPONSE_CACHE_ENABLED=False, PERFORMANCE_INSTRUMENTATION_ENABLED=False):
+                configure_pool(None)
+                self.run_mode('per request', options)
+                configure_pool(pool_options)
+                self.run_mode('pool', options)
+                stats = connection.pool.get_stats()
+        finally:
+            configure_pool(configured)
+
+        self.stdout.write(
+            f"Pool: {stats.get('connections_num', 0)} connections opened for "
+            f"{stats.get('requests_num', 0)} checkouts, {stats.get('requests_queued', 0)} waited "
+            f"{stats.get('requests_wait_ms', 0)} ms in total, {stats.get('requests_errors', 0)} timeouts, "
+            f"{stats.get('returns_bad', 0) + stats.get('connections_lost', 0)} bad connections"
+        )
+
+    def run_mode(self, name, options):
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+        per_thread = max(1, options['requests'] // options['threads'])
+
+        def worker(count):
+            client = Client(HTTP_HOST=host)
+            timings = []
+            try:
+                for _ in range(count):
+                    start = time.perf_counter()
+                    response = client.get(options['path'])
+                    close_old_connections()
+                    if response.status_code != 200:
+                        raise CommandError(f"{options['path']} returned {response.status_code}")
+                    timings.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections.close_all()
+            return timings
+
+        with ThreadPoolExecutor(options['threads']) as executor:
+            list(executor.map(worker, [max(1, options['warmup'] // options['threads'])] * options['threads']))
+            started = time.perf_counter()
+            timings = sorted(
+                timing
+                for thread_timings in executor.map(worker, [per_thread] * options['threads'])
+                for timing in thread_timings
+            )
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{name:<20}{percentile(timings, 0.50):>9.2f}{percentile(timings, 0.95):>9.2f}'
+            f'{percentile(timings, 0.99):>9.2f}{statistics.fmean(timings):>9.2f}{len(timings) / elapsed:>9.1f}'
+        )
@@ -0,0 +1,27 @@
+"""
+Django management command to show the response cache hit/miss counters.
+Usage: python manage.py response_cache_stats [--reset]
+"""
+from django.core.management.base import BaseCommand
+from core.cache import get_response_cache_stats, reset_response_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows the hit/miss counters of the public page response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them',
+        )
+
+    def handle(self, *args, **options):
+        stats = get_response_cache_stats()
+        self.stdout.write(f"Content generation: {stats['generation']}")
+        self.stdout.write(f"Hits:   {stats['hits']}")
+        self.stdout.write(f"Misses: {stats['misses']}")
+        self.stdout.write(f"Hit ratio: {stats['hit_ratio']:.1%}")
+        if options['reset']:
+            reset_response_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
@@ -0,0 +1,87 @@
+"""
+Process-local cache for navigation data.
+
+The static page menu, the category list and the tag cloud are rendered on
+almost every page but change only a few times a month. Each gunicorn worker
+keeps an immutable snapshot (a tuple of named rows) of these lists, so that
+steady-state requests render the navigation without any database query.
+
+A snapshot is reloaded when:
+- it is older than NAVIGATION_CACHE_TIMEOUT seconds,
+- a signal handler in this process invalidated it, or
+- the shared content generation (core.cache) has moved on, which is how a
+  change made in one worker reaches the others.
+
+Each snapshot also records when its rows last changed (Snapshot.changed_at),
+which pages fold into their Last-Modified header (core.conditional): the
+time of the content generation that brought the change, so that workers
+agree on it, or the reload time when the change came without one.
+"""
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .cache import get_content_changed_at, get_content_generation
+from .models import StaticPage
+
+
+class Snapshot(tuple):
+    """Immutable navigation rows, with the time (datetime) they last changed."""
+
+    def __new__(cls, rows, changed_at):
+        snapshot = super().__new__(cls, rows)
+        snapshot.changed_at = changed_at
+        return snapshot
+
+
+class NavigationCache:
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, name, loader):
+        """
+        Return the snapshot stored under name, calling loader() to build it
+        when it is missing or stale. loader must return an iterable of
+        immutable rows (e.g. ``values_list(..., named=True)``).
+        """
+        generation = get_content_generation()
+        entry = self._entries.get(name)
+        if entry is not None:
+            value, loaded_at, loaded_generation = entry
+            timeout = getattr(settings, 'NAVIGATION_CACHE_TIMEOUT', 300)
+            if loaded_generation == generation and loaded_at is not None and time.monotonic() - loaded_at < timeout:
+                return value
+        rows = tuple(loader())
+        if entry is not None and rows == entry[0]:
+            value = entry[0]
+        else:
+            changed_at = get_content_changed_at()
+            # Without a new generation the change is only known from now on
+            if changed_at is None or (entry is not None and entry[2] == generation):
+                changed_at = time.time()
+            value = Snapshot(rows, datetime.fromtimestamp(changed_at, tz=timezone.utc))
+        self._entries[name] = (value, time.monotonic(), generation)
+        return value
+
+    def invalidate(self, *names):
+        """
+        Mark the given snapshots, or all of them if no name is given, for
+        reloading. The rows are kept to tell whether the reload changed them.
+        """
+        for name in names or list(self._entries):
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries[name] = (entry[0], None, entry[2])
+
+
+navigation_cache = NavigationCache()
+
+
+def get_static_pages():
+    """Active static pages (pk, slug, title) for the site menu, ordered by title."""
+    return navigation_cache.get(
+        'static_pages',
+        lambda: StaticPage.objects.filter(is_active=True).order_by('title').values_list('pk', 'slug', 'title', named=True),
+    )
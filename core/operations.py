@@ -0,0 +1,43 @@
+"""
+Custom migration operations shared by the project's apps.
+"""
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class PostgresOnlyAddIndexConcurrently(AddIndexConcurrently):
+    """
+    AddIndexConcurrently for PostgreSQL-specific index types (GIN, GiST,
+    ...). The index is always recorded in the migration state, but it is
+    only created when the migration runs against PostgreSQL, without
+    locking the table against writes. Migrations using it must set
+    ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddIndexConcurrentlyIfSupported(AddIndexConcurrently):
+    """
+    AddIndexConcurrently on PostgreSQL, so that building the index does
+    not lock the table against writes; a plain AddIndex on other databases.
+    Migrations using it must set ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
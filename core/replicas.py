@@ -0,0 +1,274 @@
+"""
+Optional read replica for the public pages.
+
+When DATABASES has a REPLICA_DATABASE alias (see config/settings.py),
+public read-only views (wrapped with replica_reads / ReplicaReadMixin)
+read the articles and core tables from it; the admin, sessions, the
+database cache and every other view stay on the primary. Writes always go
+to the primary (ReplicaRouter.db_for_write).
+
+A request is sent to the primary instead when:
+- it is not GET/HEAD,
+- it carries the pin cookie: a request that wrote anything (an editor
+  saving in the admin) sets REPLICA_PIN_COOKIE for REPLICA_PIN_SECONDS,
+  so the same browser reads its own writes while the replica catches up,
+- the replica lags more than REPLICA_MAX_LAG seconds or is down. Each
+  process checks this at most every REPLICA_CHECK_INTERVAL seconds with
+  one query on the replica (replay lag on PostgreSQL; other databases
+  cannot report lag and count as current while they answer),
+- the site content changed (core.cache generation bump) less than
+  REPLICA_MAX_LAG + REPLICA_CHECK_INTERVAL seconds ago. The replica may
+  not have the change yet, and a page or navigation snapshot read from it
+  would be cached under the new generation.
+
+Under tests the replica is a mirror of the default database (TEST
+MIRROR), so every read goes to the primary.
+
+The routing state is local to the thread or async task serving the
+request, like the instrumentation state (core.instrumentation), so it
+works with gunicorn's threaded workers and under ASGI; replica_reads also
+wraps async views. Without a replica alias the router and middleware do
+nothing.
+"""
+import logging
+import threading
+import time
+from functools import wraps
+
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .cache import get_content_changed_at
+
+logger = logging.getLogger(__name__)
+
+# Apps whose tables public pages read; everything else stays on the primary
+REPLICA_APPS = {'articles', 'core'}
+# Writes to these apps (the database cache) do not pin the browser
+UNPINNED_APPS = {'django_cache'}
+
+_state = Local()
+
+POSTGRESQL_LAG_SQL = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+'''
+
+
+def get_replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', 'replica')
+    if alias not in settings.DATABASES:
+        return None
+    replica = connections.settings[alias]
+    primary = connections.settings[DEFAULT_DB_ALIAS]
+    # A replica naming the primary itself (the test mirror) would only add
+    # a second connection, which cannot see the test's transaction
+    if all(replica[key] == primary[key] for key in ('HOST', 'PORT', 'NAME')):
+        return None
+    return alias
+
+
+def measure_lag(alias):
+    """Replication lag of a database in seconds, or None when it does not answer."""
+    try:
+        with connections[alias].cursor() as cursor:
+            if connections[alias].vendor == 'postgresql':
+                cursor.execute(POSTGRESQL_LAG_SQL)
+                return float(cursor.fetchone()[0])
+            cursor.execute('SELECT 1')
+            return 0.0
+    except DatabaseError:
+        logger.warning('Read replica %r is not available', alias, exc_info=True)
+        return None
+
+
+class ReplicaHealth:
+    """
+    Per-process, periodically refreshed verdict on whether the replica may
+    be read. One thread at a time runs the check, outside the lock; the
+    others go on with the last verdict (the primary until the first check
+    has answered), so a replica that is down never stalls the requests.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checked_at = None
+        self.checking = False
+        self.lag = None
+        self.usable = False
+
+    def is_usable(self, alias):
+        interval = getattr(settings, 'REPLICA_CHECK_INTERVAL', 5)
+        with self.lock:
+            due = self.checked_at is None or time.monotonic() - self.checked_at >= interval
+            if not due or self.checking:
+                return self.usable
+            self.checking = True
+        lag = None
+        try:
+            lag = measure_lag(alias)
+        finally:
+            with self.lock:
+                self.lag = lag
+                self.usable = lag is not None and lag <= getattr(settings, 'REPLICA_MAX_LAG', 5)
+                self.checked_at = time.monotonic()
+                self.checking = False
+        if lag is not None and not self.usable:
+            logger.warning('Read replica %r lags %.1fs, reading from the primary', alias, lag)
+        return self.usable
+
+
+replica_health = ReplicaHealth()
+
+
+class RoutingState:
+    """Where the current request reads from, and whether it wrote."""
+
+    def __init__(self):
+        self.read_alias = None
+        self.wrote = False
+
+
+def current_routing():
+    return getattr(_state, 'routing', None)
+
+
+class ReplicaRouter:
+    """
+    Database router: reads of REPLICA_APPS go to the alias chosen for the
+    current request (None: the primary), writes always to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_routing()
+        if state is None or state.read_alias is None:
+            return None
+        if model._meta.app_label not in REPLICA_APPS:
+            return None
+        return state.read_alias
+
+    def db_for_write(self, model, **hints):
+        state = current_routing()
+        if state is not None and model._meta.app_label not in UNPINNED_APPS:
+            # Read the rest of this request, and the next ones, from the primary
+            state.wrote = True
+            state.read_alias = None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+
+class ReplicaPinMiddleware:
+    """
+    Set up the routing state of each request and pin the browser to the
+    primary after a request that wrote.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if get_replica_alias() is None:
+            return self.get_response(request)
+        state = _state.routing = RoutingState()
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.routing = None
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        if get_replica_alias() is None:
+            return await self.get_response(request)
+        state = _state.routing = RoutingState()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.routing = None
+        return self.pin(response, state)
+
+    def pin(self, response, state):
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+def content_recently_changed():
+    """Whether the last content change may not have reached the replica yet."""
+    changed_at = get_content_changed_at()
+    if changed_at is None:
+        return False
+    # The lag was measured up to one check interval ago and may have grown since
+    window = getattr(settings, 'REPLICA_MAX_LAG', 5) + getattr(settings, 'REPLICA_CHECK_INTERVAL', 5)
+    return time.time() - changed_at < window
+
+
+def should_read_replica(request):
+    return (
+        request.method in ('GET', 'HEAD') and
+        getattr(settings, 'REPLICA_PIN_COOKIE', 'db_primary') not in request.COOKIES and
+        not content_recently_changed()
+    )
+
+
+def choose_read_alias(request):
+    """The replica alias if this request may read from it, else None."""
+    alias = get_replica_alias()
+    if alias and should_read_replica(request) and replica_health.is_usable(alias):
+        return alias
+    return None
+
+
+def replica_reads(view_func):
+    """View decorator letting a read-only view (sync or async) read from the replica."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            state = current_routing()
+            if state is not None:
+                # The cache and the lag check do I/O, in the request's sync thread
+                state.read_alias = await sync_to_async(choose_read_alias)(request)
+            return await view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        state = current_routing()
+        if state is not None:
+            state.read_alias = choose_read_alias(request)
+        return view_func(request, *args, **kwargs)
+
+    return _wrapped_view
+
+
+class ReplicaReadMixin:
+    """Class-based view mixin applying replica_reads to the view."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return replica_reads(super().as_view(**initkwargs))
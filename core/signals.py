@@ -0,0 +1,20 @@
+"""
+Signal handlers for the core app.
+"""
+from django.db.models.signals import post_delete, post_save
+
+from .cache import content_changed
+from .models import StaticPage
+from .navigation import navigation_cache
+
+# Static pages are listed in the navigation of every page
+post_save.connect(content_changed, sender=StaticPage, dispatch_uid='content_changed_save_StaticPage')
+post_delete.connect(content_changed, sender=StaticPage, dispatch_uid='content_changed_delete_StaticPage')
+
+
+def static_pages_changed(sender, **kwargs):
+    navigation_cache.invalidate('static_pages')
+
+
+post_save.connect(static_pages_changed, sender=StaticPage, dispatch_uid='navigation_save_StaticPage')
+post_delete.connect(static_pages_changed, sender=StaticPage, dispatch_uid='navigation_delete_StaticPage')
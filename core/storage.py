@@ -0,0 +1,85 @@
+"""
+Static files storage with content-hashed names and precompressed copies.
+
+CompressedManifestStaticFilesStorage is Django's ManifestStaticFilesStorage
+(site.abc123.css, with url() references rewritten to the hashed names) that
+also writes a .gz sibling, and a .br sibling when the optional ``brotli``
+package is installed, of every compressible file at collectstatic time.
+nginx serves those directly (gzip_static), so nothing is compressed per
+request and the files can be cached as immutable.
+
+Until collectstatic has written the manifest (development checkouts, the
+test suite), the unhashed names are served instead of raising. nginx only
+marks hashed names as immutable (nginx/nginx.conf, $static_cache_control),
+so a deployment that runs without a manifest gets short-lived caching of
+the unhashed URLs rather than a year of stale CSS.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico')
+
+# Smaller files fit in a single packet either way
+MIN_COMPRESS_SIZE = 256
+
+
+def is_compressible(name):
+    return name.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def compress(content):
+    """Return (suffix, compressed bytes) for each available encoding."""
+    yield '.gz', gzip.compress(content, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress(content, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    manifest_found = False
+
+    def read_manifest(self):
+        content = super().read_manifest()
+        self.manifest_found = content is not None
+        return content
+
+    def save_manifest(self):
+        super().save_manifest()
+        self.manifest_found = True
+
+    def stored_name(self, name):
+        if not self.manifest_found:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception) and is_compressible(hashed_name):
+                hashed_names[hashed_name] = name
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for hashed_name in hashed_names:
+            self.write_compressed(hashed_name)
+
+    def write_compressed(self, name):
+        """Write the precompressed siblings of a file, if they are smaller."""
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compressed in compress(content):
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
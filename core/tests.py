@@ -1,3 +1,424 @@
-from django.test import TestCase
+import gzip
+import json
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from articles.models import Article
+from .cache import (
+    CONTENT_CHANGED_KEY,
+    HITS_KEY,
+    bump_content_generation,
+    get_response_cache_stats,
+    reset_response_cache_stats,
+    response_cache_counters,
+)
+from .models import StaticPage
+from .navigation import get_static_pages, navigation_cache
+from .paginator import EstimatedCountPaginator
+from .replicas import ReplicaHealth, ReplicaRouter, RoutingState, _state, measure_lag, replica_health
+
+
+class StaticPageConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.page = StaticPage.objects.create(title='About Us', slug='about-us', content='About')
+
+    def setUp(self):
+        cache.clear()
+        navigation_cache.invalidate()
+        self.url = reverse('static_page', args=[self.page.slug])
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_not_modified_skips_page_query(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_cached_response_is_revalidated_without_queries(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_flash_messages_disable_conditional_response(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.cookies['messages'] = 'pending'
+        response = self.client.get(self.url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+
+class ResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.page = StaticPage.objects.create(title='About Us', slug='about-us', content='About')
+
+    def setUp(self):
+        cache.clear()
+        navigation_cache.invalidate()
+        self.url = reverse('static_page', args=[self.page.slug])
+
+    def x_cache(self, *args, **kwargs):
+        return self.client.get(self.url, *args, **kwargs).get('X-Cache')
+
+    def test_key_varies_by_query_string_and_htmx(self):
+        self.assertEqual(self.x_cache(), 'MISS')
+        self.assertEqual(self.x_cache(), 'HIT')
+        self.assertEqual(self.x_cache({'page': 2}), 'MISS')
+        self.assertEqual(self.x_cache(headers={'HX-Request': 'true'}), 'MISS')
+        self.assertEqual(self.x_cache(headers={'HX-Request': 'true'}), 'HIT')
+        self.assertEqual(self.x_cache({'page': 2}), 'HIT')
+
+    def test_cookies_only_bypass_for_flash_messages(self):
+        self.x_cache()
+        self.client.cookies['theme'] = 'dark'
+        self.assertEqual(self.x_cache(), 'HIT')
+        self.client.cookies['messages'] = 'pending'
+        self.assertIsNone(self.x_cache())
+
+    def test_content_change_invalidates_every_page(self):
+        self.x_cache()
+        self.assertEqual(self.x_cache(), 'HIT')
+        with self.captureOnCommitCallbacks(execute=True):
+            StaticPage.objects.filter(pk=self.page.pk).update(content='Changed')
+            self.page.refresh_from_db()
+            self.page.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Changed')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.x_cache()
+        self.client.force_login(User.objects.create_user('reader'))
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Cache', response)
+
+    @override_settings(RESPONSE_CACHE_STATS_INTERVAL=3600)
+    def test_counters_are_shared_in_batches(self):
+        response_cache_counters.flush()
+        reset_response_cache_stats()
+        self.x_cache()
+        self.x_cache()
+        # Counted in this process only, no cache write per request
+        self.assertIsNone(cache.get(HITS_KEY))
+        stats = get_response_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=1.0, RESPONSE_CACHE_ENABLED=False)
+class PerformanceMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.url = reverse('static_page', args=[
+            StaticPage.objects.create(title='About Us', slug='about-us', content='About').slug
+        ])
+
+    def test_server_timing_is_only_sent_to_staff(self):
+        self.assertNotIn('Server-Timing', self.client.get(self.url))
+
+        self.client.force_login(User.objects.create_user('editor', is_staff=True))
+        timing = self.client.get(self.url)['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    async def test_async_requests_are_measured(self):
+        # Under ASGI the middleware runs async and the queries in the request's sync thread
+        await self.async_client.aforce_login(await User.objects.acreate(username='editor', is_staff=True))
+        timing = (await self.async_client.get(self.url))['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertNotIn('"0 queries"', timing)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_connection_pool_statistics_are_reported(self):
+        # What psycopg_pool's ConnectionPool.get_stats() returns under load
+        pool = mock.Mock(get_stats=mock.Mock(return_value={
+            'pool_min': 2, 'pool_max': 4, 'pool_size': 4, 'pool_available': 1,
+            'requests_waiting': 2, 'requests_num': 40, 'requests_queued': 5, 'requests_wait_ms': 60,
+        }))
+        self.client.force_login(User.objects.create_user('editor', is_staff=True))
+        pool_property = mock.PropertyMock(return_value=pool)
+        with mock.patch.object(type(connections['default']), 'pool', pool_property, create=True), \
+                self.assertLogs('core.performance', level='WARNING') as logs:
+            response = self.client.get(self.url)
+        self.assertIn('db-pool;dur=12.0;desc="default: 3/4 in use, 2 waiting"', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['pools']['default']['in_use'], 3)
+        self.assertEqual(record['pools']['default']['avg_wait_ms'], 12.0)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_requests_are_logged_as_json(self):
+        with self.assertLogs('core.performance', level='WARNING') as logs:
+            self.client.get(self.url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], self.url)
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('template_ms', record)
+
+
+class CompressedManifestStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = Path(directory.name) / 'static'
+        self.root = Path(directory.name) / 'staticfiles'
+        (self.source / 'css').mkdir(parents=True)
+        (self.source / 'images').mkdir()
+        self.css = "body { background: url('../images/dot.svg'); }\n" + '.card { margin: 0; }\n' * 100
+        (self.source / 'css' / 'site.css').write_text(self.css)
+        (self.source / 'images' / 'dot.svg').write_text('<svg/>')
+        settings = override_settings(STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_unhashed_names_before_collectstatic(self):
+        self.assertEqual(staticfiles_storage.url('css/site.css'), '/static/css/site.css')
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        # Load the manifest from disk, as a newly started worker would
+        staticfiles_storage._setup()
+
+        hashed = staticfiles_storage.stored_name('css/site.css')
+        self.assertRegex(hashed, r'^css/site\.[0-9a-f]{12}\.css$')
+        self.assertEqual(staticfiles_storage.url('css/site.css'), f'/static/{hashed}')
+        content = (self.root / hashed).read_bytes()
+        self.assertIn(staticfiles_storage.stored_name('images/dot.svg').encode(), content)
+        self.assertEqual(gzip.decompress((self.root / f'{hashed}.gz').read_bytes()), content)
+        # Too small to be worth compressing
+        self.assertFalse((self.root / f'{staticfiles_storage.stored_name("images/dot.svg")}.gz').exists())
+
+    def test_nginx_only_marks_hashed_names_immutable(self):
+        config = (Path(settings.BASE_DIR) / 'nginx' / 'nginx.conf').read_text()
+        pattern = re.search(r'map \$uri \$static_cache_control \{.*?"~(.+?)" "public, immutable";', config, re.S)[1]
+        call_command('collectstatic', interactive=False, verbosity=0)
+        staticfiles_storage._setup()
+
+        self.assertRegex('/static/' + staticfiles_storage.stored_name('css/site.css'), pattern)
+        self.assertRegex('/static/' + staticfiles_storage.stored_name('images/dot.svg'), pattern)
+        # The names served before collectstatic has written the manifest
+        self.assertNotRegex('/static/css/site.css', pattern)
+        self.assertNotRegex('/static/vendor/htmx.min.js', pattern)
+
+
+class NavigationCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.page = StaticPage.objects.create(title='About Us', slug='about-us', content='About')
+
+    def setUp(self):
+        cache.clear()
+        navigation_cache.invalidate()
+
+    def titles(self):
+        return [page.title for page in get_static_pages()]
+
+    def test_snapshot_is_reused_without_queries(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.titles(), ['About Us'])
+        with self.assertNumQueries(0):
+            pages = get_static_pages()
+            self.assertIs(get_static_pages(), pages)
+        self.assertIsInstance(pages, tuple)
+
+    def test_changes_in_this_process_invalidate_the_snapshot(self):
+        self.titles()
+        StaticPage.objects.create(title='Contact', slug='contact', content='Contact')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.titles(), ['About Us', 'Contact'])
+        self.page.is_active = False
+        self.page.save()
+        self.assertEqual(self.titles(), ['Contact'])
+
+    def test_changes_in_another_process_reach_the_snapshot(self):
+        self.titles()
+        # Another worker's signal handlers ran, not ours: only the shared generation moved
+        StaticPage.objects.filter(pk=self.page.pk).update(title='About the Project')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(), ['About Us'])
+        bump_content_generation()
+        self.assertEqual(self.titles(), ['About the Project'])
+
+    def test_snapshot_expires(self):
+        self.titles()
+        with override_settings(NAVIGATION_CACHE_TIMEOUT=0), self.assertNumQueries(1):
+            self.titles()
+
+    def test_snapshot_records_when_its_rows_changed(self):
+        changed_at = get_static_pages().changed_at
+        # A reload finding the same rows keeps the time
+        bump_content_generation()
+        self.assertEqual(get_static_pages().changed_at, changed_at)
+        with mock.patch('core.cache.time.time', return_value=changed_at.timestamp() + 60):
+            with self.captureOnCommitCallbacks(execute=True):
+                StaticPage.objects.create(title='Contact', slug='contact', content='Contact')
+        # Changed rows take the time of the generation that brought them
+        self.assertAlmostEqual(get_static_pages().changed_at - changed_at, timedelta(seconds=60), delta=timedelta(milliseconds=1))
+
+
+class EstimatedCountPaginatorTests(TestCase):
+
+    def test_exact_count_without_planner_statistics(self):
+        for i in range(3):
+            StaticPage.objects.create(title=f'Page {i}', slug=f'page-{i}', content='Text')
+        paginator = EstimatedCountPaginator(StaticPage.objects.order_by('pk'), 2)
+        # Only PostgreSQL estimates; small results are always counted exactly
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+    def test_pages_past_an_underestimate(self):
+        pages = [StaticPage.objects.create(title=f'Page {i}', slug=f'page-{i}', content='Text') for i in range(7)]
+        with mock.patch('core.paginator.estimated_count', return_value=3):
+            paginator = EstimatedCountPaginator(StaticPage.objects.order_by('pk'), 2)
+            self.assertEqual(paginator.num_pages, 2)
+            seen, number = [], 1
+            while True:
+                page = paginator.page(number)
+                seen += page.object_list
+                if not page.has_next():
+                    break
+                number = page.next_page_number()
+            self.assertEqual(seen, pages)
+            self.assertEqual((number, paginator.count, paginator.num_pages), (4, 7, 4))
+            self.assertEqual(list(paginator.page(4)), pages[6:])
+            with self.assertRaises(EmptyPage):
+                paginator.page(5)
+
+    def test_pages_of_an_overestimate_stay_reachable(self):
+        pages = [StaticPage.objects.create(title=f'Page {i}', slug=f'page-{i}', content='Text') for i in range(5)]
+        with mock.patch('core.paginator.estimated_count', return_value=12):
+            paginator = EstimatedCountPaginator(StaticPage.objects.order_by('pk'), 2)
+            self.assertEqual(paginator.num_pages, 6)
+            self.assertEqual(list(paginator.page(3)), pages[4:])
+            # The page links come from the estimate; the last one is empty, not an error
+            page = paginator.page(6)
+            self.assertEqual(list(page), [])
+            self.assertFalse(page.has_next())
+            with self.assertRaises(EmptyPage):
+                paginator.page(7)
+
+
+class ReplicaRoutingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        replica_health.reset()
+        self.url = reverse('static_page', args=[
+            StaticPage.objects.create(title='About Us', slug='about-us', content='About').slug
+        ])
+
+    def tearDown(self):
+        replica_health.reset()
+
+    def test_router_reads_replica_until_the_request_writes(self):
+        router = ReplicaRouter()
+        _state.routing = state = RoutingState()
+        self.addCleanup(setattr, _state, 'routing', None)
+        state.read_alias = 'replica'
+        self.assertEqual(router.db_for_read(Article), 'replica')
+        self.assertEqual(router.db_for_read(StaticPage), 'replica')
+        self.assertIsNone(router.db_for_read(User))
+
+        self.assertEqual(router.db_for_write(Article), 'default')
+        self.assertTrue(state.wrote)
+        self.assertIsNone(router.db_for_read(Article))
+
+    def test_lagging_or_missing_replica_is_not_read(self):
+        health = ReplicaHealth()
+        with mock.patch('core.replicas.measure_lag', return_value=0.5) as measure_lag:
+            self.assertTrue(health.is_usable('replica'))
+            self.assertTrue(health.is_usable('replica'))
+        # Checked once per REPLICA_CHECK_INTERVAL
+        measure_lag.assert_called_once_with('replica')
+
+        for lag in (60.0, None):
+            health.reset()
+            with mock.patch('core.replicas.measure_lag', return_value=lag):
+                self.assertFalse(health.is_usable('replica'))
+
+    def test_replica_that_is_down_does_not_stall_requests(self):
+        with mock.patch.object(connections['default'], 'cursor', side_effect=OperationalError('refused')), \
+                self.assertLogs('core.replicas', 'WARNING'):
+            self.assertIsNone(measure_lag('default'))
+
+        health = ReplicaHealth()
+        connecting, give_up = threading.Event(), threading.Event()
+
+        def unreachable(alias):
+            connecting.set()
+            give_up.wait(5)
+            return None
+
+        with mock.patch('core.replicas.measure_lag', side_effect=unreachable) as check:
+            checker = threading.Thread(target=health.is_usable, args=('replica',))
+            checker.start()
+            self.assertTrue(connecting.wait(5))
+            # Other requests read the primary at once instead of waiting for the check
+            started = time.monotonic()
+            self.assertFalse(health.is_usable('replica'))
+            self.assertLess(time.monotonic() - started, 1)
+            give_up.set()
+            checker.join()
+        check.assert_called_once_with('replica')
+        self.assertFalse(health.is_usable('replica'))
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_writes_pin_the_browser_to_the_primary(self):
+        # The primary stands in for the replica: the test mirror cannot see this test's rows
+        with mock.patch('core.replicas.get_replica_alias', return_value='default'), \
+                mock.patch('core.replicas.measure_lag', return_value=0.0) as measure_lag:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+            measure_lag.assert_called_once_with('default')
+            self.assertNotIn('db_primary', self.client.cookies)
+
+            User.objects.create_user('editor', password='secret', is_staff=True)
+            self.client.post(reverse('admin:login'), {'username': 'editor', 'password': 'secret'})
+            self.assertEqual(self.client.cookies['db_primary']['max-age'], 15)
+
+            replica_health.reset()
+            measure_lag.reset_mock()
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+            measure_lag.assert_not_called()
+
+    def test_recent_changes_are_read_from_the_primary(self):
+        # The replica stands in for a standby that has not replayed the change yet
+        with mock.patch('core.replicas.get_replica_alias', return_value='default'), \
+                mock.patch('core.replicas.measure_lag', return_value=0.0) as measure_lag:
+            bump_content_generation()
+            response = self.client.get(self.url)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            # Rendered from the primary, so the page cached under the new generation is current
+            measure_lag.assert_not_called()
+
+            cache.set(CONTENT_CHANGED_KEY, time.time() - 11)
+            self.client.get(self.url, {'page': 2})
+            measure_lag.assert_called_once_with('default')
+
+    async def test_async_views_read_the_replica(self):
+        with mock.patch('core.replicas.get_replica_alias', return_value='default'), \
+                mock.patch('core.replicas.measure_lag', return_value=0.0) as measure_lag:
+            response = await self.async_client.get(reverse('articles:search'), {'q': 'about'})
+        self.assertEqual(response.status_code, 200)
+        measure_lag.assert_called_once_with('default')
@@ -1,9 +1,12 @@
 from django.views.generic import DetailView
 from django.shortcuts import get_object_or_404
+from .cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin
+from .replicas import ReplicaReadMixin
 from .models import StaticPage
 
 
-class StaticPageView(DetailView):
+class StaticPageView(CachedResponseMixin, ReplicaReadMixin, ConditionalGetMixin, DetailView):
     """
     Display a static page (About Us, Content Policies, etc.).
     Public access - no login required.
@@ -15,5 +18,13 @@ class StaticPageView(DetailView):
     slug_field = 'slug'
     slug_url_kwarg = 'slug'
 
+    def get_validators(self):
+        updated_at = self.get_queryset().filter(
+            slug=self.kwargs.get(self.slug_url_kwarg)
+        ).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None
+        return updated_at, None
+
     def get_queryset(self):
         return StaticPage.objects.filter(is_active=True)
@@ -42,6 +42,12 @@ docker-compose ps
 echo "📊 Running database migrations..."
 docker-compose exec -T web python manage.py migrate --noinput
 
+echo "📝 Rendering article content (only outdated articles)..."
+docker-compose exec -T web python manage.py rerender_articles
+
+echo "🗺️  Rebuilding sitemaps..."
+docker-compose exec -T web python manage.py generate_sitemaps
+
 echo "📁 Collecting static files..."
 docker-compose exec -T web python manage.py collectstatic --noinput
 
@@ -12,6 +12,11 @@ if [ -d "/app/media" ]; then
     chmod -R 755 /app/media || true
 fi
 
+# Shared file cache (web and worker)
+if [ -d "/app/cache" ]; then
+    chown -R appuser:appuser /app/cache || true
+fi
+
 # Switch to appuser and execute the command
 exec gosu appuser "$@"
 
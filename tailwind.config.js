@@ -0,0 +1,35 @@
+/** @type {import('tailwindcss').Config} */
+// Only the classes found in the templates end up in static/dist/site.css.
+// Class names built in JavaScript must appear as complete strings in the
+// templates (as in the inline scripts) to be picked up.
+module.exports = {
+  content: ['./templates/**/*.html'],
+  theme: {
+    extend: {
+      fontFamily: {
+        sans: ['Mukta Malar', 'system-ui', 'sans-serif'],
+      },
+      colors: {
+        brand: {
+          red: '#DC2626',
+          'red-dark': '#B91C1C',
+          'red-light': '#EF4444',
+        },
+      },
+      animation: {
+        'fade-in': 'fadeIn 0.5s ease-in-out',
+        'slide-up': 'slideUp 0.5s ease-out',
+      },
+      keyframes: {
+        fadeIn: {
+          '0%': { opacity: '0' },
+          '100%': { opacity: '1' },
+        },
+        slideUp: {
+          '0%': { transform: 'translateY(10px)', opacity: '0' },
+          '100%': { transform: 'translateY(0)', opacity: '1' },
+        },
+      },
+    },
+  },
+};